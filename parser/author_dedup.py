@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+author_dedup.py — нечёткое объединение вариантов написания авторов.
+
+Точный ключ (last, first, patr, None) считает разными авторами
+`Чернышев А.А.`, `Чернышёв А.А.` и `Chernyshev A.A.`.  AuthorClusters
+сводит такие варианты к первому встреченному написанию:
+
+1. фамилия приводится к латинской &laquo;скелетной&raquo; форме: транслитерация
+   кириллицы, ё &rarr; е, без диакритики, ъ/ь и не-букв; инициалы
+   сравниваются буквой как есть (в верхнем регистре, Ё &rarr; Е) —
+   транслитерация склеила бы Е / Э и И / Й (`Медведев Д.Е.` и
+   `Медведев Д.Э.` — разные люди, см. REGRESSION_PAIRS);
+2. совпадение скелетов (Чернышёв / Chernyshev) находится словарём;
+3. иначе кандидаты берутся из блока — первые BLOCK_PREFIX букв скелета
+   фамилии плюс инициалы (отчества должны совпадать: инициал без
+   отчества с полным ФИО не объединяется), а внутри блока — только
+   фамилии подходящей длины, так что сравнений немного и нет перебора
+   всех авторов попарно;
+4. фамилии кандидатов сравниваются расстоянием Левенштейна с досрочным
+   выходом по порогу max_distance(); пары вида Иванов / Иванова
+   (мужская и женская форма) не сливаются.
+
+Объединение онлайн: add() регистрирует нового &laquo;канонического&raquo; автора,
+match() для нового написания возвращает ключ канонического или None.
+
+CLI:
+    python author_dedup.py --check     — проверка на REGRESSION_PAIRS
+"""
+
+from __future__ import annotations
+import sys
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from memo import memoize
+
+AuthorKey = Tuple[str, str, str, None]
+
+BLOCK_PREFIX = 3
+
+_TRANSLIT = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh',
+    'з': 'z', 'и': 'i', 'й': 'i', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o',
+    'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'shch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu',
+    'я': 'ya',
+})
+
+
+@memoize
+def skeleton(text: str) -> str:
+    """'Чернышёв' &rarr; 'chernyshev';  'Müller' &rarr; 'muller';  'О'Коннор' &rarr; 'okonnor'."""
+    text = text.lower().translate(_TRANSLIT)
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in text if 'a' <= ch <= 'z')
+
+
+def initial(text: str) -> str:
+    """'д.' &rarr; 'Д';  'Ё.' &rarr; 'Е';  'Э.' &rarr; 'Э' (не 'E', как дал бы skeleton)."""
+    return ''.join(ch for ch in text.upper() if ch.isalpha()).replace('Ё', 'Е')
+
+
+def max_distance(length: int) -> int:
+    """Допустимое число правок для фамилии такой длины."""
+    return 0 if length < 4 else 1 if length < 9 else 2
+
+
+def bounded_levenshtein(a: str, b: str, limit: int) -> int:
+    """Расстояние Левенштейна, либо limit + 1, если оно заведомо больше limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) < len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        left = row_min = i
+        for j, cb in enumerate(b, 1):
+            v = prev[j - 1] if ca == cb else prev[j - 1] + 1
+            if prev[j] + 1 < v:
+                v = prev[j] + 1
+            if left + 1 < v:
+                v = left + 1
+            cur.append(v)
+            left = v
+            if v < row_min:
+                row_min = v
+        if row_min > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1] if prev[-1] <= limit else limit + 1
+
+
+class AuthorClusters:
+    """Канонические авторы: по скелету целиком и по блокам для нечёткого поиска."""
+
+    def __init__(self):
+        # (скелет фамилии, инициал, инициал отчества) &rarr; ключ автора
+        self.exact: Dict[Tuple[str, str, str], AuthorKey] = {}
+        # (префикс фамилии, инициал, отчество) &rarr; {длина фамилии: [(скелет, ключ)]}
+        self.blocks: Dict[Tuple[str, str, str], Dict[int, List[Tuple[str, AuthorKey]]]] = {}
+        self.merges: List[Tuple[AuthorKey, AuthorKey, int]] = []
+
+    @staticmethod
+    def _parts(key: AuthorKey) -> Tuple[str, str, str]:
+        last, first, patr, _ = key
+        # инициалы без транслитерации: Е / Э и И / Й не должны совпасть
+        return skeleton(last), initial(first), initial(patr)
+
+    def add(self, key: AuthorKey) -> None:
+        last, first, patr = self._parts(key)
+        self.exact.setdefault((last, first, patr), key)
+        block = self.blocks.setdefault((last[:BLOCK_PREFIX], first, patr), {})
+        block.setdefault(len(last), []).append((last, key))
+
+    def match(self, key: AuthorKey) -> Optional[AuthorKey]:
+        """Ключ канонического автора, вариантом которого является key, или None."""
+        last, first, patr = self._parts(key)
+        if not last:
+            return None
+        found = self.exact.get((last, first, patr))
+        if found is not None:
+            self.merges.append((key, found, 0))
+            return found
+        block = self.blocks.get((last[:BLOCK_PREFIX], first, patr))
+        if not block:
+            return None
+        limit = max_distance(len(last))
+        best: Optional[Tuple[int, AuthorKey]] = None
+        for length in range(len(last) - limit, len(last) + limit + 1):
+            for c_last, c_key in block.get(length, ()):
+                if _gender_pair(last, c_last):
+                    continue
+                d = bounded_levenshtein(last, c_last, limit)
+                if d <= limit and (best is None or d < best[0]):
+                    best = (d, c_key)
+        if best is None:
+            return None
+        self.merges.append((key, best[1], best[0]))
+        return best[1]
+
+    def write_report(self, path: str, author_ids: Dict[AuthorKey, int]) -> None:
+        """TSV: вариант &rarr; канонический автор (id), расстояние между скелетами фамилий."""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("author_id\tcanonical\tvariant\tdistance\n")
+            for variant, canon, dist in self.merges:
+                f.write(f"{author_ids[canon]}\t{_display(canon)}\t{_display(variant)}\t{dist}\n")
+
+
+def _gender_pair(a: str, b: str) -> bool:
+    """Фамилии различаются только окончанием женской формы: ivanov / ivanova."""
+    return a + 'a' == b or b + 'a' == a
+
+
+def _display(key: AuthorKey) -> str:
+    last, first, patr, _ = key
+    return f"{last} {first}{patr}".strip()
+
+
+# ───── проверка ─────
+# (вариант, канонический, должны ли слиться)
+REGRESSION_PAIRS: List[Tuple[AuthorKey, AuthorKey, bool]] = [
+    (('Медведев', 'Д.', 'Е.', None), ('Медведев', 'Д.', 'Э.', None), False),
+    (('Ильин', 'Е.', 'А.', None), ('Ильин', 'Э.', 'А.', None), False),
+    (('Ильин', 'И.', 'А.', None), ('Ильин', 'Й.', 'А.', None), False),
+    (('Петров', 'А.', 'И.', None), ('Петров', 'А.', 'Й.', None), False),
+    (('Иванов', 'А.', 'А.', None), ('Иванова', 'А.', 'А.', None), False),
+    (('Чернышёв', 'А.', 'А.', None), ('Чернышев', 'А.', 'А.', None), True),
+    (('Семёнов', 'Ё.', 'П.', None), ('Семенов', 'Е.', 'П.', None), True),
+    (('Кузнецов', 'В.', 'Н.', None), ('Кузнецов', 'в.', 'н.', None), True),
+]
+
+
+def check() -> List[str]:
+    """Нарушения REGRESSION_PAIRS (пустой список — всё в порядке)."""
+    failures = []
+    for variant, canon, same in REGRESSION_PAIRS:
+        clusters = AuthorClusters()
+        clusters.add(canon)
+        merged = clusters.match(variant) == canon
+        if merged != same:
+            verb = 'слиты' if merged else 'не слиты'
+            failures.append(f"{_display(variant)!r} и {_display(canon)!r} {verb}")
+    return failures
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ['--check']:
+        sys.exit("Использование: python author_dedup.py --check")
+    failures = check()
+    for line in failures:
+        print(line)
+    if failures:
+        sys.exit(1)
+    print(f"Пар проверено: {len(REGRESSION_PAIRS)}, нарушений нет")
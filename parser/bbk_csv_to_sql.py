@@ -4,6 +4,7 @@
 
 import csv
 import sys
+import itertools
 from pathlib import Path
 
 OUT_COLS     = ("bbk_abb", "description")
@@ -11,9 +12,6 @@ DELIM        = ';'
 HEADER_TAG   = ("bbk_full", "ББК.", "Рабочие таблицы")
 DEFAULT_ENC  = "cp1251"
 
-def escape_pg(text: str) -> str:
-    return text.replace("'", "''")
-
 def is_header(row) -> bool:
     return (not any(c.strip() for c in row) or
             row[0].strip().startswith(HEADER_TAG))
@@ -21,12 +19,12 @@ def is_header(row) -> bool:
 def strip_lead_comma(txt: str) -> str:
     return txt.lstrip().lstrip(',').lstrip()
 
-def collect_records(reader):
+def iter_records(reader):
     """
-    Склеивает строки и возвращает список [bbk_abb, description]
+    Склеивает строки и отдаёт по мере чтения [bbk_abb, description]
     (только те, у кого описание не пустое).
     """
-    records, cur = [], None
+    cur = None
     for raw in reader:
         if is_header(raw):
             continue
@@ -36,7 +34,7 @@ def collect_records(reader):
         has_codes = any(row[:2])           # bbk_full или bbk_abb
         if has_codes:
             if cur and cur[1]:
-                records.append(cur)
+                yield cur
             abb  = row[1] or row[0]
             desc = row[2]
             cur  = [abb, desc]
@@ -47,33 +45,29 @@ def collect_records(reader):
                 cur[1] = f"{cur[1]} {strip_lead_comma(row[2])}".strip()
 
     if cur and cur[1]:
-        records.append(cur)
+        yield cur
 
-    return records
+def collect_records(reader):
+    """Список записей iter_records()."""
+    return list(iter_records(reader))
 
-def write_sql(recs, dst_sql: Path, src_name: str):
+def write_sql(recs, dst_sql: Path, src_name: str) -> int:
+    from dict_import import write_inserts
     with dst_sql.open("w", encoding="utf-8", newline='\n') as out:
-        out.write(f"-- INSERT-ы ББК, сгенерировано из {src_name}\n")
-        for abb, desc in recs:
-            out.write(
-                "INSERT INTO public.bbk (bbk_abb, description) "
-                f"VALUES ('{escape_pg(abb)}', '{escape_pg(desc)}') "
-                "ON CONFLICT (bbk_abb) DO NOTHING;\n"
-            )
+        return write_inserts('bbk', recs, out, src_name)
 
 def main(src_csv: Path, dst_sql: Path, enc_in: str = DEFAULT_ENC):
     if not src_csv.exists():
         sys.exit(f"Файл {src_csv} не найден")
 
     with src_csv.open(encoding=enc_in, newline='') as f:
-        reader = csv.reader(f, delimiter=DELIM)
-        records = collect_records(reader)
-
-    if not records:
-        sys.exit("После очистки не осталось ни одной записи")
+        records = iter_records(csv.reader(f, delimiter=DELIM))
+        first = next(records, None)
+        if first is None:
+            sys.exit("После очистки не осталось ни одной записи")
+        count = write_sql(itertools.chain([first], records), dst_sql, src_csv.name)
 
-    write_sql(records, dst_sql, src_csv.name)
-    print(f"Сохранено {len(records)} BBK-записей в {dst_sql}")
+    print(f"Сохранено {count} BBK-записей в {dst_sql}")
 
 if __name__ == "__main__":
     if len(sys.argv) not in (3, 4):
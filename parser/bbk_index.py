@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bbk_index.py — сопоставление рубрик 606/610 с описаниями public.bbk.
+
+fix_bbk.collect() даёт рубрики вида &laquo;Техническая Механика&raquo;, которые
+до сих пор попадали только в book_bbk_raw.  BbkIndex строится один раз
+по строкам справочника (id, код, описание) и разрешает рубрику в bbk.id:
+
+1. точное совпадение нормализованного текста (регистр, ё/е,
+   пунктуация и лишние пробелы не учитываются);
+2. иначе — нечёткое по триграммам, как pg_trgm: сходство
+   |A∩B| / |A∪B| множеств триграмм слов (`  сл`, ` сло`, …).
+   Совпадение засчитывается при сходстве >= threshold, а для этого
+   описание должно разделять с рубрикой не меньше ⌈threshold·|Q|⌉
+   триграмм.  Поэтому кандидаты берутся из инвертированного индекса
+   триграмма &rarr; описания только по |Q| − ⌈threshold·|Q|⌉ + 1 самым
+   редким триграммам рубрики (prefix filtering) и проверяются точно —
+   рубрика не сравнивается со всем справочником.
+
+Результаты кешируются по нормализованной рубрике.
+"""
+
+from __future__ import annotations
+import re
+import math
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from code_trie import MATCH_EXACT, MATCH_NONE
+
+MATCH_FUZZY = 'fuzzy'
+DEFAULT_THRESHOLD = 0.6
+
+_NON_WORD_RE = re.compile(r'[^0-9a-zа-я]+')
+
+
+def normalize_heading(text: str) -> str:
+    """'Техническая  Механика (ЕТГС).' &rarr; 'техническая механика етгс'"""
+    return _NON_WORD_RE.sub(' ', text.lower().replace('ё', 'е')).strip()
+
+
+def trigrams(norm: str) -> FrozenSet[str]:
+    """Триграммы слов нормализованной строки, с pg_trgm-подобной обвязкой пробелами."""
+    grams = set()
+    for word in norm.split():
+        padded = f'  {word} '
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return frozenset(grams)
+
+
+class BbkIndex:
+    """Нормализованный и триграммный индекс описаний ББК."""
+
+    def __init__(self, rows: Iterable[Tuple[int, str, Optional[str]]],
+                 threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.exact: Dict[str, int] = {}
+        self._ids: List[int] = []
+        self._grams: List[FrozenSet[str]] = []
+        self._postings: Dict[str, List[int]] = {}
+        for _id, _code, desc in sorted(rows):
+            norm = normalize_heading(desc or '')
+            if not norm or norm in self.exact:
+                continue                    # одинаковые описания &rarr; меньший id
+            self.exact[norm] = _id
+            grams = trigrams(norm)
+            entry = len(self._ids)
+            self._ids.append(_id)
+            self._grams.append(grams)
+            for g in grams:
+                self._postings.setdefault(g, []).append(entry)
+        self._cache: Dict[str, Tuple[Optional[int], float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def match(self, heading: str) -> Tuple[Optional[int], float]:
+        """
+        (bbk.id, сходство) лучшего описания или (None, лучшее сходство среди
+        кандидатов) — если порог не достигнут.
+        """
+        norm = normalize_heading(heading)
+        hit = self._cache.get(norm)
+        if hit is not None:
+            return hit
+        _id = self.exact.get(norm)
+        if _id is not None:
+            result: Tuple[Optional[int], float] = (_id, 1.0)
+        else:
+            result = self._fuzzy(norm)
+        self._cache[norm] = result
+        return result
+
+    def _fuzzy(self, norm: str) -> Tuple[Optional[int], float]:
+        q = trigrams(norm)
+        if not q:
+            return None, 0.0
+        nq = len(q)
+        min_common = max(1, math.ceil(self.threshold * nq))
+        rare = sorted((self._postings.get(g, ()) for g in q), key=len)
+        candidates = set()
+        for posting in rare[:nq - min_common + 1]:
+            candidates.update(posting)
+        # сходство не выше min(|Q|,|E|)/max(|Q|,|E|) — отсекаем по длине
+        lo, hi = self.threshold * nq, nq / self.threshold if self.threshold else math.inf
+        best, best_sim = None, 0.0
+        for entry in sorted(candidates):            # по возрастанию id: при равенстве — меньший
+            grams = self._grams[entry]
+            if not lo <= len(grams) <= hi:
+                continue
+            common = len(q & grams)
+            sim = common / (nq + len(grams) - common)
+            if sim > best_sim:
+                best, best_sim = entry, sim
+        if best is None or best_sim < self.threshold:
+            return None, best_sim
+        return self._ids[best], best_sim
+
+    def resolve(self, heading: str) -> Tuple[Tuple[int, ...], str]:
+        """Интерфейс link_filter.filter_resolved_links: ((id,), уровень)."""
+        _id, _ = self.match(heading)
+        if _id is None:
+            return (), MATCH_NONE
+        exact = self.exact.get(normalize_heading(heading)) == _id
+        return (_id,), (MATCH_EXACT if exact else MATCH_FUZZY)
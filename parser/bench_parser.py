@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_parser.py — бенчмарки парсера ИРБИС на синтетических экспортах.
+
+Два уровня замеров:
+
+  • микро — горячие функции на значениях из сгенерированных записей:
+      split_codes, parse_copies, normalize_author, parse_pub_info,
+      fix_bbk.collect (лучшее из --repeat прогонов, мкс на вызов);
+  • сквозной — parse_irbis_file.py целиком на файлах заданных размеров
+      (gen_irbis_export.py): записей в секунду и пиковая память (RSS)
+      отдельного процесса, включая процессы --workers.
+
+Сквозной прогон работает offline по снимку справочников, собранному
+из udc.sql / grnti.sql, поэтому БД и psycopg2 не нужны.  Экспорты и
+снимок кешируются в --workdir и переиспользуются между запусками.
+
+Использование:
+    python bench_parser.py                             — микро + 1k, 10k записей
+    python bench_parser.py --sizes 1000,100000,1000000 --json before.json
+    python bench_parser.py --e2e-only --sizes 100000 --args "--workers 4"
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import resource
+import runpy
+import shlex
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Sequence
+
+from irbis_record     import IrbisRecord
+from fix_authors      import normalize_author, _author_from_subfields
+from fix_pub_info     import parse_pub_info
+from fix_bbk          import collect as collect_bbk
+from parse_irbis_file import split_codes, parse_copies
+from gen_irbis_export import ExportGenerator, write_export, write_dictionary_snapshot
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# ───── микро-бенчмарки ─────
+def micro_inputs(count: int, seed: int) -> Dict[str, List]:
+    """Аргументы для горячих функций, извлечённые из count синтетических записей."""
+    inputs: Dict[str, List] = {'codes': [], 'copies': [], 'authors': [], 'pub': [], 'bbk': []}
+    for n, lines in enumerate(ExportGenerator(seed).records(count), 1):
+        rec = IrbisRecord.from_lines(lines)
+        for fld in rec.get_all('675', '964'):
+            inputs['codes'].append(fld.text)
+        inputs['copies'].extend((n, fld.text) for fld in rec.get_all('910'))
+        for fld in rec.get_all('700', '701'):
+            inputs['authors'].append(_author_from_subfields(fld.subdict()))
+        fld = rec.get('210')
+        if fld is not None:
+            sd = fld.subdict()
+            inputs['pub'].append(', '.join(x for x in (sd.get('A', ''), sd.get('C', ''),
+                                                       sd.get('D', '')) if x))
+        bbk = [(f.tag, f.text.strip()) for f in rec.get_all('606', '610')]
+        if bbk:
+            inputs['bbk'].append(bbk)
+    return inputs
+
+
+def _best(fn: Callable[[], None], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run_micro(count: int, seed: int, repeat: int) -> Dict[str, Dict]:
+    inp = micro_inputs(count, seed)
+    cases = {
+        'split_codes'     : (inp['codes'],   lambda: [split_codes(x) for x in inp['codes']]),
+        'parse_copies'    : (inp['copies'],  lambda: parse_copies(inp['copies'])),
+        'normalize_author': (inp['authors'], lambda: [normalize_author(x) for x in inp['authors']]),
+        'parse_pub_info'  : (inp['pub'],     lambda: [parse_pub_info(x) for x in inp['pub']]),
+        'fix_bbk.collect' : (inp['bbk'],     lambda: [collect_bbk(x) for x in inp['bbk']]),
+    }
+    results = {}
+    for name, (args, fn) in cases.items():
+        t = _best(fn, repeat)
+        results[name] = {'calls': len(args), 'seconds': t,
+                         'us_per_call': t / len(args) * 1e6 if args else 0.0}
+    return results
+
+
+# ───── сквозной прогон ─────
+def ensure_inputs(workdir: str, sizes: Sequence[int], seed: int) -> Dict[int, str]:
+    os.makedirs(workdir, exist_ok=True)
+    files = {}
+    for n in sizes:
+        path = os.path.join(workdir, f'irbis_{n}_s{seed}.txt')
+        if not os.path.exists(path):
+            print(f"  генерация {path} …", file=sys.stderr)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                write_export(f, n, seed)
+            os.replace(path + '.tmp', path)
+        files[n] = path
+    return files
+
+
+def _child(argv: List[str]) -> None:
+    """
+    Выполняется в отдельном процессе: запускает parse_irbis_file.py с argv
+    и печатает JSON с временем и пиковым RSS (своим и дочерних процессов).
+    """
+    sys.argv = ['parse_irbis_file.py'] + argv
+    t0 = time.perf_counter()
+    real_stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        runpy.run_path(os.path.join(_HERE, 'parse_irbis_file.py'), run_name='__main__')
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+    elapsed = time.perf_counter() - t0
+    # ru_maxrss: КиБ в Linux, байты в macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    print(json.dumps({
+        'seconds'       : elapsed,
+        'max_rss'       : resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        'max_rss_workers': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }))
+
+
+def run_e2e(files: Dict[int, str], snapshot: str, workdir: str,
+            extra_args: List[str], repeat: int) -> Dict[int, Dict]:
+    results = {}
+    out_sql = os.path.join(workdir, 'bench_out.sql')
+    for n, path in files.items():
+        runs = []
+        for _ in range(repeat):
+            cmd = [sys.executable, os.path.abspath(__file__), '--child', '--',
+                   '', path, out_sql, '--snapshot', snapshot, '--offline', *extra_args]
+            proc = subprocess.run(cmd, cwd=_HERE, capture_output=True, text=True)
+            if proc.returncode != 0:
+                sys.exit(f"Ошибка прогона на {path}:\n{proc.stderr}")
+            runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        best = min(runs, key=lambda r: r['seconds'])
+        results[n] = {
+            'seconds'        : best['seconds'],
+            'records_per_sec': n / best['seconds'],
+            'max_rss_mb'     : max(r['max_rss'] for r in runs) / 2**20,
+            'max_rss_workers_mb': max(r['max_rss_workers'] for r in runs) / 2**20,
+            'output_mb'      : os.path.getsize(out_sql) / 2**20,
+        }
+    os.remove(out_sql)
+    return results
+
+
+# ───── отчёт ─────
+def _print_report(report: Dict) -> None:
+    if 'micro' in report:
+        print(f"\nМикро-бенчмарки ({report['micro_records']} записей, лучший из {report['repeat']}):")
+        print(f"  {'функция':<18} {'вызовов':>9} {'мкс/вызов':>10}")
+        for name, r in report['micro'].items():
+            print(f"  {name:<18} {r['calls']:>9} {r['us_per_call']:>10.2f}")
+    if 'e2e' in report:
+        print(f"\nparse_irbis_file {' '.join(report['args'])}".rstrip() + ':')
+        print(f"  {'записей':>9} {'сек':>9} {'записей/с':>10} {'RSS, МиБ':>9} "
+              f"{'RSS воркеров':>13} {'дамп, МиБ':>10}")
+        for n, r in report['e2e'].items():
+            print(f"  {n:>9} {r['seconds']:>9.2f} {r['records_per_sec']:>10.0f} "
+                  f"{r['max_rss_mb']:>9.1f} {r['max_rss_workers_mb']:>13.1f} {r['output_mb']:>10.1f}")
+
+
+def main(argv: List[str]) -> None:
+    if argv[:2] == ['--child', '--']:
+        _child(argv[2:])
+        return
+    ap = argparse.ArgumentParser(description='Бенчмарки парсера ИРБИС')
+    ap.add_argument('--sizes', default='1000,10000',
+                    help='размеры экспортов для сквозного прогона, через запятую')
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('--repeat', type=int, default=3, help='повторов на замер (берётся лучший)')
+    ap.add_argument('--micro-records', type=int, default=5000,
+                    help='из скольких записей брать входы микро-бенчмарков')
+    ap.add_argument('--workdir', default=os.path.join(_HERE, 'bench_data'),
+                    help='каталог для сгенерированных экспортов и снимка')
+    ap.add_argument('--args', default='', help='доп. аргументы parse_irbis_file, напр. "--workers 4"')
+    ap.add_argument('--json', metavar='FILE', help='сохранить результаты в JSON')
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument('--micro-only', action='store_true')
+    mode.add_argument('--e2e-only', action='store_true')
+    args = ap.parse_args(argv)
+
+    report: Dict = {'python': platform.python_version(), 'cpu_count': os.cpu_count(),
+                    'seed': args.seed, 'repeat': args.repeat}
+    if not args.e2e_only:
+        report['micro_records'] = args.micro_records
+        report['micro'] = run_micro(args.micro_records, args.seed, args.repeat)
+    if not args.micro_only:
+        sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+        files = ensure_inputs(args.workdir, sizes, args.seed)
+        snapshot = os.path.join(args.workdir, 'dict_snapshot.pkl')
+        if not os.path.exists(snapshot):
+            write_dictionary_snapshot(snapshot)
+        report['args'] = shlex.split(args.args)
+        report['e2e'] = run_e2e(files, snapshot, args.workdir, report['args'], args.repeat)
+
+    _print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
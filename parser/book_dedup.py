@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+book_dedup.py — объединение записей одного издания в одну книгу.
+
+Каждая запись IBIS становится строкой public.book, даже если одно и то
+же издание встречается в экспорте несколько раз и записи отличаются
+только экземплярами (910).  BookIndex хэширует нормализованный ключ
+издания — заглавие, сведения об издании, издательство, год и авторы — и
+за один проход, словарём (O(1) на запись), сопоставляет повторную запись
+с книгой, выданной первой из них.
+
+Нормализация: регистр, ё/е, пунктуация и лишние пробелы не учитываются,
+порядок авторов — тоже.  В индексе хранится только 16-байтовый хэш
+ключа, поэтому индекс по миллионам записей остаётся компактным.
+"""
+
+from __future__ import annotations
+import re
+import hashlib
+from typing import Dict, Optional, Sequence, Tuple
+
+_NON_WORD_RE = re.compile(r'[^0-9a-zа-я]+')
+
+
+def _norm(text: Optional[str]) -> str:
+    if not text:
+        return ''
+    return _NON_WORD_RE.sub(' ', text.lower().replace('ё', 'е')).strip()
+
+
+def edition_key(title: str, edition_statement: str, publisher: Optional[str],
+                year: Optional[int], authors: Sequence[Tuple[str, str, str]]) -> bytes:
+    """16-байтовый хэш нормализованного ключа издания."""
+    people = sorted('|'.join(_norm(part) for part in a) for a in authors)
+    text = '\x1f'.join((_norm(title), _norm(edition_statement), _norm(publisher),
+                        str(year or ''), '\x1e'.join(people)))
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+class BookIndex:
+    """Хэш ключа издания &rarr; book.id первой записи этого издания."""
+
+    def __init__(self):
+        self.books: Dict[bytes, int] = {}
+        self.merged = 0
+
+    def resolve(self, key: bytes, book_id: int) -> Tuple[int, bool]:
+        """(book.id издания, True — если запись объединена с уже встреченной)."""
+        found = self.books.setdefault(key, book_id)
+        if found != book_id:
+            self.merged += 1
+            return found, True
+        return book_id, False
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+checkpoint.py — контрольные точки долгого импорта (parse_irbis_file --checkpoint).
+
+Если многочасовой прогон обрывается (сбой БД, OOM), начинать приходится
+с первой записи.  С --checkpoint FILE импорт каждые N записей сохраняет:
+
+  • смещение во входном файле — байт за строкой-разделителем последней
+    обработанной записи;
+  • смещение в дампе — длину уже записанного SQL;
+  • состояние _Importer: счётчики (record_count, next_author_id,
+    next_publisher_id …), словари издательств и авторов, индексы
+    дедупликации и отложенные пары UDC / GRNTI / ББК / экземпляров;
+  • состояние приёмника: счётчики строк и недописанные пачки
+    BatchSqlWriter.
+
+С --resume дамп обрезается до сохранённой длины, чтение продолжается с
+сохранённого смещения, и результат совпадает с непрерывным прогоном
+(справочники UDC / GRNTI читаются заново — между запусками они не
+должны меняться).  Продолжение отклоняется, если входной файл изменился
+(размер, mtime) или отличаются параметры, влияющие на дамп.
+
+Состояние хранится в pickle (как снимок справочников dict_snapshot) и
+пишется атомарно: временный файл, затем os.replace.
+"""
+
+from __future__ import annotations
+import os
+import pickle
+from typing import Dict, Optional
+
+CHECKPOINT_VERSION = 1
+DEFAULT_EVERY = 100_000         # записей между контрольными точками
+
+
+def _stat(path: str):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+class Checkpoint:
+    """Состояние прерванного импорта."""
+
+    def __init__(self, infile: str, outfile: str, options: Dict):
+        self.version = CHECKPOINT_VERSION
+        self.infile = infile
+        self.input_stat = _stat(infile)
+        self.outfile = outfile
+        self.options = dict(options)
+        self.input_offset = 0
+        self.output_offset = 0
+        self.records_read = 0               # записей экспорта (включая не-IBIS)
+        self.importer: Dict = {}
+        self.writer: Dict = {}
+
+    @classmethod
+    def load(cls, path: str) -> 'Checkpoint':
+        with open(path, 'rb') as f:
+            ck = pickle.load(f)
+        if not isinstance(ck, cls) or ck.version != CHECKPOINT_VERSION:
+            raise ValueError(f"{path}: неподдерживаемая версия контрольной точки")
+        return ck
+
+    def save(self, path: str) -> None:
+        """Атомарная запись: сначала во временный файл, затем os.replace."""
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def mismatch(self, infile: str, outfile: str, options: Dict) -> Optional[str]:
+        """Почему продолжить с этой точки нельзя, или None."""
+        if os.path.abspath(infile) != os.path.abspath(self.infile):
+            return f"точка сохранена для входного файла {self.infile}"
+        if _stat(infile) != self.input_stat:
+            return f"входной файл {infile} изменился после сохранения точки"
+        if os.path.abspath(outfile) != os.path.abspath(self.outfile):
+            return f"точка сохранена для дампа {self.outfile}"
+        if not os.path.exists(outfile) or os.path.getsize(outfile) < self.output_offset:
+            return f"дамп {outfile} короче сохранённого ({self.output_offset} байт)"
+        changed = sorted(k for k in set(options) | set(self.options)
+                         if options.get(k) != self.options.get(k))
+        if changed:
+            return "отличаются параметры: " + ", ".join(
+                f"{k} {self.options.get(k)!r} &rarr; {options.get(k)!r}" for k in changed)
+        return None
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+code_trie.py — иерархическое сопоставление кодов УДК / ГРНТИ со справочником.
+
+Точный поиск (udc_map.get(code)) теряет детализированные и составные
+коды: `621.039.5` или `681.3:004` уходят в book_udc_raw, хотя в
+public.udc есть их предки.  Здесь справочник укладывается в префиксное
+дерево, и каждый код разрешается в самого длинного найденного предка
+за O(длины кода), без перебора справочника.
+
+  • УДК   — посимвольное дерево (десятичная запись: `62` — предок `621`,
+            `621.039` — предок `621.039.5`);
+  • ГРНТИ — дерево по сегментам XX.YY.ZZ; хвостовые `00` в ключ не входят,
+            так что `29.01.05` &rarr; `29.01.00` &rarr; `29.00.00`.  Корень
+            (`00.00.00`) предком не считается.
+
+Составные коды делятся на компоненты по `:`, `+` и `/` (в диапазоне
+`621.3/.4` второй компонент дополняется началом первого), и каждый
+компонент разрешается отдельно, т.е. код может дать несколько связей.
+
+resolve(code) &rarr; (ids, уровень), уровень — один из MATCH_LEVELS.
+"""
+
+from __future__ import annotations
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fix_grnti import _normalize_code as _normalize_grnti
+
+# уровни совпадения — от лучшего к худшему
+MATCH_EXACT, MATCH_COMPONENT, MATCH_ANCESTOR, MATCH_NONE = 'exact', 'component', 'ancestor', 'none'
+MATCH_LEVELS = (MATCH_EXACT, MATCH_COMPONENT, MATCH_ANCESTOR, MATCH_NONE)
+
+_COMPOSITE_RE = re.compile(r'\s*[:+/]\s*')
+_VALUE = None               # ключ значения в узле дерева (сегменты — непустые строки)
+
+
+class CodeTrie:
+    """Префиксное дерево: последовательность сегментов &rarr; id справочника."""
+    __slots__ = ('root', 'size')
+
+    def __init__(self):
+        self.root: Dict = {}
+        self.size = 0
+
+    def insert(self, key: Sequence[str], value: int) -> None:
+        node = self.root
+        for seg in key:
+            node = node.setdefault(seg, {})
+        if _VALUE not in node:
+            self.size += 1
+            node[_VALUE] = value
+
+    def longest_prefix(self, key: Sequence[str]) -> Tuple[Optional[int], int]:
+        """(id самого длинного префикса key, его длина в сегментах) или (None, 0)."""
+        node, best, depth = self.root, None, 0
+        for i, seg in enumerate(key, 1):
+            node = node.get(seg)
+            if node is None:
+                break
+            if _VALUE in node:
+                best, depth = node[_VALUE], i
+        return best, depth
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def split_composite(code: str) -> List[str]:
+    """'681.3:004' &rarr; ['681.3', '004'];  '621.3/.4' &rarr; ['621.3', '621.4']."""
+    parts = [p for p in _COMPOSITE_RE.split(code.strip()) if p]
+    for i in range(1, len(parts)):
+        if parts[i].startswith('.') and '.' in parts[0]:
+            parts[i] = parts[0].rsplit('.', 1)[0] + parts[i]
+    return parts
+
+
+class _HierarchicalIndex(ABC):
+    """Общая часть индексов: точный словарь + дерево + разбор составных кодов."""
+
+    def __init__(self, mapping: Dict[str, int]):
+        self.mapping = mapping
+        self.trie = CodeTrie()
+        for code, _id in mapping.items():
+            key = self.key(code)
+            if key:
+                self.trie.insert(key, _id)
+
+    @abstractmethod
+    def key(self, code: str) -> Sequence[str]:
+        """Путь кода в дереве (последовательность сегментов)."""
+
+    def _exact(self, code: str) -> Optional[int]:
+        return self.mapping.get(code)
+
+    def resolve(self, code: str) -> Tuple[Tuple[int, ...], str]:
+        exact = self._exact(code)
+        if exact is not None:
+            return (exact,), MATCH_EXACT
+        parts = split_composite(code)
+        ids: List[int] = []
+        level = MATCH_COMPONENT if len(parts) > 1 else MATCH_EXACT
+        for part in parts:
+            key = self.key(part)
+            _id, depth = self.trie.longest_prefix(key)
+            if _id is None:
+                continue
+            if depth < len(key):
+                level = MATCH_ANCESTOR
+            if _id not in ids:
+                ids.append(_id)
+        return (tuple(ids), level) if ids else ((), MATCH_NONE)
+
+
+class UdcIndex(_HierarchicalIndex):
+    """Посимвольное дерево УДК по ключам udc_map (fix_udc.load_udc_map)."""
+
+    def key(self, code: str) -> Sequence[str]:
+        return code.strip()
+
+
+class GrntiIndex(_HierarchicalIndex):
+    """Сегментное дерево ГРНТИ по нормализованным ключам grnti_map."""
+
+    def key(self, code: str) -> Sequence[str]:
+        segs = _normalize_grnti(code).split('.')
+        while segs and segs[-1] == '00':
+            segs.pop()
+        return segs
+
+    def _exact(self, code: str) -> Optional[int]:
+        return self.mapping.get(_normalize_grnti(code))
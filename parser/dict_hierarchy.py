@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+dict_hierarchy.py — иерархия справочников ББК / УДК / ГРНТИ в таблицах.
+
+public.bbk, public.udc и public.grnti — плоские списки кодов, и выборка
+рубрики с подрубриками (&laquo;всё под 29.&raquo;) каждый раз превращается в
+LIKE-сканирование на сервере.  Здесь иерархия считается один раз на
+клиенте — теми же префиксными деревьями, что и разрешение кодов книг
+(code_trie):
+
+  • УДК, ББК — посимвольное дерево (десятичная запись: `62` — предок
+               `621`, `20` — предок `20г`);
+  • ГРНТИ    — дерево по сегментам XX.YY.ZZ без хвостовых `00`.
+
+Родитель кода — его самый длинный собственный префикс, который есть в
+справочнике (промежуточные отсутствующие уровни пропускаются).  Для
+каждого справочника x заполняются:
+
+  x_tree    (id, parent_id, depth) — родитель и глубина (корни — 0);
+  x_closure (ancestor_id, descendant_id, distance) — транзитивное
+            замыкание, включая сам код (distance 0).
+
+Поддерево — индексный поиск по первичному ключу замыкания:
+
+    SELECT u.* FROM public.udc_closure c JOIN public.udc u ON u.id = c.descendant_id
+    WHERE c.ancestor_id = (SELECT id FROM public.udc WHERE udc_abb = '62');
+
+Таблицы перезаливаются целиком (TRUNCATE + COPY, одной транзакцией);
+DDL (CREATE TABLE IF NOT EXISTS) выполняется тем же скриптом.
+Перестраивать после загрузки / обновления справочника (dict_import).
+
+CLI:
+    python dict_hierarchy.py "<DSN>" [udc grnti bbk] [--output hierarchy.sql]
+"""
+
+from __future__ import annotations
+import argparse
+import tempfile
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from code_trie import GrntiIndex, UdcIndex
+from dict_import import SOURCES
+from pg_copy import copy_line
+
+# словарь &rarr; индекс, задающий ключ кода (ББК — десятичная запись, как УДК)
+INDEXES = {'udc': UdcIndex, 'grnti': GrntiIndex, 'bbk': UdcIndex}
+
+_DDL = """\
+CREATE TABLE IF NOT EXISTS public.{name}_tree (
+    id        INT PRIMARY KEY REFERENCES public.{name}(id) ON DELETE CASCADE,
+    parent_id INT REFERENCES public.{name}(id) ON DELETE SET NULL,
+    depth     SMALLINT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {name}_tree_parent_idx ON public.{name}_tree (parent_id);
+CREATE TABLE IF NOT EXISTS public.{name}_closure (
+    ancestor_id   INT NOT NULL REFERENCES public.{name}(id) ON DELETE CASCADE,
+    descendant_id INT NOT NULL REFERENCES public.{name}(id) ON DELETE CASCADE,
+    distance      SMALLINT NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+);
+CREATE INDEX IF NOT EXISTS {name}_closure_descendant_idx ON public.{name}_closure (descendant_id);"""
+
+
+class Hierarchy:
+    """Родители и глубины кодов одного справочника."""
+
+    def __init__(self, name: str, rows: Iterable[Tuple[int, str]]):
+        self.name = name
+        rows = sorted(rows)
+        index = INDEXES[name]({code: _id for _id, code in reversed(rows)})   # дубль кода &rarr; меньший id
+        keyed = [(index.key(code), _id) for _id, code in rows]
+        keyed.sort(key=lambda kv: len(kv[0]))                               # родители раньше детей
+        self.parent: Dict[int, Optional[int]] = {}
+        self.depth: Dict[int, int] = {}
+        for key, _id in keyed:
+            parent, _ = index.trie.longest_prefix(key[:-1]) if key else (None, 0)
+            self.parent[_id] = parent
+            self.depth[_id] = 0 if parent is None else self.depth[parent] + 1
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    def tree_rows(self) -> Iterator[Tuple[int, Optional[int], int]]:
+        for _id in sorted(self.parent):
+            yield _id, self.parent[_id], self.depth[_id]
+
+    def closure_rows(self) -> Iterator[Tuple[int, int, int]]:
+        parent = self.parent
+        for _id in sorted(parent):
+            node, distance = _id, 0
+            while node is not None:
+                yield node, _id, distance
+                node, distance = parent[node], distance + 1
+
+
+def load_hierarchy(name: str, cur) -> Hierarchy:
+    src = SOURCES[name]
+    cur.execute(f"SELECT id, {src.code_col} FROM {src.table};")
+    return Hierarchy(name, cur.fetchall())
+
+
+def _copy_sql(h: Hierarchy) -> List[Tuple[str, Iterable[Sequence]]]:
+    """[(COPY ..., строки)] для таблиц иерархии h."""
+    return [
+        (f"COPY public.{h.name}_tree (id, parent_id, depth) FROM STDIN", h.tree_rows()),
+        (f"COPY public.{h.name}_closure (ancestor_id, descendant_id, distance) FROM STDIN",
+         h.closure_rows()),
+    ]
+
+
+def write_script(hierarchies: Sequence[Hierarchy], out: IO[str]) -> None:
+    """SQL-скрипт для psql: DDL, TRUNCATE и COPY, одной транзакцией."""
+    out.write("-- Иерархия справочников, сгенерировано dict_hierarchy.py\nBEGIN;\n")
+    for h in hierarchies:
+        out.write(_DDL.format(name=h.name) + '\n')
+        out.write(f"TRUNCATE public.{h.name}_tree, public.{h.name}_closure;\n")
+        for copy, rows in _copy_sql(h):
+            out.write(copy + ';\n')
+            for row in rows:
+                out.write(copy_line(row))
+            out.write('\\.\n')
+    out.write("COMMIT;\n")
+
+
+def load(hierarchies: Sequence[Hierarchy], cur) -> None:
+    """То же, что write_script, на курсоре; транзакцией управляет вызывающий код."""
+    for h in hierarchies:
+        cur.execute(_DDL.format(name=h.name))
+        cur.execute(f"TRUNCATE public.{h.name}_tree, public.{h.name}_closure;")
+        for copy, rows in _copy_sql(h):
+            with tempfile.TemporaryFile('w+', encoding='utf-8', newline='\n') as spool:
+                for row in rows:
+                    spool.write(copy_line(row))
+                spool.seek(0)
+                cur.copy_expert(copy, spool)
+
+
+# ───── CLI ─────
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(
+        description="Иерархия (родитель, глубина, замыкание) справочников ББК / УДК / ГРНТИ")
+    ap.add_argument('dsn')
+    ap.add_argument('dictionaries', nargs='*', metavar='dictionary',
+                    help='udc, grnti, bbk (по умолчанию — все)')
+    ap.add_argument('--output', metavar='FILE',
+                    help='записать SQL-скрипт для psql вместо загрузки в БД')
+    args = ap.parse_args(argv)
+    names = args.dictionaries or sorted(INDEXES)
+    unknown = [n for n in names if n not in INDEXES]
+    if unknown:
+        ap.error(f"неизвестный справочник: {', '.join(unknown)} (есть: {', '.join(sorted(INDEXES))})")
+
+    import psycopg2
+    with psycopg2.connect(args.dsn) as conn, conn.cursor() as cur:
+        hierarchies = [load_hierarchy(name, cur) for name in names]
+        if args.output is None:
+            load(hierarchies, cur)
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8', newline='\n') as out:
+            write_script(hierarchies, out)
+    for h in hierarchies:
+        roots = sum(1 for p in h.parent.values() if p is None)
+        print(f"{SOURCES[h.name].title:<6}: кодов {len(h)}, корней {roots}, "
+              f"глубина до {max(h.depth.values(), default=0)}")
+    print(f"Сохранено в {args.output}" if args.output else "Загружено в БД")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+dict_import.py — единый потоковый импорт справочников ББК / УДК / ГРНТИ.
+
+udc_excel_to_sql / grnti_excel_to_sql читали всю книгу в pandas, а
+bbk_csv_to_sql собирал полный список записей, и все три писали по
+INSERT ... ON CONFLICT на код.  Здесь источник читается построчно:
+
+  • xlsx — openpyxl в режиме read_only (строки первого листа, две
+    колонки, без загрузки книги целиком);
+  • csv  — csv.reader по строкам (ББК: cp1251, разделитель ‘;’);
+
+и строки идут в прежнюю логику склейки строк-продолжений
+(udc_excel_to_sql.rows_to_records, bbk_csv_to_sql.iter_records).
+Память не зависит от размера таблицы.
+
+Вывод:
+  • copy   — SQL-скрипт для psql: COPY во временную таблицу и
+             INSERT ... SELECT ... ON CONFLICT DO NOTHING в исходном
+             порядке строк (id выдаются так же, как прежними INSERT-ами);
+  • insert — прежний формат, по INSERT на код;
+  • --load DSN — то же, что copy, но сразу в БД (copy_expert).
+
+Обновление (--refresh DSN) вместо полной перезаливки: текущая таблица
+читается в словарь код &rarr; описание, записи источника проходят по нему
+одним проходом (hash join), и пишутся только INSERT новых кодов, UPDATE
+изменившихся описаний и DELETE исчезнувших кодов (с --keep-missing — без
+удалений; удаление кода каскадом удаляет и связи книг с ним).  Без
+output изменения применяются сразу, одной транзакцией.  Если SHA-256
+файла-источника совпадает с записанной в --state при прошлом применённом
+обновлении той же БД (тот же DSN), работа пропускается (--force —
+обновить всё равно).  Запись SQL разницы в файл состояние не меняет:
+применён ли файл, неизвестно.
+
+CLI:
+    python dict_import.py udc   udc.xlsx   udc_copy.sql
+    python dict_import.py grnti grnti.xlsx grnti.sql --format insert
+    python dict_import.py bbk   bbk.csv    --load "<DSN>" [--encoding cp1251]
+    python dict_import.py udc   udc.xlsx   [diff.sql] --refresh "<DSN>"
+"""
+
+from __future__ import annotations
+import os
+import csv
+import sys
+import json
+import hashlib
+import argparse
+import tempfile
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+import bbk_csv_to_sql
+import udc_excel_to_sql
+import grnti_excel_to_sql
+from pg_copy import copy_line
+from sql_output import sql_escape
+
+
+# ───── источники ─────
+def _cell_text(v) -> str:
+    """Значение ячейки как строка (как pandas dtype=str + fillna(''))."""
+    if v is None:
+        return ''
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+def iter_xlsx_rows(path: str, encoding: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """(код, описание) — первые две колонки первого листа, построчно."""
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in wb.worksheets[0].iter_rows(min_col=1, max_col=2, values_only=True):
+            row = tuple(row) + (None, None)
+            yield _cell_text(row[0]), _cell_text(row[1])
+    finally:
+        wb.close()
+
+
+def iter_csv_rows(path: str, encoding: Optional[str] = None) -> Iterator[list]:
+    with open(path, encoding=encoding or bbk_csv_to_sql.DEFAULT_ENC, newline='') as f:
+        yield from csv.reader(f, delimiter=bbk_csv_to_sql.DELIM)
+
+
+class DictSource(NamedTuple):
+    table   : str
+    code_col: str
+    title   : str                                   # для заголовка дампа
+    reader  : Callable[[str, Optional[str]], Iterable]
+    records : Callable[[Iterable], Iterable[Tuple[str, str]]]
+
+SOURCES = {
+    'udc'  : DictSource('public.udc', 'udc_abb', 'УДК', iter_xlsx_rows,
+                        udc_excel_to_sql.rows_to_records),
+    'grnti': DictSource('public.grnti', 'grnti_code', 'ГРНТИ', iter_xlsx_rows,
+                        grnti_excel_to_sql.rows_to_records),
+    'bbk'  : DictSource('public.bbk', 'bbk_abb', 'ББК', iter_csv_rows,
+                        bbk_csv_to_sql.iter_records),
+}
+
+
+def iter_records(name: str, path: str, encoding: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """Склеенные записи (код, описание) справочника name из файла path."""
+    src = SOURCES[name]
+    return iter(src.records(src.reader(path, encoding)))
+
+
+# ───── вывод ─────
+def write_inserts(name: str, records: Iterable[Tuple[str, str]], out: TextIO,
+                  src_name: str) -> int:
+    """Прежний формат: INSERT ... ON CONFLICT на каждый код."""
+    src = SOURCES[name]
+    out.write(f"-- INSERT-ы {src.title}, сгенерировано из {src_name}\n")
+    n = 0
+    for code, desc in records:
+        out.write(
+            f"INSERT INTO {src.table} ({src.code_col}, description) "
+            f"VALUES ('{sql_escape(code)}', '{sql_escape(desc)}') "
+            f"ON CONFLICT ({src.code_col}) DO NOTHING;\n")
+        n += 1
+    return n
+
+
+def _staging_sql(name: str) -> Tuple[str, str, str]:
+    """(CREATE TEMP TABLE, COPY, INSERT ... SELECT) для справочника name."""
+    src = SOURCES[name]
+    stg = f"_stg_{name}"
+    return (
+        f"CREATE TEMP TABLE {stg} (n BIGSERIAL, code TEXT, description TEXT) ON COMMIT DROP;",
+        f"COPY {stg} (code, description) FROM STDIN",
+        f"INSERT INTO {src.table} ({src.code_col}, description) "
+        f"SELECT code, description FROM {stg} ORDER BY n "
+        f"ON CONFLICT ({src.code_col}) DO NOTHING;")
+
+
+def write_copy(name: str, records: Iterable[Tuple[str, str]], out: TextIO,
+               src_name: str) -> int:
+    """SQL-скрипт для psql: COPY во временную таблицу + перенос с ON CONFLICT."""
+    create, copy, insert = _staging_sql(name)
+    out.write(f"-- COPY {SOURCES[name].title}, сгенерировано из {src_name}\n"
+              f"BEGIN;\n{create}\n{copy};\n")
+    n = 0
+    for rec in records:
+        out.write(copy_line(rec))
+        n += 1
+    out.write(f"\\.\n{insert}\nCOMMIT;\n")
+    return n
+
+
+def load_records(name: str, records: Iterable[Tuple[str, str]], cur) -> Tuple[int, int]:
+    """
+    COPY записей в БД через временную таблицу; транзакцией управляет
+    вызывающий код.  Возвращает (прочитано, вставлено новых).
+    """
+    create, copy, insert = _staging_sql(name)
+    n = 0
+    with tempfile.TemporaryFile('w+', encoding='utf-8', newline='\n') as spool:
+        for rec in records:
+            spool.write(copy_line(rec))
+            n += 1
+        spool.seek(0)
+        cur.execute(create)
+        cur.copy_expert(copy, spool)
+    cur.execute(insert)
+    return n, cur.rowcount
+
+
+# ───── обновление по разнице ─────
+DEFAULT_STATE = 'dict_refresh.json'
+REFRESH_BATCH = 500
+
+
+class DictDiff(NamedTuple):
+    inserts  : List[Tuple[str, str]]
+    updates  : List[Tuple[str, str]]        # (код, новое описание)
+    deletes  : List[str]
+    unchanged: int
+
+
+def load_current(name: str, cur) -> Dict[str, Optional[str]]:
+    """Текущая таблица справочника: код &rarr; описание."""
+    src = SOURCES[name]
+    cur.execute(f"SELECT id, {src.code_col}, description FROM {src.table};")
+    return {code: desc for _id, code, desc in cur.fetchall()}
+
+
+def diff_records(records: Iterable[Tuple[str, str]], current: Dict[str, Optional[str]],
+                 keep_missing: bool = False) -> DictDiff:
+    """
+    Hash join записей источника с текущей таблицей.  Повторный код в
+    источнике не учитывается — как и прежде при ON CONFLICT DO NOTHING.
+    """
+    inserts: List[Tuple[str, str]] = []
+    updates: List[Tuple[str, str]] = []
+    seen = set()
+    unchanged = 0
+    for code, desc in records:
+        if code in seen:
+            continue
+        seen.add(code)
+        if code not in current:
+            inserts.append((code, desc))
+        elif current[code] != desc:
+            updates.append((code, desc))
+        else:
+            unchanged += 1
+    deletes = [] if keep_missing else [code for code in current if code not in seen]
+    return DictDiff(inserts, updates, deletes, unchanged)
+
+
+def diff_statements(name: str, diff: DictDiff) -> Iterator[str]:
+    """SQL-операторы, применяющие diff к таблице справочника."""
+    src = SOURCES[name]
+    for i in range(0, len(diff.deletes), REFRESH_BATCH):
+        codes = ', '.join(f"'{sql_escape(c)}'" for c in diff.deletes[i:i + REFRESH_BATCH])
+        yield f"DELETE FROM {src.table} WHERE {src.code_col} IN ({codes});"
+    for code, desc in diff.updates:
+        yield (f"UPDATE {src.table} SET description = '{sql_escape(desc)}' "
+               f"WHERE {src.code_col} = '{sql_escape(code)}';")
+    for code, desc in diff.inserts:
+        yield (f"INSERT INTO {src.table} ({src.code_col}, description) "
+               f"VALUES ('{sql_escape(code)}', '{sql_escape(desc)}') "
+               f"ON CONFLICT ({src.code_col}) DO NOTHING;")
+
+
+def file_checksum(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _read_state(path: str) -> Dict[str, dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_state(path: str, state: Dict[str, dict]) -> None:
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def _state_key(name: str, dsn: str) -> str:
+    """Ключ состояния: справочник и БД (хэш DSN — без пароля в открытом виде)."""
+    return f"{name}@{hashlib.sha256(dsn.encode('utf-8')).hexdigest()[:16]}"
+
+
+def refresh(name: str, path: str, dsn: str, output: Optional[str] = None, *,
+            encoding: Optional[str] = None, state_path: str = DEFAULT_STATE,
+            force: bool = False, keep_missing: bool = False) -> Optional[DictDiff]:
+    """
+    Обновляет справочник name по файлу path: пишет операторы разницы в
+    output или (output=None) применяет их в БД.  None — источник не
+    менялся с прошлого обновления этой БД, ничего не сделано.  Состояние
+    записывается только после применения в БД.
+    """
+    checksum = file_checksum(path)
+    state = _read_state(state_path)
+    key = _state_key(name, dsn)
+    if not force and state.get(key, {}).get('sha256') == checksum:
+        return None
+
+    import psycopg2
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
+        current = load_current(name, cur)
+        diff = diff_records(iter_records(name, path, encoding), current, keep_missing)
+        if output is None:
+            batch: List[str] = []
+            for stmt in diff_statements(name, diff):
+                batch.append(stmt)
+                if len(batch) >= REFRESH_BATCH:
+                    cur.execute('\n'.join(batch))
+                    batch.clear()
+            if batch:
+                cur.execute('\n'.join(batch))
+    if output is not None:
+        with open(output, 'w', encoding='utf-8', newline='\n') as out:
+            out.write(f"-- Обновление {SOURCES[name].title} по {path}\nBEGIN;\n")
+            for stmt in diff_statements(name, diff):
+                out.write(stmt + '\n')
+            out.write("COMMIT;\n")
+
+    if output is None:
+        state[key] = {'source': path, 'sha256': checksum,
+                      'refreshed': datetime.now().isoformat(timespec='seconds')}
+        _write_state(state_path, state)
+    return diff
+
+
+# ───── CLI ─────
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(
+        description="Потоковый импорт справочников ББК / УДК / ГРНТИ (xlsx / csv)")
+    ap.add_argument('dictionary', choices=sorted(SOURCES))
+    ap.add_argument('source', help='udc / grnti — .xlsx, bbk — .csv')
+    ap.add_argument('output', nargs='?', help='файл SQL (не нужен с --load)')
+    ap.add_argument('--format', choices=('copy', 'insert'), default='copy',
+                    help='copy — COPY через временную таблицу (по умолчанию), '
+                         'insert — по INSERT на код, как прежние скрипты')
+    ap.add_argument('--load', metavar='DSN',
+                    help='загрузить прямо в БД по DSN вместо записи файла')
+    ap.add_argument('--encoding',
+                    help=f'кодировка CSV (по умолчанию {bbk_csv_to_sql.DEFAULT_ENC})')
+    ap.add_argument('--refresh', metavar='DSN',
+                    help='обновить таблицу по разнице с текущим содержимым: '
+                         'в output — SQL разницы, без output — сразу в БД')
+    ap.add_argument('--state', default=DEFAULT_STATE, metavar='FILE',
+                    help=f'с --refresh: контрольные суммы источников, применённых в БД '
+                         f'(по умолчанию {DEFAULT_STATE})')
+    ap.add_argument('--force', action='store_true',
+                    help='с --refresh: не пропускать неизменившийся источник')
+    ap.add_argument('--keep-missing', action='store_true',
+                    help='с --refresh: не удалять коды, которых нет в источнике '
+                         '(удаление каскадом удаляет связи книг)')
+    args = ap.parse_args(argv)
+    if not args.load and not args.output and not args.refresh:
+        ap.error("нужен output, --load или --refresh")
+
+    if args.refresh:
+        try:
+            diff = refresh(args.dictionary, args.source, args.refresh, args.output,
+                           encoding=args.encoding, state_path=args.state,
+                           force=args.force, keep_missing=args.keep_missing)
+        except FileNotFoundError as e:
+            sys.exit(f"Ошибка: файл {e.filename} не найден")
+        except ImportError as e:
+            sys.exit(f"Ошибка: нужен пакет {e.name} (pip install {e.name})")
+        if diff is None:
+            print(f"{args.source} не изменился с прошлого обновления этой БД ({args.state}) — пропущено")
+            return
+        where = args.output or 'БД'
+        print(f"Обновление {SOURCES[args.dictionary].title} &rarr; {where}: новых {len(diff.inserts)}, "
+              f"изменённых {len(diff.updates)}, удалённых {len(diff.deletes)}, "
+              f"без изменений {diff.unchanged}")
+        return
+
+    try:
+        records = iter_records(args.dictionary, args.source, args.encoding)
+        if args.load:
+            import psycopg2
+            with psycopg2.connect(args.load) as conn, conn.cursor() as cur:
+                n, added = load_records(args.dictionary, records, cur)
+            print(f"Загружено {args.dictionary}: записей {n}, новых {added}")
+            return
+        write = write_copy if args.format == 'copy' else write_inserts
+        with open(args.output, 'w', encoding='utf-8', newline='\n') as out:
+            n = write(args.dictionary, records, out, args.source)
+    except FileNotFoundError as e:
+        sys.exit(f"Ошибка: файл {e.filename} не найден")
+    except ImportError as e:
+        sys.exit(f"Ошибка: нужен пакет {e.name} (pip install {e.name})")
+    print(f"Сохранено {n} записей {SOURCES[args.dictionary].title} в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+dict_snapshot.py — локальный снимок справочников UDC / GRNTI / BBK.
+
+Справочники читаются из БД один раз и сохраняются на диск (pickle)
+уже в том виде, в каком их отдают load_udc_map / load_grnti_map /
+load_bbk_map, т.е. с нормализованными ключами; bbk_desc — строки
+(id, код, описание) для сопоставления рубрик (bbk_index).  При следующих запусках:
+
+  • онлайн  — на сервере считается контрольная сумма таблицы
+              (count(*) + md5 от пар id:код); если она совпала со
+              снимком, словарь берётся из снимка без выгрузки строк
+              и повторной нормализации;
+  • offline — снимок используется как есть, БД и psycopg2 не нужны.
+
+CLI:
+    python dict_snapshot.py "<DSN>" snapshot.pkl     — создать / обновить
+    python dict_snapshot.py --info snapshot.pkl      — показать содержимое
+"""
+
+from __future__ import annotations
+import os
+import pickle
+import sys
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from fix_udc   import load_udc_map
+from fix_grnti import load_grnti_map
+from fix_bbk   import load_bbk_map, load_bbk_entries
+
+SNAPSHOT_VERSION = 1
+
+# имя &rarr; (таблица, колонка кода, загрузчик словаря)
+DICTIONARIES: Dict[str, Tuple[str, str, Callable]] = {
+    'udc'  : ('public.udc',   'udc_abb',    load_udc_map),
+    'grnti': ('public.grnti', 'grnti_code', load_grnti_map),
+    'bbk'  : ('public.bbk',   'bbk_abb',    load_bbk_map),
+    'bbk_desc': ('public.bbk', "bbk_abb || ':' || coalesce(description, '')", load_bbk_entries),
+}
+
+
+def table_checksum(cur, name: str) -> Tuple[int, str]:
+    table, col, _ = DICTIONARIES[name]
+    cur.execute(
+        f"SELECT count(*), coalesce(md5(string_agg(id::text || ':' || {col}, ',' ORDER BY id)), '') "
+        f"FROM {table};")
+    count, digest = cur.fetchone()
+    return int(count), digest
+
+
+def read_snapshot(path: str) -> Dict:
+    with open(path, 'rb') as f:
+        snap = pickle.load(f)
+    if snap.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"{path}: неподдерживаемая версия снимка {snap.get('version')}")
+    return snap
+
+
+def write_snapshot(path: str, snap: Dict) -> None:
+    snap['version'] = SNAPSHOT_VERSION
+    snap['created'] = datetime.now().isoformat(timespec='seconds')
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(snap, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_dictionaries(
+    dsn: Optional[str],
+    names: Iterable[str] = ('udc', 'grnti'),
+    snapshot: Optional[str] = None,
+    offline: bool = False,
+) -> Dict[str, Dict]:
+    """
+    Возвращает {имя: словарь} для запрошенных справочников.
+
+    snapshot=None — как раньше, прямая загрузка из БД;
+    snapshot=path — сверка со снимком по контрольной сумме, снимок
+                    дописывается / обновляется при расхождении;
+    offline=True  — только снимок, без подключения к БД.
+    """
+    names = list(names)
+    snap: Dict = {'tables': {}}
+    if snapshot and os.path.exists(snapshot):
+        snap = read_snapshot(snapshot)
+
+    if offline:
+        if not snapshot:
+            raise ValueError("offline-режим требует файл снимка справочников")
+        missing = [n for n in names if n not in snap['tables']]
+        if missing:
+            raise ValueError(f"в снимке {snapshot} нет справочников: {', '.join(missing)}")
+        return {n: snap['tables'][n]['map'] for n in names}
+
+    import psycopg2
+
+    result: Dict[str, Dict] = {}
+    changed = False
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
+        for name in names:
+            loader = DICTIONARIES[name][2]
+            if not snapshot:
+                result[name] = loader(cur)
+                continue
+            checksum = table_checksum(cur, name)
+            cached = snap['tables'].get(name)
+            if cached and cached['checksum'] == checksum:
+                result[name] = cached['map']
+                continue
+            result[name] = loader(cur)
+            snap['tables'][name] = {'checksum': checksum, 'map': result[name]}
+            changed = True
+
+    if changed:
+        write_snapshot(snapshot, snap)
+    return result
+
+
+# ───── CLI ─────
+def _cli(argv) -> None:
+    if len(argv) == 2 and argv[0] == '--info':
+        snap = read_snapshot(argv[1])
+        print(f"Снимок {argv[1]} от {snap.get('created')}")
+        for name, t in snap['tables'].items():
+            count, digest = t['checksum']
+            print(f"  {name:<8}: строк {count}, ключей {len(t['map'])}, md5 {digest}")
+        return
+    if len(argv) != 2:
+        sys.exit("Использование:\n"
+                 "  python dict_snapshot.py \"<строка-DSN>\" <snapshot.pkl>\n"
+                 "  python dict_snapshot.py --info <snapshot.pkl>")
+    dsn, path = argv
+    maps = load_dictionaries(dsn, DICTIONARIES, snapshot=path)
+    print(f"Снимок {path}: " + ", ".join(f"{n} {len(m)}" for n, m in maps.items()))
+
+if __name__ == "__main__":
+    _cli(sys.argv[1:])
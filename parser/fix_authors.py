@@ -26,16 +26,25 @@ split_authors(raw: str) -> list[str]
     Разбивает строку вида &laquo;Иванов И.И.; Петров П.П.&raquo;
     на список индивидуально нормализованных авторов
     без точных дубликатов.
+
+record_authors(rec: IrbisRecord) -> set[str]
+    Нормализованные авторы из полей #700 / #701 уже разобранной
+    записи (подполя берутся из IrbisField, без повторного разбора).
 """
 
 from __future__ import annotations
 
 import re
-from typing import Dict, List
+from typing import Dict, List, Set
+
+from irbis_record import IrbisRecord, SUBFIELD_SEP as _SUBFIELD_SEP
+from memo import memoize
 
 # ─────────────────────────── helpers ────────────────────────────
-_SUBFIELD_SEP = "\x1f"          # разделитель подполя в ИРБИС-экспорте
 _INITIAL_RE = re.compile(r"^[A-ZА-ЯЁ]$", re.IGNORECASE)   # однобуквенная инициала
+_SPACES_RE      = re.compile(r"\s+")
+_NOT_INITIAL_RE = re.compile(r"[^A-Za-zА-Яа-яЁё.]")        # не буква и не точка
+_LETTER_RE      = re.compile(r"[A-Za-zА-Яа-яЁё]")
 
 
 def _parse_subfields(field_text: str) -> Dict[str, str]:
@@ -45,6 +54,10 @@ def _parse_subfields(field_text: str) -> Dict[str, str]:
     в словарь {'A': 'Иванов', 'B': 'И.О.'}.
 
     В экспортах ИРБИС иногда вместо \x1f используют '^'.
+
+    Разбор авторов сознательно отличается от irbis_record.iter_subfields:
+    код подполя учитывает регистр, а '^' заменяется всегда — подполя
+    `^a` / `^b` в авторы не попадают, как и до общего разбора записей.
     """
     text = field_text.replace("^", _SUBFIELD_SEP)
     parts = text.split(_SUBFIELD_SEP)
@@ -64,15 +77,15 @@ def _normalize_initials(text: str) -> str:
     Если встречаются неожиданные символы (не буквы, пробелы или точки),
     возвращается исходная строка без изменений.
     """
-    text = re.sub(r"\s+", "", text)             # убираем все пробелы
+    text = _SPACES_RE.sub("", text)             # убираем все пробелы
     if not text:
         return ""
 
     # допустимы только буквы и точки
-    if re.search(r"[^A-Za-zА-Яа-яЁё.]", text):
+    if _NOT_INITIAL_RE.search(text):
         return text
 
-    letters = re.findall(r"[A-Za-zА-Яа-яЁё]", text)
+    letters = _LETTER_RE.findall(text)
     if not letters:
         return text
 
@@ -86,12 +99,16 @@ def parse_author_700_701(field_text: str) -> str:
     &laquo;^AПетров^BП.П.&raquo;            &rarr; &laquo;Петров П.П.&raquo;
     Если фамилия или инициалы отсутствуют, возвращается то, что найдено.
     """
-    subf = _parse_subfields(field_text)
+    return _author_from_subfields(_parse_subfields(field_text))
+
+
+def _author_from_subfields(subf: Dict[str, str]) -> str:
     last_name = subf.get("A", "").strip()
     initials = _normalize_initials(subf.get("B", ""))
     return f"{last_name} {initials}".strip()
 
 
+@memoize
 def normalize_author(full: str) -> str:
     """
     &laquo;Евтеев  Ю.И.&raquo;     &rarr; &laquo;Евтеев Ю.И.&raquo;
@@ -101,7 +118,7 @@ def normalize_author(full: str) -> str:
     """
     # унифицируем пробелы и убираем узкие неразрывные
     full = full.replace("\u202f", " ")
-    full = re.sub(r"\s+", " ", full).strip()
+    full = _SPACES_RE.sub(" ", full).strip()
 
     if not full:
         return ""
@@ -131,4 +148,16 @@ def split_authors(raw: str) -> List[str]:
         token = normalize_author(token)
         if token and token not in out:
             out.append(token)
-    return out
\ No newline at end of file
+    return out
+
+
+def record_authors(rec: IrbisRecord) -> Set[str]:
+    """
+    Множество нормализованных авторов из #700 / #701 записи.
+    """
+    authors: Set[str] = set()
+    for fld in rec.get_all("700", "701"):
+        a = _author_from_subfields(_parse_subfields(fld.text))
+        if a:
+            authors.add(normalize_author(a))
+    return authors
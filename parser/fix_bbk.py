@@ -7,7 +7,8 @@ fix_bbk.py — нормализация кодов ББК.
 from typing import Dict, List, Tuple
 import sys
 import re
-import psycopg2
+
+from irbis_record import IrbisRecord
 
 # Регулярное выражение для разделения кодов ББК по внешним разделителям
 _SPLIT_CODES_RE = re.compile(r'[;,]\s*|\s{2,}')
@@ -17,12 +18,19 @@ _SUBFIELD_SPLIT_RE = re.compile(r'[A-Z]')
 _SUBFIELD_PREFIX_RE = re.compile(r'^[A-Z]\s*')
 # Регулярное выражение для удаления однобуквенных префиксов (A, B, G и т.д.) в начале
 _PREFIX_RE = re.compile(r'^[A-Z]\s*')
+# Скобки с содержимым, например (ЕТГС)
+_PARENS_RE = re.compile(r'\([^)]*\)')
 
 def load_bbk_map(cur) -> Dict[str, int]:
     cur.execute("SELECT id, bbk_abb FROM public.bbk;")
     # ключи в UPPER для регистронезависимого поиска
     return {code.upper(): _id for _id, code in cur.fetchall()}
 
+def load_bbk_entries(cur) -> List[Tuple[int, str, str]]:
+    """Строки справочника (id, код, описание) — для bbk_index.BbkIndex."""
+    cur.execute("SELECT id, bbk_abb, description FROM public.bbk ORDER BY id;")
+    return [tuple(r) for r in cur.fetchall()]
+
 def filter_links(
     pairs: List[Tuple[int, str]], bbk_map: Dict[str, int]
 ) -> Tuple[List[Tuple[int, int]], int]:
@@ -65,14 +73,19 @@ def collect(pairs: List[Tuple[str, str]]) -> List[str]:
                 if not subfield:
                     continue
                 # Удаляем скобки с содержимым, например, (ЕТГС)
-                subfield = re.sub(r'\([^)]*\)', '', subfield).strip()
+                subfield = _PARENS_RE.sub('', subfield).strip()
                 # Приводим к формату Title Case
                 subfield = subfield.title()
                 if subfield:
                     codes.append(subfield)
     return codes
 
+def collect_record(rec: IrbisRecord) -> List[str]:
+    """collect() по полям 606 / 610 разобранной записи (в порядке записи)."""
+    return collect([(fld.tag, fld.text.strip()) for fld in rec.get_all('606', '610')])
+
 def _cli(dsn: str) -> None:
+    import psycopg2
     with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
         bbk_map = load_bbk_map(cur)
         cur.execute("SELECT book_id, bbk_code FROM public.book_bbk_raw;")
@@ -17,13 +17,19 @@ public.grnti.
 3. filter_links()     — фильтрует (book_id, raw_code), возвращая
                         a) links  — совпавшие пары для book_grnti
                         b) skipped — сколько строк не сопоставилось.
+                        Каждый различный код нормализуется и ищется один
+                        раз (link_filter); вместо строки лога на каждую
+                        пропущенную пару — гистограмма по кодам.
 """
 
 from __future__ import annotations
-from typing import Dict, List, Tuple
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import re
 import sys
-import psycopg2
+
+import link_filter
+from memo import memoize
 
 
 # ────────────────────────────────
@@ -32,6 +38,7 @@ import psycopg2
 _CLEAN_RE = re.compile(r"[^0-9.]")           # всё, кроме цифр и точек
 
 
+@memoize
 def _normalize_code(code: str) -> str:
     """
     Приводит строку к формату **XX.YY.ZZ** (2-значные сегменты,
@@ -81,44 +88,66 @@ def load_grnti_map(cur) -> Dict[str, int]:
 def filter_links(
     pairs: List[Tuple[int, str]],
     grnti_map: Dict[str, int],
+    skips: Optional[Counter] = None,
 ) -> Tuple[List[Tuple[int, int]], int]:
     """
     • pairs      — список (book_id, raw_code) из экспорта
     • grnti_map  — результат load_grnti_map()
+    • skips      — если передан, пополняется гистограммой
+                   {нормализованный код: число пропущенных пар}
 
     Возвращает:
         links    — валидные (book_id, grnti_id) для вставки в book_grnti
         skipped  — количество строк, код которых не найден
     """
-    links: List[Tuple[int, int]] = []
-    skipped = 0
+    return link_filter.filter_links(pairs, grnti_map, _normalize_code, skips)
 
-    for book_id, raw_code in pairs:
-        norm = _normalize_code(raw_code)
-        grnti_id = grnti_map.get(norm)
-        if grnti_id is not None:
-            links.append((book_id, grnti_id))
-        else:
-            skipped += 1
 
-    return links, skipped
+def filter_links_hierarchical(
+    pairs: List[Tuple[int, str]], index, skips: Optional[Counter] = None,
+    levels: Optional[Counter] = None,
+) -> Tuple[List[Tuple[int, int]], int]:
+    """
+    Как filter_links, но по code_trie.GrntiIndex: код без точного
+    совпадения сводится к XX.YY.00, затем к XX.00.00.
+    """
+    return link_filter.filter_resolved_links(pairs, index.resolve, _normalize_code, skips, levels)
+
+
+def iter_links(
+    pairs: Iterable[Tuple[int, str]], grnti_map: Dict[str, int],
+    skips: Optional[Counter] = None, index=None, levels: Optional[Counter] = None,
+) -> Iterator[Tuple[int, int]]:
+    """
+    Потоковый filter_links (с index — filter_links_hierarchical): пары
+    читаются и отдаются по одной, без списков в памяти.
+    """
+    if index is not None:
+        return link_filter.iter_resolved_links(pairs, index.resolve, _normalize_code, skips, levels)
+    return link_filter.iter_links(pairs, grnti_map, _normalize_code, skips)
 
 
 # ────────────────────────────────
 # 4. CLI-режим (статистика)
 # ────────────────────────────────
 def _cli(dsn: str) -> None:
+    import psycopg2
     with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
         grnti_map = load_grnti_map(cur)
         cur.execute("SELECT book_id, grnti_code FROM public.book_grnti_raw;")
         raw_pairs = cur.fetchall()
 
-        links, skipped = filter_links(raw_pairs, grnti_map)
+        skips: Counter = Counter()
+        links, skipped = filter_links(raw_pairs, grnti_map, skips)
 
         print("Статистика проверки GRNTI:")
         print(f"  Всего строк         : {len(raw_pairs)}")
         print(f"  Найдено соответствий: {len(links)}")
         print(f"  Пропущено (битые)   : {skipped}")
+        if skips:
+            print(f"  Различных пропусков : {len(skips)}")
+            for code, n in skips.most_common(20):
+                print(f"    {code:<10} {n:>7}")
 
 
 # ────────────────────────────────
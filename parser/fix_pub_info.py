@@ -4,7 +4,13 @@ from __future__ import annotations
 import re
 from typing import Optional, Tuple
 
+from irbis_record import IrbisRecord
+from memo import memoize
+
 _RE_YEAR = re.compile(r'(\d{4})\s*$')  # год, 4 цифры в конце
+_RE_SPACES = re.compile(r'\s+')
+_RE_TOKEN_SEP = re.compile(r'[;,]')
+_RE_CITY_WORD = re.compile(r'[A-ZА-ЯЁ][A-Za-zА-Яа-яёЁ\-]+')
 
 # Популярные аббревиатуры / синонимы для городов
 _CITY_ABBR = {
@@ -39,13 +45,13 @@ _PUBLISHER_HINTS = (
 def _cleanup(token: str) -> str:
     """Удаляем лишние пробелы и кавычки-ёлочки."""
     token = token.strip().strip('«»“”"')
-    return re.sub(r'\s+', ' ', token)
+    return _RE_SPACES.sub(' ', token)
 
 def _looks_like_city(token: str) -> bool:
     """Грубая эвристика для определения города."""
     if token in _CITY_ABBR:
         return True
-    if re.fullmatch(r'[A-ZА-ЯЁ][A-Za-zА-Яа-яёЁ\-]+', token):
+    if _RE_CITY_WORD.fullmatch(token):
         return True
     if token.endswith(('ск', 'ск-на-Дону', 'бург', 'град', 'город', 'инск', 'поль', 'од')):
         return True
@@ -55,6 +61,7 @@ def _looks_like_publisher(token: str) -> bool:
     low = token.lower()
     return any(h in low for h in _PUBLISHER_HINTS)
 
+@memoize
 def parse_pub_info(raw: str) -> Tuple[Optional[str], Optional[str], Optional[int]]:
     """Главная точка входа."""
     if not raw:
@@ -70,7 +77,7 @@ def parse_pub_info(raw: str) -> Tuple[Optional[str], Optional[str], Optional[int
         txt = txt[:m.start()].rstrip(' ,;')
 
     # 2. Разбиваем остаток по запятым/точкам-с-запятой
-    tokens = [_cleanup(t) for t in re.split(r'[;,]', txt) if t.strip()]
+    tokens = [_cleanup(t) for t in _RE_TOKEN_SEP.split(txt) if t.strip()]
 
     publisher = city = None
     for token in tokens:
@@ -88,4 +95,14 @@ def parse_pub_info(raw: str) -> Tuple[Optional[str], Optional[str], Optional[int
         elif city is None:
             city = _CITY_ABBR.get(token, token)
 
-    return publisher or None, city or None, year
\ No newline at end of file
+    return publisher or None, city or None, year
+
+def record_pub_info(rec: IrbisRecord) -> Tuple[Optional[str], Optional[str], Optional[int]]:
+    """parse_pub_info() по полю #210 записи (подполя A — город, C — издательство, D — год)."""
+    fld = rec.get('210')
+    raw = ''
+    if fld is not None:
+        sd = fld.subdict()
+        raw = ', '.join(x for x in (
+            sd.get('A', '').strip(), sd.get('C', '').strip(), sd.get('D', '').strip()) if x)
+    return parse_pub_info(raw)
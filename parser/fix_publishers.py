@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fix_publishers.py — канонизация названий издательств.
+
+parse_pub_info() отдаёт издательство как есть, поэтому `Изд-во МИФИ`,
+`МИФИ` и `Издательство "МИФИ"` становились тремя строками
+public.publisher.  Здесь название сводится к ключу:
+
+1. кавычки и пунктуация убираются, регистр и ё/е не различаются;
+2. сокращения раскрываются по _PUBLISHER_ABBR (как _CITY_ABBR в
+   fix_pub_info): `ун-т` &rarr; университет, `моск.` &rarr; московский …;
+3. отбрасываются организационно-правовые формы (ООО, АО, Ltd, GmbH …),
+   служебные слова (издательство, изд. дом, press …) и союзы;
+4. у каждого слова отсекается падежное окончание (_ENDINGS, самое
+   длинное из подходящих, если основа остаётся не короче MIN_STEM), так
+   что `Московского университета` и `Московский университет` совпадают.
+   Слово целиком не укорачивается: `Энергия` и `Энергоатомиздат`,
+   `Техносфера` и `Технология` остаются разными (см. REGRESSION_PAIRS).
+
+PublisherIndex сопоставляет новое название с уже встречавшимися: сначала
+по ключу целиком, затем — для названий из нескольких слов — через
+инвертированный индекс основа &rarr; издательства: кандидаты набираются
+по основам названия, совпадение засчитывается при доле общих основ
+(Жаккар) не ниже JACCARD_MIN.  Каноническим считается первое
+встреченное написание.
+
+CLI:
+    python fix_publishers.py "<DSN>"     — отчёт по public.publisher
+    python fix_publishers.py --check     — проверка на REGRESSION_PAIRS
+"""
+
+from __future__ import annotations
+import re
+import sys
+import math
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from memo import memoize
+
+MIN_STEM = 4
+JACCARD_MIN = 0.75
+
+# Падежные окончания прилагательных и существительных, длинные — первыми
+_ENDINGS = tuple(sorted((
+    'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ами', 'ями',
+    'ый', 'ий', 'ой', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ых', 'их', 'ым', 'им',
+    'ую', 'юю', 'ом', 'ем', 'ам', 'ям', 'ах', 'ях', 'ов', 'ев', 'ей', 'ия', 'ии', 'ию',
+    'а', 'я', 'ы', 'и', 'у', 'ю', 'е', 'о', 'ь',
+), key=len, reverse=True))
+
+# Сокращения в названиях издательств (ключи — в нижнем регистре, без точек)
+_PUBLISHER_ABBR = {
+    'изд'   : 'издательство',
+    'изд-во': 'издательство',
+    'издво' : 'издательство',
+    'издат' : 'издательство',
+    'ун-т'  : 'университет',
+    'ун-та' : 'университет',
+    'ин-т'  : 'институт',
+    'ин-та' : 'институт',
+    'гос'   : 'государственный',
+    'моск'  : 'московский',
+    'ленингр': 'ленинградский',
+    'техн'  : 'технический',
+    'акад'  : 'академия',
+    'лит'   : 'литература',
+    'энерг' : 'энергетический',
+    'физ-мат': 'физико-математический',
+    'физматлит': 'физико-математическая литература',
+}
+
+# Организационно-правовые формы
+_LEGAL_FORMS = {
+    'ооо', 'оао', 'зао', 'пао', 'ао', 'ип', 'гуп', 'фгуп', 'фгбоу', 'фгаоу', 'гоу',
+    'ltd', 'llc', 'inc', 'co', 'corp', 'gmbh', 'ag', 'srl', 'sa', 'plc', 'kg',
+}
+
+# Служебные слова, не отличающие одно издательство от другого
+_GENERIC_WORDS = {
+    'издательство', 'издательский', 'дом', 'издательская', 'группа', 'центр',
+    'publishing', 'publishers', 'publisher', 'press', 'verlag', 'house', 'editions',
+    'и', 'в', 'им', 'имени', 'the', 'of', 'and',
+}
+
+_QUOTES_RE = re.compile(r'[«»“”„"\'`]')
+_TOKEN_RE = re.compile(r'[0-9a-zа-я]+(?:-[0-9a-zа-я]+)*')
+
+
+def _stem(word: str) -> str:
+    """'московского' &rarr; 'московск', 'энергоатомиздат' &rarr; без изменений"""
+    for end in _ENDINGS:
+        if word.endswith(end) and len(word) - len(end) >= MIN_STEM:
+            return word[:-len(end)]
+    return word
+
+
+@memoize
+def publisher_tokens(name: str) -> FrozenSet[str]:
+    """'Изд-во Моск. ун-та' &rarr; {'московск', 'университет'}"""
+    text = _QUOTES_RE.sub(' ', name.lower().replace('ё', 'е'))
+    stems: Set[str] = set()
+    for tok in _TOKEN_RE.findall(text):
+        expanded = _PUBLISHER_ABBR.get(tok, tok)
+        for word in _TOKEN_RE.findall(expanded):
+            if word in _LEGAL_FORMS or word in _GENERIC_WORDS:
+                continue
+            stems.add(_stem(word))
+    return frozenset(stems)
+
+
+def publisher_key(name: str) -> str:
+    """Ключ канонизации: основы через пробел, по алфавиту."""
+    return ' '.join(sorted(publisher_tokens(name)))
+
+
+class PublisherIndex:
+    """Ключ / основы &rarr; каноническое название издательства."""
+
+    def __init__(self):
+        self.by_key: Dict[str, str] = {}
+        self._names: List[str] = []
+        self._tokens: List[FrozenSet[str]] = []
+        self._postings: Dict[str, List[int]] = {}
+        self.merges: List[Tuple[str, str]] = []       # (вариант, каноническое)
+
+    def add(self, name: str) -> None:
+        """Зарегистрировать каноническое название."""
+        tokens = publisher_tokens(name)
+        key = ' '.join(sorted(tokens))
+        if key in self.by_key:
+            return
+        self.by_key[key] = name
+        entry = len(self._names)
+        self._names.append(name)
+        self._tokens.append(tokens)
+        for t in tokens:
+            self._postings.setdefault(t, []).append(entry)
+
+    def match(self, name: str) -> Optional[str]:
+        """Каноническое название, вариантом которого является name, или None."""
+        tokens = publisher_tokens(name)
+        if not tokens:
+            return None
+        found = self.by_key.get(' '.join(sorted(tokens)))
+        if found is None and len(tokens) >= 3:
+            found = self._similar(tokens)
+        if found is not None and found != name:
+            self.merges.append((name, found))
+        return found
+
+    def _similar(self, tokens: FrozenSet[str]) -> Optional[str]:
+        # при сходстве >= JACCARD_MIN общих основ не меньше ⌈JACCARD_MIN·n⌉,
+        # так что кандидата достаточно искать по n − ⌈JACCARD_MIN·n⌉ + 1
+        # самым редким основам
+        n = len(tokens)
+        rare = sorted((self._postings.get(t, ()) for t in tokens), key=len)
+        candidates = set()
+        for posting in rare[:n - math.ceil(JACCARD_MIN * n) + 1]:
+            candidates.update(posting)
+        best, best_sim = None, 0.0
+        for entry in sorted(candidates):            # при равенстве — раньше встреченное
+            other = self._tokens[entry]
+            sim = len(tokens & other) / len(tokens | other)
+            if sim > best_sim:
+                best, best_sim = entry, sim
+        if best is None or best_sim < JACCARD_MIN:
+            return None
+        return self._names[best]
+
+
+# ───── регрессионная проверка ─────
+# (название, название, должны ли совпасть)
+REGRESSION_PAIRS: List[Tuple[str, str, bool]] = [
+    ('Энергия', 'Энергоатомиздат', False),
+    ('Техносфера', 'Технология', False),
+    ('Информатика', 'Информация', False),
+    ('Машиностроение', 'Машиностроитель', False),
+    ('Изд-во Моск. ун-та', 'Московский университет', True),
+    ('Изд-во МИФИ', 'ООО «МИФИ»', True),
+    ('Энергоатомиздат', 'Издательство "Энергоатомиздат"', True),
+]
+
+
+def check() -> List[str]:
+    """Нарушения REGRESSION_PAIRS (пустой список — всё в порядке)."""
+    failures = []
+    for a, b, same in REGRESSION_PAIRS:
+        index = PublisherIndex()
+        index.add(a)
+        merged = index.match(b) == a
+        if merged != same:
+            verb = 'слиты' if merged else 'не слиты'
+            failures.append(f"{a!r} и {b!r} {verb}: {publisher_key(a)!r} / {publisher_key(b)!r}")
+    return failures
+
+
+# ───── CLI ─────
+def _cli(dsn: str) -> None:
+    import psycopg2
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
+        cur.execute("SELECT id, name FROM public.publisher ORDER BY id;")
+        rows = cur.fetchall()
+    index = PublisherIndex()
+    for _id, name in rows:
+        if index.match(name) is None:
+            index.add(name)
+    print(f"Издательств в БД      : {len(rows)}")
+    print(f"После канонизации     : {len(index.by_key)}")
+    for variant, canon in index.merges[:50]:
+        print(f"  {variant!r:<40} &rarr; {canon!r}")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("Использование: python fix_publishers.py \"<строка-DSN>\" | --check")
+    if sys.argv[1] == '--check':
+        failures = check()
+        for line in failures:
+            print(line)
+        if failures:
+            sys.exit(1)
+        print(f"Пар проверено: {len(REGRESSION_PAIRS)}, нарушений нет")
+    else:
+        _cli(sys.argv[1])
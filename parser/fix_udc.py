@@ -3,8 +3,11 @@
 fix_udc.py — полная функциональная копия fix_bbk.py, но для УДК.
 """
 
-from typing import Dict, List, Tuple
-import sys, psycopg2
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import sys
+
+import link_filter
 
 
 def load_udc_map(cur) -> Dict[str, int]:
@@ -13,27 +16,46 @@ def load_udc_map(cur) -> Dict[str, int]:
 
 
 def filter_links(
-    pairs: List[Tuple[int, str]], udc_map: Dict[str, int]
+    pairs: List[Tuple[int, str]], udc_map: Dict[str, int],
+    skips: Optional[Counter] = None,
+) -> Tuple[List[Tuple[int, int]], int]:
+    """Каждый различный код ищется один раз (link_filter); skips — гистограмма пропусков."""
+    return link_filter.filter_links(pairs, udc_map, skips=skips)
+
+
+def filter_links_hierarchical(
+    pairs: List[Tuple[int, str]], index, skips: Optional[Counter] = None,
+    levels: Optional[Counter] = None,
 ) -> Tuple[List[Tuple[int, int]], int]:
-    links, skipped = [], 0
-    for book_id, code in pairs:
-        udc_id = udc_map.get(code)
-        if udc_id:
-            links.append((book_id, udc_id))
-        else:
-            skipped += 1
-    return links, skipped
+    """
+    Как filter_links, но по code_trie.UdcIndex: составные коды делятся на
+    компоненты, детализированные сводятся к ближайшему предку в справочнике.
+    """
+    return link_filter.filter_resolved_links(pairs, index.resolve, skips=skips, levels=levels)
+
+
+def iter_links(pairs: Iterable[Tuple[int, str]], udc_map: Dict[str, int],
+               skips: Optional[Counter] = None,
+               index=None, levels: Optional[Counter] = None) -> Iterator[Tuple[int, int]]:
+    """Потоковый filter_links (с index — filter_links_hierarchical)."""
+    if index is not None:
+        return link_filter.iter_resolved_links(pairs, index.resolve, skips=skips, levels=levels)
+    return link_filter.iter_links(pairs, udc_map, skips=skips)
 
 
 def _cli(dsn: str) -> None:
+    import psycopg2
     with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
         udc_map = load_udc_map(cur)
         cur.execute("SELECT book_id, udc_code FROM public.book_udc_raw;")
         raw_pairs = cur.fetchall()
 
-        links, skipped = filter_links(raw_pairs, udc_map)
+        skips: Counter = Counter()
+        links, skipped = filter_links(raw_pairs, udc_map, skips)
         print(f"Всего пар RAW: {len(raw_pairs)}")
         print(f"Совпали: {len(links)}   |   Пропущены: {skipped}")
+        if skips:
+            print(f"Чаще всего пропущены: {link_filter.format_histogram(skips, 20)}")
 
         print("\nПример INSERT-ов:")
         for book_id, udc_id in links[:10]:
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+gen_irbis_export.py — генератор синтетических экспортов ИРБИС для бенчмарков.
+
+Записи похожи на реальные: теги 200/205/210/215/225/331/606/610/675/
+700/701/903/910/920/964, разделители подполей \\x1f и изредка '^',
+повторяющиеся авторы / издательства / коды с распределением, близким
+к Ципфу, сокращения городов, &laquo;грязные&raquo; коды ГРНТИ (`6.81`,
+`27. 17.00`), детализированные и составные УДК, экземпляры с датами
+в разных форматах, записи чужих баз (#920) и записи без заглавия.
+Генерация детерминирована при одинаковом --seed.
+
+Коды берутся из справочников репозитория (udc.sql, grnti.sql,
+bbk.sql); из них же можно собрать снимок справочников для offline-
+запуска парсера (dict_snapshot.py).
+
+Использование:
+    python gen_irbis_export.py 100000 irbis_100k.txt [--seed 1] [--snapshot snap.pkl]
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import random
+import re
+from typing import Dict, Iterator, List, TextIO, Tuple
+
+from fix_grnti     import _normalize_code as _normalize_grnti
+from dict_snapshot import write_snapshot
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SQL_VALUES_RE = re.compile(r"VALUES \('((?:[^']|'')*)', '((?:[^']|'')*)'\)")
+
+S = '\x1f'
+
+# ───── словари ─────
+_SURNAMES = (
+    'Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев',
+    'Соколов', 'Михайлов', 'Новиков', 'Фёдоров', 'Морозов', 'Волков', 'Алексеев',
+    'Лебедев', 'Семёнов', 'Егоров', 'Павлов', 'Козлов', 'Степанов', 'Николаев',
+    'Орлов', 'Андреев', 'Макаров', 'Никитин', 'Захаров', 'Зайцев', 'Соловьёв',
+    'Борисов', 'Яковлев', 'Григорьев', 'Романов', 'Воробьёв', 'Сергеев', 'Кузьмин',
+    'Фролов', 'Александров', 'Дмитриев', 'Королёв', 'Гусев', 'Киселёв', 'Ильин',
+    'Максимов', 'Поляков', 'Сорокин', 'Виноградов', 'Ковалёв', 'Белов', 'Медведев',
+    'Антонов', 'Тарасов', 'Жуков', 'Баранов', 'Филиппов', 'Комаров', 'Давыдов',
+    'Беляев', 'Герасимов', 'Богданов', 'Осипов', 'Сидоренко', 'Матвеев', 'Титов',
+    'Марков', 'Миронов', 'Крылов', 'Куликов', 'Карпов', 'Власов', 'Мельников',
+    'Чернышев', 'Евтеев', 'Пукина', 'Абаза', "О'Коннор", 'Smith', 'Müller',
+)
+_LETTERS = 'АБВГДЕЖЗИКЛМНОПРСТУФЭЮЯ'
+_INITIAL_FORMS = ('{a}.{b}.', '{a}. {b}.', '{a} .{b}', '{a} {b}', '{a}{b}', '{a}.')
+
+_TITLE_WORDS = (
+    'Основы', 'Введение в', 'Теория', 'Практикум по', 'Задачи по', 'Курс',
+    'Методы', 'Справочник по', 'Лекции по', 'Физика', 'ядерных реакторов',
+    'квантовой механики', 'теплофизике', 'математическому анализу',
+    'программированию', 'электронике', 'радиационной защите', 'материаловедению',
+    'дозиметрии', 'ускорителей', 'плазмы', 'лазерной техники', 'информатике',
+)
+_TYPES = ('учебник', 'учебное пособие', 'монография', 'сборник задач', 'справочник', '')
+_EDITIONS = ('2-е изд., перераб. и доп.', '3-е изд.', 'Изд. 4-е, стер.', '2-е изд.')
+_PUBLISHERS = (
+    'МИФИ', 'Изд-во МИФИ', 'Издательство "МИФИ"', 'НИЯУ МИФИ', 'Наука', 'Энергоатомиздат',
+    'Атомиздат', 'Физматлит', 'Высшая школа', 'Мир', 'ООО «Питер»', 'БХВ-Петербург',
+    'Лань', 'Юрайт', 'Springer', 'Wiley', 'Изд. дом "Интеллект"', 'Техносфера',
+)
+_CITIES = ('М.', 'М', 'СПб', 'Л.', 'Новосибирск', 'Екб', 'Казань', 'Берлин', 'Обнинск', '')
+_STORAGE = ('ЧЗ', 'АБ', 'ОХ', 'КХ', 'Ч/З', '')
+_SUBJECTS = (
+    'Техническая механика', 'Теоретическая механика', 'Ядерная физика', 'Реакторы',
+    'Физика плазмы', 'Квантовая механика', 'Радиационная безопасность',
+    'Программирование', 'Математический анализ', 'Теория вероятностей',
+    'Электроника', 'Лазеры (ЕТГС)', 'Материаловедение', 'Дозиметрия',
+)
+
+
+def load_dictionary_rows(name: str, sql_dir: str = _HERE) -> List[Tuple[int, str, str]]:
+    """
+    Строки (id, код, описание) справочника из <name>.sql репозитория.
+    id назначаются по порядку, как их выдал бы SERIAL при загрузке
+    с ON CONFLICT DO NOTHING (повторные коды пропускаются).
+    """
+    rows: List[Tuple[int, str, str]] = []
+    seen = set()
+    with open(os.path.join(sql_dir, f'{name}.sql'), encoding='utf-8') as f:
+        for ln in f:
+            m = _SQL_VALUES_RE.search(ln)
+            if not m:
+                continue
+            code = m.group(1).replace("''", "'")
+            if code in seen:
+                continue
+            seen.add(code)
+            rows.append((len(rows) + 1, code, m.group(2).replace("''", "'")))
+    return rows
+
+
+def write_dictionary_snapshot(path: str, sql_dir: str = _HERE) -> None:
+    """Снимок справочников для parse_irbis_file --snapshot ... --offline."""
+    tables: Dict[str, Dict] = {}
+    udc = load_dictionary_rows('udc', sql_dir)
+    tables['udc'] = {'map': {code: i for i, code, _ in udc}}
+    grnti_map: Dict[str, int] = {}
+    for i, code, _ in load_dictionary_rows('grnti', sql_dir):
+        grnti_map.setdefault(_normalize_grnti(code), i)
+    tables['grnti'] = {'map': grnti_map}
+    bbk = load_dictionary_rows('bbk', sql_dir)
+    tables['bbk'] = {'map': {code.upper(): i for i, code, _ in bbk}}
+    tables['bbk_desc'] = {'map': bbk}
+    for t in tables.values():
+        t['checksum'] = (len(t['map']), 'synthetic')
+    write_snapshot(path, {'tables': tables})
+
+
+# ───── генератор ─────
+class ExportGenerator:
+    """Детерминированный источник записей; состояние — один random.Random."""
+
+    def __init__(self, seed: int = 1, sql_dir: str = _HERE):
+        self.rnd = random.Random(seed)
+        self.udc_codes   = [c for _, c, _ in load_dictionary_rows('udc', sql_dir)]
+        self.grnti_codes = [c for _, c, _ in load_dictionary_rows('grnti', sql_dir)
+                            if re.fullmatch(r'\d\d\.\d\d\.\d\d', c)]
+        self.authors = [(s, self._initials()) for s in _SURNAMES for _ in range(6)]
+        self.inventory_no = 100000
+
+    # распределение &laquo;популярные значения повторяются чаще&raquo;
+    def _zipf(self, seq):
+        i = int(len(seq) * self.rnd.random() ** 3)
+        return seq[min(i, len(seq) - 1)]
+
+    def _initials(self) -> str:
+        a, b = self.rnd.choice(_LETTERS), self.rnd.choice(_LETTERS)
+        return self.rnd.choice(_INITIAL_FORMS).format(a=a, b=b)
+
+    def _sep(self, *pairs: Tuple[str, str]) -> str:
+        sep = '^' if self.rnd.random() < 0.05 else S
+        return ''.join(f'{sep}{code}{val}' for code, val in pairs if val)
+
+    def udc(self) -> str:
+        code = self._zipf(self.udc_codes)
+        r = self.rnd.random()
+        if r < 0.25 and code[-1:].isdigit():                 # детализация
+            code += ('.' if len(code.split('.')[-1]) == 3 else '') + str(self.rnd.randint(0, 9))
+        elif r < 0.35:                                       # составной
+            code += ':' + self.rnd.choice(self.udc_codes)
+        return code
+
+    def grnti(self) -> str:
+        code = self._zipf(self.grnti_codes)
+        r = self.rnd.random()
+        if r < 0.15:
+            code = code[:5]                                  # '29.01'
+        elif r < 0.2:
+            code = code.lstrip('0')                          # '6.81.00'
+        elif r < 0.23:
+            code = code.replace('.', '. ', 1)                # '27. 17.00'
+        elif r < 0.33:
+            code = code[:6] + f'{self.rnd.randint(1, 99):02d}'
+        return code
+
+    def copy(self) -> str:
+        rnd = self.rnd
+        self.inventory_no += rnd.randint(1, 3)
+        day, mon, year = rnd.randint(1, 28), rnd.randint(1, 12), rnd.randint(1965, 2024)
+        date = rnd.choice((f'{day:02d}.{mon:02d}.{year}', f'{day:02d}.{mon:02d}.{year % 100:02d}',
+                           f'{year}-{mon:02d}-{day:02d}', f'{year}{mon:02d}{day:02d}', ''))
+        price = rnd.choice((f'{rnd.randint(1, 3000)}.00', f'{rnd.randint(1, 99)},50р.',
+                            f'{rnd.randint(1, 9)} {rnd.randint(100, 999)}', ''))
+        return self._sep(('A', '0'), ('B', str(self.inventory_no)), ('C', date),
+                         ('D', rnd.choice(_STORAGE)), ('E', price))
+
+    def record(self, n: int) -> List[str]:
+        rnd = self.rnd
+        lines = [f'#920: {"IBIS" if rnd.random() < 0.97 else "PAZK"}', f'#903: R{n:08d}']
+        if rnd.random() < 0.97:
+            title = ' '.join(rnd.sample(_TITLE_WORDS, rnd.randint(2, 4)))
+            lines.append('#200: ' + self._sep(('A', title), ('E', rnd.choice(_TYPES)),
+                                              ('F', f'под ред. {self._zipf(self.authors)[0]}'
+                                                    if rnd.random() < 0.3 else '')))
+        if rnd.random() < 0.3:
+            lines.append('#205: ' + self._sep(('A', rnd.choice(_EDITIONS))))
+        lines.append('#210: ' + self._sep(('A', rnd.choice(_CITIES)),
+                                          ('C', self._zipf(_PUBLISHERS)),
+                                          ('D', str(rnd.randint(1960, 2024)))))
+        lines.append('#215: ' + self._sep(('A', f'{rnd.randint(40, 900)} с.'), ('1', 'ил.')))
+        if rnd.random() < 0.25:
+            lines.append('#225: ' + self._sep(('A', 'Библиотека инженера-физика'),
+                                              ('V', str(rnd.randint(1, 40)))))
+        if rnd.random() < 0.3:
+            lines.append(f'#331: Рассмотрены {rnd.choice(_TITLE_WORDS).lower()}. '
+                         f'Для студентов "{rnd.choice(_TYPES)}" вузов.')
+        for tag in ('606', '610'):
+            for _ in range(rnd.choice((0, 0, 1, 1, 2))):
+                heading = self._zipf(_SUBJECTS)
+                if rnd.random() < 0.3:
+                    heading = self._sep(('A', heading), ('B', self._zipf(_SUBJECTS).lower()))
+                lines.append(f'#{tag}: {heading}')
+        if rnd.random() < 0.9:
+            lines.append('#675: ' + '; '.join(self.udc() for _ in range(rnd.choice((1, 1, 1, 2, 3)))))
+        if rnd.random() < 0.8:
+            lines.append('#964: ' + ', '.join(self.grnti() for _ in range(rnd.choice((1, 1, 2)))))
+        for i in range(rnd.choice((0, 1, 1, 1, 2, 3, 4))):
+            last, ini = self._zipf(self.authors)
+            lines.append(f'#{"700" if i == 0 else "701"}: ' + self._sep(('A', last), ('B', ini)))
+        for _ in range(rnd.choice((0, 1, 1, 2, 3, 5, 12))):
+            lines.append('#910: ' + self.copy())
+        rnd.shuffle(lines)
+        return lines
+
+    def records(self, count: int) -> Iterator[List[str]]:
+        for n in range(1, count + 1):
+            yield self.record(n)
+
+
+def write_export(out: TextIO, count: int, seed: int = 1) -> None:
+    gen = ExportGenerator(seed)
+    for lines in gen.records(count):
+        out.write('\n'.join(lines))
+        out.write('\n*****\n')
+
+
+# ───── CLI ─────
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Синтетический экспорт ИРБИС для бенчмарков')
+    ap.add_argument('count', type=int, help='число записей (1k … 1M)')
+    ap.add_argument('output', help='файл экспорта')
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('--snapshot', metavar='FILE',
+                    help='дополнительно записать снимок справочников для --offline')
+    args = ap.parse_args()
+    with open(args.output, 'w', encoding='utf-8') as f:
+        write_export(f, args.count, args.seed)
+    if args.snapshot:
+        write_dictionary_snapshot(args.snapshot)
+    print(f"Записано {args.count} записей в {args.output}")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+import_metrics.py — поэтапные замеры конвейера импорта.
+
+METRICS — общий для процесса накопитель: для каждого этапа считаются
+число вызовов, полное время (wall) и собственное время — без вложенных
+этапов.  Пока накопитель не включён (enable()), stage() возвращает
+пустой контекст, и инструментированный код почти ничего не платит.
+
+    with METRICS.stage('pub_info'):
+        ...
+    for rec in METRICS.iterate('split', export.records()):
+        ...
+
+Процессы пула включают свой накопитель в initializer, а снятые с него
+данные (drain()) возвращают вместе с результатом; главный процесс
+сливает их через merge().
+"""
+
+from __future__ import annotations
+import json
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ('metrics', 'name', 't0', 'child')
+
+    def __init__(self, metrics: 'Metrics', name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.child = 0.0
+        self.metrics._stack.append(self)
+        self.t0 = perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        dt = perf_counter() - self.t0
+        m = self.metrics
+        m._stack.pop()
+        if m._stack:
+            m._stack[-1].child += dt
+        s = m.stages.get(self.name)
+        if s is None:
+            s = m.stages[self.name] = [0, 0.0, 0.0]
+        s[0] += 1
+        s[1] += dt
+        s[2] += dt - self.child
+
+
+class Metrics:
+    """Этап &rarr; [вызовов, секунд всего, секунд собственных]."""
+
+    def __init__(self):
+        self.enabled = False
+        self.stages: Dict[str, List] = {}
+        self._stack: List[_Stage] = []
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterator:
+        """Итератор, время каждого next() которого идёт в этап name."""
+        if not self.enabled:
+            yield from iterable
+            return
+        it = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def drain(self) -> Optional[Dict[str, List]]:
+        """Снять накопленное (для передачи из процесса пула)."""
+        if not self.enabled:
+            return None
+        stages, self.stages = self.stages, {}
+        return stages
+
+    def merge(self, stages: Optional[Dict[str, List]]) -> None:
+        for name, (calls, total, own) in (stages or {}).items():
+            s = self.stages.setdefault(name, [0, 0.0, 0.0])
+            s[0] += calls
+            s[1] += total
+            s[2] += own
+
+    def as_dict(self) -> Dict[str, Dict]:
+        return {name: {'calls': c, 'seconds': round(t, 6), 'self_seconds': round(o, 6)}
+                for name, (c, t, o) in self.stages.items()}
+
+    def report(self) -> str:
+        """Таблица этапов по убыванию собственного времени."""
+        lines = [f"  {'этап':<16} {'вызовов':>10} {'всего, с':>10} {'собств., с':>11}"]
+        for name, (c, t, o) in sorted(self.stages.items(), key=lambda kv: -kv[1][2]):
+            lines.append(f"  {name:<16} {c:>10} {t:>10.3f} {o:>11.3f}")
+        return '\n'.join(lines)
+
+    def write_json(self, path: str, **extra) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({**extra, 'stages': self.as_dict()}, f, ensure_ascii=False, indent=2)
+
+
+METRICS = Metrics()
+
+
+def enable(reset: bool = False) -> Metrics:
+    """
+    Включить замеры в текущем процессе.  reset=True — для initializer
+    пула: при fork процесс наследует уже накопленное родителем.
+    """
+    if reset:
+        METRICS.stages = {}
+        METRICS._stack = []
+    METRICS.enabled = True
+    return METRICS
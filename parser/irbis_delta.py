@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+irbis_delta.py — состояние инкрементального (delta) импорта.
+
+Между запусками parse_irbis_file --delta <state.json> хранится:
+  • для каждой записи — стабильный ключ, выданный ей book.id,
+    наличие строки book и отпечаток содержимого;
+  • счётчики ID и карты издателей / авторов, чтобы новые строки
+    получали те же ID, что и при полном импорте.
+
+Ключ записи — шифр (#903).  Если шифра нет, ключом служит хэш
+заглавия, сведений об издании, издательства, года и авторов; изменение
+этих полей у такой записи даёт пару &laquo;удалена + новая&raquo;.
+
+Отпечаток считается по разобранной записи (ParsedRecord), поэтому
+правки полей, которые парсер не использует, изменением не считаются.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+STATE_VERSION = 1
+
+
+def _digest(obj) -> str:
+    return hashlib.blake2b(repr(obj).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def record_fingerprint(parsed: Sequence) -> str:
+    """Хэш содержимого разобранной записи (без её ключа)."""
+    return _digest(tuple(parsed)[:-1])
+
+
+def record_key(record_id: str, title: str, edition_statement: str,
+               publisher: Optional[str], year: Optional[int],
+               authors: Sequence[Tuple[str, str, str]]) -> str:
+    if record_id:
+        return record_id
+    return 'h:' + _digest((title, edition_statement, publisher, year, tuple(authors)))
+
+
+class DeltaState:
+    """Содержимое файла состояния (JSON)."""
+
+    def __init__(self):
+        self.next_book_id = 1
+        self.next_author_id = 1
+        self.next_publisher_id = 1
+        # ключ &rarr; [book_id, есть_строка_book, отпечаток]; отпечаток None —
+        # запись исчезла из экспорта (book.id сохраняется на случай возврата)
+        self.records: Dict[str, List] = {}
+        self.publishers: Dict[str, int] = {}
+        self.authors: Dict[Tuple[str, str, str, None], int] = {}
+
+    @classmethod
+    def load(cls, path: str) -> 'DeltaState':
+        st = cls()
+        if not os.path.exists(path):
+            return st
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != STATE_VERSION:
+            raise ValueError(f"{path}: неподдерживаемая версия состояния {data.get('version')}")
+        st.next_book_id      = data['next_book_id']
+        st.next_author_id    = data['next_author_id']
+        st.next_publisher_id = data['next_publisher_id']
+        st.records    = data['records']
+        st.publishers = data['publishers']
+        st.authors    = {(last, first, patr, None): aid
+                         for last, first, patr, aid in data['authors']}
+        return st
+
+    def save(self, path: str) -> None:
+        """Атомарная запись: сначала во временный файл, затем os.replace."""
+        data = {
+            'version'          : STATE_VERSION,
+            'next_book_id'     : self.next_book_id,
+            'next_author_id'   : self.next_author_id,
+            'next_publisher_id': self.next_publisher_id,
+            'records'          : self.records,
+            'publishers'       : self.publishers,
+            'authors'          : [[last, first, patr, aid]
+                                  for (last, first, patr, _), aid in self.authors.items()],
+        }
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, path)
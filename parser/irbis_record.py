@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+irbis_record.py — общее представление записи ИРБИС.
+
+Запись разбирается на поля один раз: строки вида `#TAG: текст`
+превращаются в IrbisField, а IrbisRecord индексирует их по тегу.
+Подполя (`\\x1fAзначение` или `^Aзначение`) декодируются лениво —
+только когда обработчик поля их запрашивает — и кешируются в поле.
+
+Этим представлением пользуются parse_irbis_file и модули fix_*
+(fix_authors.record_authors, fix_bbk.collect_record,
+fix_pub_info.record_pub_info), так что каждая запись токенизируется
+ровно один раз.
+"""
+
+from __future__ import annotations
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+SUBFIELD_SEP = '\x1f'          # разделитель подполя в ИРБИС-экспорте
+
+
+def iter_subfields(text: str) -> Iterator[Tuple[str, str]]:
+    """
+    '\\x1fAИванов\\x1fBИ.О.' &rarr; ('A', 'Иванов'), ('B', 'И.О.')
+
+    Если в тексте нет \\x1f, разделителем считается '^'.
+    Код подполя приводится к верхнему регистру.
+    """
+    if SUBFIELD_SEP not in text and '^' in text:
+        text = text.replace('^', SUBFIELD_SEP)
+    for chunk in text.split(SUBFIELD_SEP):
+        chunk = chunk.strip()
+        if chunk:
+            yield chunk[0].upper(), chunk[1:].strip()
+
+
+class IrbisField:
+    """Одно поле записи: тег, сырой текст и (лениво) его подполя."""
+    __slots__ = ('tag', 'text', '_subs')
+
+    def __init__(self, tag: str, text: str):
+        self.tag  = tag
+        self.text = text
+        self._subs: Optional[List[Tuple[str, str]]] = None
+
+    @property
+    def subfields(self) -> List[Tuple[str, str]]:
+        """Подполя в порядке следования; декодируются при первом обращении."""
+        if self._subs is None:
+            self._subs = list(iter_subfields(self.text))
+        return self._subs
+
+    def sub(self, code: str, default: str = '') -> str:
+        """Первое подполе с кодом code."""
+        for k, v in self.subfields:
+            if k == code:
+                return v
+        return default
+
+    def subdict(self) -> Dict[str, str]:
+        """Подполя словарём; при повторах кода побеждает последнее."""
+        return dict(self.subfields)
+
+    def __repr__(self) -> str:
+        return f"IrbisField({self.tag!r}, {self.text!r})"
+
+
+class IrbisRecord:
+    """
+    Поля одной записи в исходном порядке плюс индекс тег &rarr; поля.
+    """
+    __slots__ = ('fields', '_index')
+
+    def __init__(self, fields: List[IrbisField]):
+        self.fields = fields
+        index: Dict[str, List[IrbisField]] = {}
+        for fld in fields:
+            index.setdefault(fld.tag, []).append(fld)
+        self._index = index
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> 'IrbisRecord':
+        """Строки записи (как их отдаёт irbis_scan.scan_records) &rarr; IrbisRecord."""
+        fields: List[IrbisField] = []
+        for line in lines:
+            line = line.rstrip('\n')
+            if not line.startswith('#'):
+                continue
+            tag, _, content = line.partition(':')
+            fields.append(IrbisField(tag[1:], content))
+        return cls(fields)
+
+    def get(self, tag: str) -> Optional[IrbisField]:
+        """Последнее вхождение поля (повтор поля перекрывает предыдущее)."""
+        found = self._index.get(tag)
+        return found[-1] if found else None
+
+    def get_all(self, *tags: str) -> List[IrbisField]:
+        """Все вхождения перечисленных тегов в порядке записи."""
+        if len(tags) == 1:
+            return self._index.get(tags[0], [])
+        return [fld for fld in self.fields if fld.tag in tags]
+
+    def text(self, tag: str, default: str = '') -> str:
+        fld = self.get(tag)
+        return fld.text if fld is not None else default
+
+    def in_database(self, name: str) -> bool:
+        """Запись относится к базе name (поле #920)."""
+        return any(fld.text.strip() == name for fld in self._index.get('920', ()))
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    def __repr__(self) -> str:
+        return f"IrbisRecord({len(self.fields)} полей)"
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+irbis_scan.py — чтение экспорта ИРБИС через mmap, с определением кодировки.
+
+Текстовое чтение декодирует каждую строку и для каждой вызывает
+`ln.strip() == '*****'`, а экспорты в cp1251 (как bbk.csv) приходилось
+заранее перекодировать в UTF-8.  Здесь:
+
+  • файл отображается в память (mmap), и границы записей ищутся
+    байтовым поиском разделителя `*****` (find на стороне C); строка
+    проверяется целиком только там, где разделитель найден, — `*****`
+    внутри поля записью не считается;
+  • кодировка (UTF-8 или cp1251) определяется по образцу: окну
+    SAMPLE_SIZE байт с первой строки, где встречается не-ASCII байт, —
+    если окно не декодируется как UTF-8, файл считается cp1251;
+  • каждая запись декодируется один раз, целиком, и режется на строки;
+    `\\r\\n` и одиночный `\\r` сводятся к `\\n`, как в текстовом режиме.
+
+Разделитель и перевод строки — ASCII и в UTF-8, и в cp1251, поэтому
+границы ищутся до декодирования.  Для каждой записи известно смещение
+байта за её концом — с него продолжается импорт после контрольной
+точки (checkpoint.py).
+"""
+
+from __future__ import annotations
+import re
+import mmap
+import codecs
+from typing import Deque, Iterator, List, Optional, Tuple, Union
+
+RECORD_SEP = '*****'
+ENCODINGS = ('utf-8', 'cp1251')
+SAMPLE_SIZE = 1 << 16
+
+_SEP = RECORD_SEP.encode('ascii')
+_NON_ASCII_RE = re.compile(rb'[\x80-\xff]')
+
+Buffer = Union[bytes, mmap.mmap]
+
+
+def detect_encoding(buf: Buffer) -> str:
+    """'utf-8' или 'cp1251' — по окну с первого не-ASCII байта."""
+    m = _NON_ASCII_RE.search(buf)
+    if m is None:
+        return 'utf-8'                          # чистый ASCII — годится любая
+    start = buf.rfind(b'\n', 0, m.start()) + 1
+    sample = buf[start:start + SAMPLE_SIZE]
+    try:
+        # final=False: обрезанный на границе окна символ — не ошибка
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return 'cp1251'
+    return 'utf-8'
+
+
+def iter_record_spans(buf: Buffer, encoding: str = 'utf-8',
+                      start: int = 0) -> Iterator[Tuple[int, int, int]]:
+    """
+    (начало, конец, следующее) для каждой записи с байта start: [начало,
+    конец) — строки записи без разделителя, следующее — байт за строкой
+    разделителя.  Пустые записи (разделители подряд) пропускаются.
+    """
+    n = len(buf)
+    rec_start = pos = start
+    while True:
+        i = buf.find(_SEP, pos)
+        if i < 0:
+            break
+        line_start = max(buf.rfind(b'\n', rec_start, i) + 1, rec_start)
+        line_end = buf.find(b'\n', i)
+        if line_end < 0:
+            line_end = n
+        # разделитель — только строка `*****` целиком (с пробелами по краям)
+        if buf[line_start:line_end].decode(encoding, 'replace').strip() == RECORD_SEP:
+            if line_start > rec_start:
+                yield rec_start, line_start, min(line_end + 1, n)
+            rec_start = pos = line_end + 1
+        else:
+            pos = i + len(_SEP)
+    if rec_start < n:
+        yield rec_start, n, n
+
+
+def scan_records(buf: Buffer, encoding: str, start: int = 0,
+                 ends: Optional[Deque[int]] = None) -> Iterator[List[str]]:
+    """
+    Записи экспорта как списки строк (без `\\n`), как их ждёт
+    IrbisRecord.from_lines.  ends — если задан, перед выдачей записи в
+    него добавляется смещение байта за её концом.
+    """
+    decode = codecs.getdecoder(encoding)
+    for begin, end, nxt in iter_record_spans(buf, encoding, start):
+        text = decode(buf[begin:end])[0]
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        if ends is not None:
+            ends.append(nxt)
+        yield text.split('\n')
+
+
+class MappedExport:
+    """Файл экспорта, отображённый в память; encoding=None — определить."""
+
+    def __init__(self, path: str, encoding: Optional[str] = None):
+        self._file = open(path, 'rb')
+        try:
+            # пустой файл отобразить нельзя
+            self.buf: Buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.buf = b''
+        self.encoding = encoding or detect_encoding(self.buf)
+
+    def records(self, start: int = 0, ends: Optional[Deque[int]] = None) -> Iterator[List[str]]:
+        return scan_records(self.buf, self.encoding, start, ends)
+
+    def close(self) -> None:
+        if isinstance(self.buf, mmap.mmap):
+            self.buf.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+link_filter.py — пакетное сопоставление (book_id, код) со справочником.
+
+Общий движок для fix_udc.filter_links и fix_grnti.filter_links.
+Коды в экспорте сильно повторяются, поэтому:
+
+1. resolve()      — каждый *различный* сырой код нормализуется и ищется
+                    в справочнике ровно один раз;
+2. filter_links() — результат раздаётся всем парам одним проходом;
+3. пропуски копятся гистограммой Counter{нормализованный код: число пар}
+   вместо строки лога на каждую пару.
+
+iter_links() — потоковый вариант того же (таблица разрешённых кодов
+растёт по ходу), для источников, которые не помещаются в список.
+
+filter_resolved_links() — то же для разрешителя, дающего несколько id на
+код и уровень совпадения (иерархический поиск code_trie);
+iter_resolved_links() — его потоковый вариант.
+"""
+
+from __future__ import annotations
+from collections import Counter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+Normalizer = Optional[Callable[[str], str]]
+
+
+def resolve(codes: Iterable[str], mapping: Dict[str, int],
+            normalize: Normalizer = None) -> Dict[str, Optional[int]]:
+    """{сырой код: id справочника или None} для различных кодов codes."""
+    if normalize is None:
+        return {code: mapping.get(code) for code in set(codes)}
+    return {code: mapping.get(normalize(code)) for code in set(codes)}
+
+
+def skip_histogram(raw_counts: Dict[str, int], normalize: Normalizer = None) -> Counter:
+    """Счётчик пропусков по сырым кодам &rarr; по нормализованным."""
+    if normalize is None:
+        return Counter(raw_counts)
+    hist: Counter = Counter()
+    for code, n in raw_counts.items():
+        hist[normalize(code)] += n
+    return hist
+
+
+def filter_links(
+    pairs: List[Tuple[int, str]],
+    mapping: Dict[str, int],
+    normalize: Normalizer = None,
+    skips: Optional[Counter] = None,
+) -> Tuple[List[Tuple[int, int]], int]:
+    """
+    (links, skipped) — совпавшие (book_id, id) в порядке pairs и число
+    несовпавших пар.  skips, если передан, пополняется гистограммой
+    пропусков по нормализованному коду.
+    """
+    table = resolve((code for _, code in pairs), mapping, normalize)
+    links = [(book_id, table[code]) for book_id, code in pairs if table[code] is not None]
+    skipped = len(pairs) - len(links)
+    if skips is not None and skipped:
+        missing = Counter(code for _, code in pairs if table[code] is None)
+        skips.update(skip_histogram(missing, normalize))
+    return links, skipped
+
+
+def iter_links(
+    pairs: Iterable[Tuple[int, str]],
+    mapping: Dict[str, int],
+    normalize: Normalizer = None,
+    skips: Optional[Counter] = None,
+) -> Iterator[Tuple[int, int]]:
+    """Потоковый filter_links(): отдаёт совпавшие пары по мере чтения."""
+    table: Dict[str, Optional[int]] = {}
+    missing: Counter = Counter()
+    for book_id, code in pairs:
+        try:
+            target = table[code]
+        except KeyError:
+            target = table[code] = mapping.get(normalize(code) if normalize else code)
+        if target is not None:
+            yield book_id, target
+        else:
+            missing[code] += 1
+    if skips is not None:
+        skips.update(skip_histogram(missing, normalize))
+
+
+def filter_resolved_links(
+    pairs: List[Tuple[int, str]],
+    resolve_code: Callable[[str], Tuple[Tuple[int, ...], str]],
+    skip_key: Normalizer = None,
+    skips: Optional[Counter] = None,
+    levels: Optional[Counter] = None,
+) -> Tuple[List[Tuple[int, int]], int]:
+    """
+    filter_links() для разрешителя code &rarr; (ids, уровень), напр.
+    code_trie.UdcIndex.resolve.  Повторные (book_id, id) одной книги
+    отбрасываются; levels пополняется числом пар по уровням совпадения,
+    skips — гистограммой пропусков по skip_key(код).
+    """
+    table = {code: resolve_code(code) for code in {code for _, code in pairs}}
+    links: List[Tuple[int, int]] = []
+    seen = set()
+    missing: Counter = Counter()
+    level_counts: Counter = Counter()
+    for book_id, code in pairs:
+        ids, level = table[code]
+        level_counts[level] += 1
+        if not ids:
+            missing[code] += 1
+        for _id in ids:
+            if (book_id, _id) not in seen:
+                seen.add((book_id, _id))
+                links.append((book_id, _id))
+    if levels is not None:
+        levels.update(level_counts)
+    if skips is not None:
+        skips.update(skip_histogram(missing, skip_key))
+    return links, sum(missing.values())
+
+
+def iter_resolved_links(
+    pairs: Iterable[Tuple[int, str]],
+    resolve_code: Callable[[str], Tuple[Tuple[int, ...], str]],
+    skip_key: Normalizer = None,
+    skips: Optional[Counter] = None,
+    levels: Optional[Counter] = None,
+) -> Iterator[Tuple[int, int]]:
+    """
+    Потоковый filter_resolved_links().  Повторные (book_id, id) отсекаются
+    в пределах подряд идущих пар одной книги — пары книги в экспорте
+    идут подряд, так что результат тот же без множества всех связей.
+    Со слиянием записей (--dedup-books) это не так — там нужен
+    filter_resolved_links().
+    """
+    table: Dict[str, Tuple[Tuple[int, ...], str]] = {}
+    missing: Counter = Counter()
+    level_counts: Counter = Counter()
+    current, seen = None, set()
+    for book_id, code in pairs:
+        try:
+            ids, level = table[code]
+        except KeyError:
+            ids, level = table[code] = resolve_code(code)
+        level_counts[level] += 1
+        if not ids:
+            missing[code] += 1
+            continue
+        if book_id != current:
+            current, seen = book_id, set()
+        for _id in ids:
+            if _id not in seen:
+                seen.add(_id)
+                yield book_id, _id
+    if levels is not None:
+        levels.update(level_counts)
+    if skips is not None:
+        skips.update(skip_histogram(missing, skip_key))
+
+
+def format_histogram(hist: Counter, top: int = 10) -> str:
+    """'29.01.00×120, 16.73.00×45, … (+N кодов)' — самые частые пропуски."""
+    items = hist.most_common(top)
+    text = ', '.join(f"{code}×{n}" for code, n in items)
+    if len(hist) > top:
+        text += f", … (+{len(hist) - top} кодов)"
+    return text
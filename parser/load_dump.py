@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+load_dump.py — параллельная загрузка SQL-дампа parse_irbis_file в PostgreSQL.
+
+psql проигрывает inserts.sql последовательно, по обороту на оператор.
+Здесь дамп один раз читается и раскладывается по таблицам (временный
+файл на таблицу), после чего секции грузятся одновременно через пул
+соединений psycopg2:
+
+  • секция стартует, как только загружены все таблицы из её
+    TableSpec.parents (sql_output.TABLES) — так book_author, book_udc,
+    book_grnti, book_copy … идут параллельно, когда book и author уже
+    в базе;
+  • операторы секции уходят на сервер пачками (до --batch операторов
+    и BATCH_BYTES байт в одном execute) — один оборот на пачку;
+  • каждая секция — своя транзакция на своём соединении.  Если секция
+    падает, уже зафиксированные секции остаются в БД: загрузка
+    прерывается с PartialLoadError, и CLI перечисляет зафиксированные и
+    незагруженные таблицы.  Чтобы всё или ничего, есть
+    --single-transaction: дамп грузится последовательно, одной транзакцией.
+
+Дамп с операторами, отличными от INSERT в таблицы импорта (delta-режим:
+UPDATE / DELETE, порядок которых важен), грузится последовательно, тем
+же пакетным способом, в одной транзакции.
+
+Дамп читается через sql_output.open_dump: `.gz` / `.zst` распаковываются
+на лету, `-` — чтение из stdin.
+
+В конце печатается пропускная способность по секциям.
+
+CLI:
+    python load_dump.py "<DSN>" inserts.sql [--workers N] [--batch N] [--single-transaction]
+"""
+
+from __future__ import annotations
+import re
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, IO, Iterable, Iterator, List, Optional, TextIO
+
+from sql_output import TABLES, open_dump
+
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH = 500
+BATCH_BYTES = 4 << 20
+
+_INSERT_RE = re.compile(r'INSERT INTO public\.(\w+)')
+_SEP = '\0'                 # разделитель операторов во временном файле
+
+
+class PartialLoadError(RuntimeError):
+    """Параллельная загрузка прервана, часть секций уже зафиксирована."""
+
+    def __init__(self, failed: str, committed: List[str], pending: List[str]):
+        super().__init__(f"секция {failed} не загружена")
+        self.failed = failed
+        self.committed = committed
+        self.pending = pending
+
+
+def iter_statements(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Операторы дампа по одному: комментарии `--` между операторами
+    пропускаются, `;` и переводы строк внутри строковых литералов — нет.
+    """
+    buf: List[str] = []
+    in_quote = False
+    for line in lines:
+        if not buf:
+            s = line.strip()
+            if not s or s.startswith('--'):
+                continue
+        buf.append(line)
+        if line.count("'") % 2:
+            in_quote = not in_quote
+        if not in_quote and line.rstrip().endswith(';'):
+            yield ''.join(buf).rstrip('\n')
+            buf = []
+    if buf:
+        yield ''.join(buf).rstrip('\n')
+
+
+def _rows_in(stmt: str) -> int:
+    """Строк в INSERT-е: многострочный VALUES пишет каждую с новой строки."""
+    return stmt.count('\n(') or 1
+
+
+def _batches(stmts: Iterable[str], batch: int) -> Iterator[str]:
+    """Операторы &rarr; тексты пачек для одного execute."""
+    buf: List[str] = []
+    size = 0
+    for stmt in stmts:
+        buf.append(stmt)
+        size += len(stmt)
+        if len(buf) >= batch or size >= BATCH_BYTES:
+            yield '\n'.join(buf)
+            buf, size = [], 0
+    if buf:
+        yield '\n'.join(buf)
+
+
+class Section:
+    """Операторы одной таблицы дампа во временном файле + замеры загрузки."""
+
+    def __init__(self, table: str):
+        self.table = table
+        self.statements = self.rows = self.bytes = 0
+        self.seconds = 0.0
+        self._spool: Optional[IO[str]] = None
+
+    def add(self, stmt: str) -> None:
+        if self._spool is None:
+            self._spool = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self._spool.write(stmt)
+        self._spool.write(_SEP)
+        self.statements += 1
+        self.rows += _rows_in(stmt)
+        self.bytes += len(stmt.encode('utf-8'))
+
+    def __iter__(self) -> Iterator[str]:
+        if self._spool is None:
+            return
+        self._spool.seek(0)
+        tail = ''
+        while True:
+            block = self._spool.read(1 << 20)
+            if not block:
+                break
+            parts = (tail + block).split(_SEP)
+            tail = parts.pop()
+            yield from parts
+
+    def close(self) -> None:
+        if self._spool is not None:
+            self._spool.close()
+
+
+def spool_dump(f: TextIO) -> Optional[Dict[str, Section]]:
+    """
+    {таблица: Section} в порядке TABLES, либо None — если в дампе есть
+    операторы помимо INSERT в таблицы импорта (нужна последовательная
+    загрузка).
+    """
+    sections: Dict[str, Section] = {}
+    try:
+        for stmt in iter_statements(f):
+            m = _INSERT_RE.match(stmt)
+            if not m or m.group(1) not in TABLES:
+                _close_all(sections)
+                return None
+            sec = sections.get(m.group(1))
+            if sec is None:
+                sec = sections[m.group(1)] = Section(m.group(1))
+            sec.add(stmt)
+    except BaseException:
+        _close_all(sections)
+        raise
+    return {t: sections[t] for t in TABLES if t in sections}
+
+def _close_all(sections: Dict[str, Section]) -> None:
+    for sec in sections.values():
+        sec.close()
+
+
+def _load_section(pool, sec: Section, batch: int) -> None:
+    conn = pool.getconn()
+    try:
+        started = time.perf_counter()
+        with conn.cursor() as cur:
+            for text in _batches(sec, batch):
+                cur.execute(text)
+        conn.commit()
+        sec.seconds = time.perf_counter() - started
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
+
+def load_parallel(dsn: str, sections: Dict[str, Section],
+                  workers: int = DEFAULT_WORKERS, batch: int = DEFAULT_BATCH) -> None:
+    """
+    Грузит секции параллельно, соблюдая TableSpec.parents.  Каждая
+    секция фиксируется отдельно; при ошибке — PartialLoadError со
+    списком уже зафиксированных секций.
+    """
+    from psycopg2.pool import ThreadedConnectionPool
+    pool = ThreadedConnectionPool(1, max(1, workers), dsn)
+    done: List[str] = []
+    pending = dict(sections)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+            running = {}
+            while pending or running:
+                for table in [t for t in pending
+                              if all(p in done or p not in sections for p in TABLES[t].parents)]:
+                    running[ex.submit(_load_section, pool, pending.pop(table), batch)] = table
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                failed = None
+                for fut in finished:
+                    table = running.pop(fut)
+                    if fut.exception() is None:
+                        done.append(table)
+                    elif failed is None:
+                        failed = (table, fut.exception())
+                if failed is not None:
+                    # ошибка секции прерывает загрузку; запущенные дорабатывают
+                    for fut in list(running):
+                        if fut.exception() is None:
+                            done.append(running.pop(fut))
+                    table, exc = failed
+                    rest = [t for t in sections if t not in done and t != table]
+                    raise PartialLoadError(table, done, rest) from exc
+    finally:
+        pool.closeall()
+
+
+def load_serial(dsn: str, f: TextIO, batch: int = DEFAULT_BATCH) -> Section:
+    """Весь дамп в исходном порядке, пачками, одной транзакцией."""
+    import psycopg2
+    sec = Section('(весь дамп)')
+    started = time.perf_counter()
+
+    def counted(stmts: Iterable[str]) -> Iterator[str]:
+        for stmt in stmts:
+            sec.statements += 1
+            sec.rows += _rows_in(stmt)
+            sec.bytes += len(stmt.encode('utf-8'))
+            yield stmt
+
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
+        for text in _batches(counted(iter_statements(f)), batch):
+            cur.execute(text)
+    conn.close()
+    sec.seconds = time.perf_counter() - started
+    return sec
+
+
+def format_report(sections: Iterable[Section]) -> str:
+    lines = [f"  {'секция':<16} {'операторов':>10} {'строк':>9} {'сек':>8} {'строк/с':>10} {'МБ/с':>7}"]
+    for sec in sections:
+        rate = sec.rows / sec.seconds if sec.seconds else 0.0
+        mbps = sec.bytes / sec.seconds / 1e6 if sec.seconds else 0.0
+        lines.append(f"  {sec.table:<16} {sec.statements:>10} {sec.rows:>9} "
+                     f"{sec.seconds:>8.2f} {rate:>10.0f} {mbps:>7.2f}")
+    return '\n'.join(lines)
+
+
+def load_dump(dsn: str, path: str, *, workers: int = DEFAULT_WORKERS,
+              batch: int = DEFAULT_BATCH, single_transaction: bool = False) -> List[Section]:
+    """
+    Загружает дамп path; возвращает секции с замерами.
+    single_transaction — последовательно, одной транзакцией (всё или ничего).
+    """
+    with open_dump(path, 'r') as f:
+        if not f.seekable():
+            # stdin: последовательной загрузке может понадобиться второй проход
+            spool = tempfile.TemporaryFile('w+', encoding='utf-8')
+            shutil.copyfileobj(f, spool)
+            f = spool
+        with f:
+            f.seek(0)
+            sections = spool_dump(f) if workers > 1 and not single_transaction else None
+            if sections is None:
+                f.seek(0)
+                return [load_serial(dsn, f, batch)]
+    try:
+        load_parallel(dsn, sections, workers, batch)
+        return list(sections.values())
+    finally:
+        _close_all(sections)
+
+
+# ──────────────── CLI ────────────────
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(
+        description="Параллельная загрузка SQL-дампа parse_irbis_file в PostgreSQL")
+    ap.add_argument('dsn')
+    ap.add_argument('dump', nargs='?', default='inserts.sql',
+                    help='файл дампа (.sql, .sql.gz, .sql.zst) или - для stdin')
+    ap.add_argument('--workers', type=int, default=DEFAULT_WORKERS, metavar='N',
+                    help=f'соединений / одновременных секций (1 — последовательно, '
+                         f'одной транзакцией; по умолчанию {DEFAULT_WORKERS}). Секции '
+                         f'фиксируются независимо: при ошибке уже загруженные остаются в БД')
+    ap.add_argument('--batch', type=int, default=DEFAULT_BATCH, metavar='N',
+                    help=f'операторов в одном обороте к серверу (по умолчанию {DEFAULT_BATCH})')
+    ap.add_argument('--single-transaction', action='store_true',
+                    help='грузить весь дамп одной транзакцией (последовательно): '
+                         'при ошибке в БД не остаётся ничего')
+    args = ap.parse_args()
+    started = time.perf_counter()
+    try:
+        done = load_dump(args.dsn, args.dump, workers=args.workers, batch=args.batch,
+                         single_transaction=args.single_transaction)
+    except FileNotFoundError:
+        sys.exit(f"Ошибка: файл &laquo;{args.dump}&raquo; не найден.")
+    except PartialLoadError as e:
+        print(f"Ошибка: {e}: {e.__cause__}", file=sys.stderr)
+        print(f"  зафиксированы  : {', '.join(e.committed) or '—'}", file=sys.stderr)
+        print(f"  не загружены   : {', '.join([e.failed] + e.pending)}", file=sys.stderr)
+        print("  Зафиксированные секции остались в БД; очистите их или повторите "
+              "загрузку с --single-transaction.", file=sys.stderr)
+        sys.exit(1)
+    total = time.perf_counter() - started
+    print(f"Дамп загружен: {args.dump}  ({total:.2f} с)")
+    print(format_report(done))
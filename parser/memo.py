@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+memo.py — ограниченные LRU-кеши для чистых нормализаторов.
+
+Авторы, издательства, города и коды в экспорте ИРБИС повторяются из
+записи в запись, поэтому нормализаторы (normalize_author,
+parse_pub_info, _normalize_date, fix_grnti._normalize_code,
+split_author_fields) обёрнуты в @memoize: результат для уже
+встречавшегося аргумента берётся из functools.lru_cache.
+
+Размер кешей общий и задаётся set_cache_size() (parse_irbis_file
+--cache-size); 0 отключает кеширование.  Кешировать можно только
+чистые функции с хешируемыми аргументами и неизменяемым результатом.
+
+Статистика попаданий / промахов ведётся по каждой функции; процессы
+пула отдают свою через drain_stats(), главный процесс сливает её
+merge_stats().
+"""
+
+from __future__ import annotations
+import functools
+from typing import Callable, Dict, Optional, Tuple
+
+DEFAULT_CACHE_SIZE = 8192
+
+_cache_size = DEFAULT_CACHE_SIZE
+_REGISTRY: Dict[str, 'Memo'] = {}
+
+
+class Memo:
+    """Функция с подменяемым LRU-кешем (см. resize())."""
+
+    def __init__(self, fn: Callable):
+        functools.update_wrapper(self, fn)
+        self.fn = fn
+        self.resize(_cache_size)
+
+    def resize(self, maxsize: int) -> None:
+        """Новый пустой кеш на maxsize значений; счётчики обнуляются."""
+        self.maxsize = maxsize
+        self._call = functools.lru_cache(maxsize=maxsize)(self.fn) if maxsize > 0 else self.fn
+        self._drained = (0, 0)
+        self._merged = [0, 0]
+
+    def __call__(self, *args):
+        return self._call(*args)
+
+    def local_stats(self) -> Tuple[int, int]:
+        if self.maxsize <= 0:
+            return 0, 0
+        info = self._call.cache_info()
+        return info.hits, info.misses
+
+    def stats(self) -> Tuple[int, int]:
+        """(попаданий, промахов) — свои плюс слитые из процессов пула."""
+        hits, misses = self.local_stats()
+        return hits + self._merged[0], misses + self._merged[1]
+
+
+def memoize(fn: Callable) -> Memo:
+    memo = Memo(fn)
+    _REGISTRY[fn.__name__] = memo
+    return memo
+
+
+def cache_size() -> int:
+    return _cache_size
+
+
+def set_cache_size(maxsize: int) -> None:
+    """Размер кеша каждой функции (0 — без кеширования)."""
+    global _cache_size
+    _cache_size = maxsize
+    for memo in _REGISTRY.values():
+        memo.resize(maxsize)
+
+
+def drain_stats() -> Optional[Dict[str, Tuple[int, int]]]:
+    """Прирост счётчиков с прошлого вызова (для передачи из процесса пула)."""
+    if _cache_size <= 0:
+        return None
+    delta = {}
+    for name, memo in _REGISTRY.items():
+        hits, misses = memo.local_stats()
+        dh, dm = memo._drained
+        delta[name] = (hits - dh, misses - dm)
+        memo._drained = (hits, misses)
+    return delta
+
+
+def merge_stats(delta: Optional[Dict[str, Tuple[int, int]]]) -> None:
+    for name, (hits, misses) in (delta or {}).items():
+        memo = _REGISTRY.get(name)
+        if memo is not None:
+            memo._merged[0] += hits
+            memo._merged[1] += misses
+
+
+def report() -> str:
+    """Строки сводки: попадания / промахи по функциям, вызывавшимся в этом запуске."""
+    lines = []
+    for name, memo in _REGISTRY.items():
+        hits, misses = memo.stats()
+        if hits + misses:
+            lines.append(f"  ▸ {name:<20}: попаданий {hits}, промахов {misses} "
+                         f"({hits / (hits + misses):.1%})")
+    return '\n'.join(lines)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pair_buffer.py — компактное хранение отложенных пар (book_id, строка).
+
+_Importer до конца прогона держит все пары книга &rarr; код УДК / ГРНТИ /
+ББК и книга &rarr; поле 910.  Список кортежей стоит ~100+ байт на пару
+(кортеж, int, str); PairBuffer хранит пары колонками:
+
+  • book_id и номер строки — в array('i'), по 4 байта;
+  • строки — в таблице:
+      StringTable   — интернирование: каждый различный код хранится один
+                      раз (коды сильно повторяются);
+      PackedStrings — строки подряд в bytearray (UTF-8) со смещениями в
+                      array('q'), для почти неповторяющихся значений
+                      (сырые поля 910).
+
+Снаружи PairBuffer ведёт себя как список пар: append((book_id, s)),
+len(), повторная итерация по (book_id, s) — поэтому функции фильтрации
+(link_filter, parse_copies) работают с ним без изменений.
+
+SpillBuffer — тот же интерфейс, но пары сразу пишутся во временный файл
+(external-memory режим --spill) и при итерации читаются с диска блоками;
+в памяти остаются только счётчик и буфер записи.  BookBitmap — битовая
+карта book_id (по биту на книгу) для финальных секций такого режима.
+"""
+
+from __future__ import annotations
+import struct
+import tempfile
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+SPILL_BLOCK = 1 << 20
+_SPILL_HEAD = struct.Struct('<iI')          # book_id, длина строки в байтах
+
+
+class StringTable:
+    """Интернированные строки: str &rarr; номер, номер &rarr; str."""
+    __slots__ = ('ids', 'strings', 'lookup')
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+        self.lookup = self.strings.__getitem__
+
+    def add(self, s: str) -> int:
+        i = self.ids.get(s)
+        if i is None:
+            i = self.ids[s] = len(self.strings)
+            self.strings.append(s)
+        return i
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class PackedStrings:
+    """Строки подряд в одном bytearray; номер строки — её позиция."""
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('q', [0])
+
+    def add(self, s: str) -> int:
+        self.data += s.encode('utf-8')
+        self.offsets.append(len(self.data))
+        return len(self.offsets) - 2
+
+    def lookup(self, i: int) -> str:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+class PairBuffer:
+    """Список пар (book_id, строка) в колонках array('i')."""
+    __slots__ = ('books', 'refs', 'table')
+
+    def __init__(self, table: Optional[Union[StringTable, PackedStrings]] = None):
+        self.books = array('i')
+        self.refs = array('i')
+        self.table = table if table is not None else StringTable()
+
+    def append(self, pair: Tuple[int, str]) -> None:
+        book_id, s = pair
+        self.books.append(book_id)
+        self.refs.append(self.table.add(s))
+
+    def __len__(self) -> int:
+        return len(self.books)
+
+    def __iter__(self) -> Iterator[Tuple[int, str]]:
+        return zip(self.books, map(self.table.lookup, self.refs))
+
+    def nbytes(self) -> int:
+        """Байт в колонках (без таблицы строк)."""
+        return (self.books.itemsize * len(self.books)
+                + self.refs.itemsize * len(self.refs))
+
+
+class SpillBuffer:
+    """Пары (book_id, строка) во временном файле: [book_id, длина, UTF-8]…"""
+    __slots__ = ('_file', '_count')
+
+    def __init__(self, directory: Optional[str] = None):
+        self._file = tempfile.TemporaryFile('w+b', buffering=SPILL_BLOCK, dir=directory)
+        self._count = 0
+
+    def append(self, pair: Tuple[int, str]) -> None:
+        book_id, s = pair
+        data = s.encode('utf-8')
+        self._file.write(_SPILL_HEAD.pack(book_id, len(data)))
+        self._file.write(data)
+        self._count += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Tuple[int, str]]:
+        f = self._file
+        f.flush()
+        end = f.tell()
+        pos, head = 0, _SPILL_HEAD.size
+        buf = b''
+        while pos < end:
+            f.seek(pos)
+            chunk = f.read(min(SPILL_BLOCK, end - pos))
+            pos += len(chunk)
+            buf += chunk
+            off = 0
+            while len(buf) - off >= head:
+                book_id, n = _SPILL_HEAD.unpack_from(buf, off)
+                if len(buf) - off - head < n:
+                    break
+                yield book_id, buf[off + head:off + head + n].decode('utf-8')
+                off += head + n
+            buf = buf[off:]
+        f.seek(end)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class BookBitmap:
+    """Множество book_id — по биту на книгу, растёт по мере надобности."""
+    __slots__ = ('bits',)
+
+    def __init__(self):
+        self.bits = bytearray()
+
+    def add(self, book_id: int) -> None:
+        i = book_id >> 3
+        if i >= len(self.bits):
+            self.bits.extend(bytes(i - len(self.bits) + 1 + (len(self.bits) >> 1)))
+        self.bits[i] |= 1 << (book_id & 7)
+
+    def __contains__(self, book_id: int) -> bool:
+        i = book_id >> 3
+        return i < len(self.bits) and bool(self.bits[i] & (1 << (book_id & 7)))
@@ -15,28 +15,107 @@ v4.13 (UDC/GRNTI, BBK-raw, inline copies, dedup, авторы, description #331)
     `book_grnti_raw`, но только если у книги вообще нет совпадений.  
 • Вставка в `book_grnti_raw` из-процесса записи удалена; она
   выполняется после глобальной фильтрации.
+
+Режимы вывода
+─────────────
+• по умолчанию — SQL-дамп (INSERT-ы) в output_file;
+• output_file `-` — дамп в stdout (напр. `| psql`), сводка — в stderr;
+  `.gz` / `.zst` или --compress — сжатый дамп;
+• --batch-size N — тот же дамп, но многострочными INSERT-ами по N строк
+                 на таблицу, без покомментарных баннеров;
+• --load       — прямая загрузка в БД по тому же DSN через
+                 COPY ... FROM STDIN (pg_copy.CopyLoader), одна транзакция;
+• --delta STATE — только изменения относительно прошлого запуска:
+                 INSERT / UPDATE / DELETE по отпечаткам записей
+                 (irbis_delta.DeltaState, _DeltaImporter).
+
+Готовый дамп можно загрузить параллельно: load_dump.py раскладывает его
+по таблицам и грузит независимые секции одновременно через пул
+соединений, соблюдая внешние ключи.
+
+Справочники UDC / GRNTI по умолчанию читаются из БД.  С --snapshot FILE
+они берутся из локального снимка (dict_snapshot.py), сверяемого с БД по
+контрольной сумме таблиц; с --offline — только из снимка, без БД.
+С --hierarchical коды сопоставляются не точно, а по префиксному дереву
+справочника (code_trie): составные — по компонентам, детальные — с
+ближайшим предком.  С --bbk-match рубрики 606/610 сопоставляются с
+описаниями public.bbk (bbk_index) и пишутся в book_bbk.  С --dedup-authors
+варианты написания одного автора сливаются в одну строку author
+(author_dedup), с --dedup-books повторные записи одного издания сливаются
+в одну книгу (book_dedup), с --canon-publishers варианты названия издательства — в
+одну строку publisher, а слитые написания пишутся в publisher_alias
+(fix_publishers).
+
+Конвейер
+────────
+1. irbis_scan     — деление экспорта на записи: файл отображается в
+   память (mmap), границы ищутся байтовым поиском `*****`, кодировка
+   (UTF-8 / cp1251) определяется по образцу или задаётся --encoding,
+   каждая запись декодируется один раз;
+2. parse_record()  — разбор одной записи (чистая функция, без ID):
+   строки токенизируются один раз в irbis_record.IrbisRecord, подполя
+   декодируются лениво, по запросу обработчика поля;
+   с --workers N выполняется в пуле процессов пачками записей;
+3. _Importer.add() — последовательно, в исходном порядке записей,
+   назначает ID книг/издателей/авторов и отдаёт строки приёмнику,
+   поэтому результат не зависит от числа процессов;
+4. финальные секции (UDC / GRNTI / GRNTI RAW / экземпляры) — по парам,
+   накопленным в п. 3.  С --spill пары лежат во временных файлах и
+   читаются потоком; в памяти остаётся лишь битовая карта книг с
+   совпавшим ГРНТИ.
+
+С --checkpoint FILE импорт периодически сохраняет смещения во входном
+файле и дампе и состояние _Importer (checkpoint.py); после сбоя
+--resume продолжает с последней точки, и дамп совпадает с непрерывным
+прогоном.
+
+Этапы конвейера инструментированы (import_metrics.METRICS):
+--metrics-json FILE пишет время и число вызовов по этапам, --profile
+FILE — статистику cProfile для python -m pstats.
 """
 
 from __future__ import annotations
-import sys, os, re
+import sys, os, re, argparse
 from datetime import datetime
-from typing import Dict, List, Set, Tuple, Iterable, Optional
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Set, Tuple, Iterable, Iterator, Optional, Deque
 
-import psycopg2
+try:
+    import psycopg2
+except ImportError:             # не нужен для offline-разбора по снимку справочников
+    psycopg2 = None
 
-from fix_bbk      import collect as collect_bbk_codes
-from fix_udc      import load_udc_map,  filter_links as filter_udc_links
-from fix_grnti    import load_grnti_map, filter_links as filter_grnti_links
-from fix_pub_info import parse_pub_info
-from fix_authors  import normalize_author, parse_author_700_701
+from irbis_record import IrbisRecord, IrbisField, iter_subfields
+from irbis_scan   import MappedExport, ENCODINGS
+from fix_bbk      import collect_record as collect_bbk_record
+from fix_udc      import filter_links as filter_udc_links
+from fix_udc      import filter_links_hierarchical as filter_udc_links_hier
+from fix_udc      import iter_links as iter_udc_links
+from fix_grnti    import filter_links as filter_grnti_links
+from fix_grnti    import filter_links_hierarchical as filter_grnti_links_hier
+from fix_grnti    import iter_links as iter_grnti_links
+from code_trie    import UdcIndex, GrntiIndex, MATCH_LEVELS
+from bbk_index    import BbkIndex, MATCH_FUZZY, DEFAULT_THRESHOLD as BBK_DEFAULT_THRESHOLD
+from link_filter  import filter_resolved_links, iter_resolved_links
+from author_dedup import AuthorClusters
+from book_dedup   import BookIndex, edition_key
+from pair_buffer  import PairBuffer, PackedStrings, SpillBuffer, BookBitmap
+from fix_publishers import PublisherIndex
+from dict_snapshot import load_dictionaries
+from fix_pub_info import record_pub_info
+from fix_authors  import normalize_author, record_authors
+from sql_output   import sql_val, SqlDumpWriter, BatchSqlWriter, open_dump, COMPRESSIONS
+from sql_output   import dump_compression
+from checkpoint   import Checkpoint, DEFAULT_EVERY as CHECKPOINT_EVERY
+from pg_copy      import CopyLoader
+from irbis_delta  import DeltaState, record_key, record_fingerprint
+from import_metrics import METRICS, enable as enable_metrics
+import memo
+from memo         import memoize
+from link_filter  import format_histogram
 
 # ───────────────────────── utils ─────────────────────────
-def sql_escape(s: str) -> str:
-    return s.replace("'", "''")
-
-def sql_val(s: str | None) -> str:
-    return f"'{sql_escape(s)}'" if s else "NULL"
-
 _SPLIT_CODES_RE = re.compile(r'[;,]\s*|\s{2,}')
 def split_codes(raw: str) -> List[str]:
     return [x.strip() for x in _SPLIT_CODES_RE.split(raw) if x.strip()]
@@ -44,6 +123,7 @@ def split_codes(raw: str) -> List[str]:
 _INITIAL_RE = re.compile(r'[A-Za-zА-Яа-яЁё]')
 
 # ───── авторы ─────
+@memoize
 def split_author_fields(author: str) -> Tuple[str, str, str]:
     author = normalize_author(author) 
     if ' ' not in author:
@@ -55,21 +135,13 @@ def split_author_fields(author: str) -> Tuple[str, str, str]:
     return last, first, patr
 
 # ───── helpers: 910 (экземпляры) ─────
-_SUBFIELD_SEP = '\x1f'
 _PRICE_RE     = re.compile(r'[\d\.,]+')
 _DATE_FORMATS = [
     ("%d.%m.%Y", re.compile(r"^\d{2}\.\d{2}\.\d{4}$")),
     ("%d.%m.%y", re.compile(r"^\d{2}\.\d{2}\.\d{2}$")),
     ("%Y-%m-%d", re.compile(r"^\d{4}-\d{2}-\d{2}$")),
 ]
-def _iter_subfields(text: str) -> Iterable[tuple[str,str]]:
-    if _SUBFIELD_SEP not in text and '^' in text:
-        text = text.replace('^', _SUBFIELD_SEP)
-    for chunk in text.split(_SUBFIELD_SEP):
-        chunk = chunk.strip()
-        if chunk:
-            yield chunk[0].upper(), chunk[1:].strip()
-
+@memoize
 def _normalize_date(raw: str) -> Optional[str]:
     raw = raw.strip()
     if not raw:
@@ -94,27 +166,24 @@ def _normalize_price(raw: str) -> Optional[str]:
     val = m.group(0).replace(',', '.')
     return val[:-1] if val.endswith('.') else val
 
-def parse_copies(
-    pairs: List[Tuple[int,str]]
-) -> Tuple[List[Tuple[int,str|None,str|None,str|None,str|None]], int]:
+def iter_copies(
+    pairs: Iterable[Tuple[int,str]], skipped: List[int]
+) -> Iterator[Tuple[int,str|None,str|None,str|None,str|None]]:
     """
-    Очистка и нормализация подполей поля 910 (экземпляры).
-    Возвращает:
-        cleaned — нормализованный список
-        skipped — сколько строк пропущено из-за ошибок
+    Очистка и нормализация подполей поля 910 (экземпляры), потоком.
+    Отдаёт нормализованные строки; skipped[0] увеличивается на число
+    строк, пропущенных из-за ошибок.
     """
-    cleaned: List[Tuple[int,str|None,str|None,str|None,str|None]] = []
-    skipped = 0
     for book_id, raw in pairs:
-        subs = list(_iter_subfields(raw))
+        subs = list(iter_subfields(raw))
         if not subs:
-            skipped += 1
+            skipped[0] += 1
             continue
+        rows: List[Tuple[int,str|None,str|None,str|None,str|None]] = []
         cur = {"B": None, "C": None, "D": None, "E": None}
         def _flush():
-            nonlocal skipped
             if cur["B"]:
-                cleaned.append((
+                rows.append((
                     book_id,
                     cur["B"],
                     _normalize_date(cur["C"] or ''),
@@ -122,7 +191,7 @@ def parse_copies(
                     _normalize_price(cur["E"] or '')
                 ))
             else:
-                skipped += 1
+                skipped[0] += 1
             for k in cur:
                 cur[k] = None
 
@@ -135,30 +204,580 @@ def parse_copies(
                 cur[code] = val
         if any(cur.values()):
             _flush()
-    return cleaned, skipped
+        yield from rows
+
+
+def parse_copies(
+    pairs: Iterable[Tuple[int,str]]
+) -> Tuple[List[Tuple[int,str|None,str|None,str|None,str|None]], int]:
+    """
+    Очистка и нормализация подполей поля 910 (экземпляры).
+    Возвращает:
+        cleaned — нормализованный список
+        skipped — сколько строк пропущено из-за ошибок
+    """
+    skipped = [0]
+    cleaned = list(iter_copies(pairs, skipped))
+    return cleaned, skipped[0]
+
+
+def _copy_key(book_id: int, inv_no: str):
+    """Ключ (книга, инв. номер) для отсева дублей: одно int, если номер числовой."""
+    if inv_no.isascii() and inv_no.isdigit() and len(inv_no) <= 9 and inv_no[0] != '0':
+        return (book_id << 30) | int(inv_no)
+    return (book_id, inv_no)
+
+
+# ───── разбор одной записи ─────
+class ParsedRecord(NamedTuple):
+    """Результат parse_record(): всё, что нужно для INSERT-ов, кроме ID."""
+    title            : str
+    type_            : str
+    edit             : str
+    edition_statement: str
+    phys_desc        : str
+    series           : str
+    description      : str
+    publisher        : Optional[str]
+    city             : Optional[str]
+    year             : Optional[int]
+    authors          : List[Tuple[str, str, str]]   # (last, first, patr), по порядку вставки
+    bbk_codes        : List[str]
+    udc_codes        : List[str]
+    grnti_codes      : List[str]
+    copies           : List[str]                    # сырые поля 910
+    record_id        : str                          # шифр #903 (ключ delta-режима)
+
+
+def parse_record(lines: List[str]) -> Optional[ParsedRecord]:
+    """
+    Разбирает строки одной записи.  Возвращает None для записей,
+    которые не относятся к базе IBIS (#920).  Не трогает общего
+    состояния, поэтому безопасна для пула процессов.
+    """
+    with METRICS.stage('tokenize'):
+        rec = IrbisRecord.from_lines(lines)
+    return parse_irbis_record(rec)
+
+
+def _joined(fld: Optional[IrbisField], codes: str, sep: str) -> str:
+    """Непустые подполя codes поля fld через sep."""
+    if fld is None:
+        return ''
+    sd = fld.subdict()
+    return sep.join(x for x in (sd.get(c, '').strip() for c in codes) if x)
+
+
+def parse_irbis_record(rec: IrbisRecord) -> Optional[ParsedRecord]:
+    """parse_record() для уже токенизированной записи."""
+    with METRICS.stage('tag_handlers'):
+        if not rec.in_database('IBIS'):
+            return None
+
+        f200 = rec.get('200')
+        sd = f200.subdict() if f200 is not None else {}
+        f205 = rec.get('205')
+        with METRICS.stage('pub_info'):
+            publisher_name, pub_city, pub_year = record_pub_info(rec)
+        with METRICS.stage('authors'):
+            authors = [split_author_fields(a) for a in sorted(record_authors(rec))]
+        with METRICS.stage('bbk_collect'):
+            bbk_codes = collect_bbk_record(rec)
+
+        return ParsedRecord(
+            sd.get('A','').strip(),                                     # title
+            sd.get('E','').strip(),                                     # type
+            sd.get('F','').strip(),                                     # edit
+            f205.sub('A').strip() if f205 is not None else '',          # edition_statement
+            _joined(rec.get('215'), 'A1', ' '),                         # phys_desc
+            _joined(rec.get('225'), 'VA', ' '),                         # series
+            rec.text('331').strip(),                                    # description
+            publisher_name, pub_city, pub_year,
+            authors,
+            bbk_codes,
+            split_codes(rec.text('675').strip()),
+            split_codes(rec.text('964').strip()),
+            [fld.text.strip() for fld in rec.get_all('910')],
+            rec.text('903').strip(),
+        )
+
+
+# ───── параллельный разбор ─────
+_CHUNK_RECORDS = 500        # записей в одной задаче пула
+
+def _init_worker(metrics: bool, cache_size: int) -> None:
+    if metrics:
+        enable_metrics(reset=True)
+    memo.set_cache_size(cache_size)
+
+def _parse_chunk(chunk: List[List[str]]) -> Tuple[List[Optional[ParsedRecord]], Optional[Dict], Optional[Dict]]:
+    """Пачка записей в процессе пула; плюс замеры этапов и статистика кешей (или None)."""
+    return [parse_record(r) for r in chunk], METRICS.drain(), memo.drain_stats()
+
+def _chunk_results(fut) -> List[Optional[ParsedRecord]]:
+    results, stages, cache_stats = fut.result()
+    METRICS.merge(stages)
+    memo.merge_stats(cache_stats)
+    return results
+
+def _chunked(records: Iterable[List[str]], size: int) -> Iterator[List[List[str]]]:
+    chunk: List[List[str]] = []
+    for rec in records:
+        chunk.append(rec)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def parse_records(records: Iterable[List[str]], workers: int = 1) -> Iterator[Optional[ParsedRecord]]:
+    """
+    parse_record() для потока записей с сохранением их порядка.
+    workers > 1 — пачки по _CHUNK_RECORDS записей разбираются в
+    ProcessPoolExecutor; в работе одновременно не больше 4·workers пачек,
+    так что память остаётся ограниченной и на больших экспортах.
+    Замеры этапов разбора и статистика кешей из процессов пула
+    суммируются в главном процессе.
+    """
+    if workers <= 1:
+        yield from map(parse_record, records)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(METRICS.enabled, memo.cache_size())) as ex:
+        pending: deque = deque()
+        for chunk in _chunked(records, _CHUNK_RECORDS):
+            pending.append(ex.submit(_parse_chunk, chunk))
+            if len(pending) >= workers * 4:
+                yield from _chunk_results(pending.popleft())
+        while pending:
+            yield from _chunk_results(pending.popleft())
+
+
+# ───── назначение ID и вывод ─────
+class _Importer:
+    """
+    Последовательная часть импорта: нумерует книги, издателей и авторов
+    в порядке записей, пишет строки в приёмник и копит отложенные пары
+    UDC / GRNTI / экземпляров для финальных секций.
+    """
+
+    def __init__(self, out, dedup_authors: bool = False, canon_publishers: bool = False,
+                 dedup_books: bool = False, spill: bool = False):
+        self.out = out
+        self.record_count = 0
+        # объединение записей одного издания (book_dedup)
+        self.book_index = BookIndex() if dedup_books else None
+        self.publisher_ids: Dict[str,int] = {}
+        self.next_publisher_id = 1
+        # канонизация вариантов названий издательств (fix_publishers)
+        self.publisher_index = PublisherIndex() if canon_publishers else None
+        self.publisher_aliases = 0
+        # (last, first, patr, birth) &rarr; id
+        self.author_ids: Dict[Tuple[str,str,str,None], int] = {}
+        self.next_author_id = 1
+        self.total_book_author_links = 0
+        # нечёткое объединение вариантов написания авторов (author_dedup)
+        self.author_clusters = AuthorClusters() if dedup_authors else None
+
+        # ББК записи без заглавия переходят к следующей книге
+        # (историческое поведение, сохраняется ради идентичного дампа)
+        self.pending_bbk    : List[str] = []
+        # пары (book_id, код / поле 910) — колонками, см. pair_buffer;
+        # с spill — во временных файлах
+        self.bbk_pairs_raw    = SpillBuffer() if spill else PairBuffer()
+        self.udc_pairs_raw    = SpillBuffer() if spill else PairBuffer()
+        self.grnti_pairs_raw  = SpillBuffer() if spill else PairBuffer()
+        self.copies_pairs_raw = SpillBuffer() if spill else PairBuffer(PackedStrings())
+
+    def add(self, r: ParsedRecord) -> None:
+        self.record_count += 1
+        self.pending_bbk.extend(r.bbk_codes)
+        book_id, merged = self.record_count, False
+        if self.book_index is not None and r.title:
+            key = edition_key(r.title, r.edition_statement, r.publisher, r.year, r.authors)
+            book_id, merged = self.book_index.resolve(key, book_id)
+        self._emit(book_id, r, merged=merged)
+
+    def _emit(self, book_id: int, r: ParsedRecord, update: bool = False,
+              merged: bool = False) -> None:
+        """
+        Строки одной книги.  update=True — книга уже есть в БД
+        (delta-режим): вместо INSERT в book пишется UPDATE, а зависимые
+        строки удаляются и вставляются заново.  merged=True — запись
+        повторяет уже выданное издание book_id: строки book и места
+        публикации не пишутся, а авторы, коды и экземпляры добавляются
+        к нему (повторы отсекает ON CONFLICT).
+        """
+        out = self.out
+
+        # --- Издатели ---
+        out.comment("-- --- Издатели ---\n")
+        pub_id = None
+        if r.publisher:
+            if r.publisher not in self.publisher_ids:
+                canon = self.publisher_index.match(r.publisher) if self.publisher_index else None
+                if canon is not None:
+                    self.publisher_ids[r.publisher] = self.publisher_ids[canon]
+                    out.row('publisher_alias', (r.publisher, self.publisher_ids[canon]))
+                    self.publisher_aliases += 1
+                else:
+                    self.publisher_ids[r.publisher] = self.next_publisher_id
+                    out.row('publisher', (self.next_publisher_id, r.publisher))
+                    self.next_publisher_id += 1
+                    if self.publisher_index:
+                        self.publisher_index.add(r.publisher)
+            pub_id = self.publisher_ids[r.publisher]
+
+        # --- Книга ---
+        repeat = f" (повтор, запись #{self.record_count})" if merged else ''
+        out.comment(f"\n-- --- Книга #{book_id}{repeat} ---\n")
+        if not r.title:
+            return
+        # повтор издания (merged): строки book и места публикации уже выданы
+        if update and not merged:
+            # upsert: строка book могла остаться в БД (выдачи) или быть удалена
+            out.statement(
+                "INSERT INTO public.book(id,title,\"type\",edit,edition_statement,phys_desc,series,description) "
+                f"VALUES ({book_id}, {sql_val(r.title)}, {sql_val(r.type_)}, {sql_val(r.edit)}, "
+                f"{sql_val(r.edition_statement)}, {sql_val(r.phys_desc)}, {sql_val(r.series)}, "
+                f"{sql_val(r.description)}) ON CONFLICT (id) DO UPDATE SET title=EXCLUDED.title, "
+                "\"type\"=EXCLUDED.\"type\", edit=EXCLUDED.edit, edition_statement=EXCLUDED.edition_statement, "
+                "phys_desc=EXCLUDED.phys_desc, series=EXCLUDED.series, description=EXCLUDED.description;")
+            for table in _BOOK_CHILD_TABLES:
+                out.statement(f"DELETE FROM public.{table} WHERE book_id={book_id};")
+        elif not merged:
+            out.row('book', (book_id, r.title, r.type_, r.edit, r.edition_statement,
+                             r.phys_desc, r.series, r.description))
+
+        # --- Место публикации ---
+        if not merged:
+            out.comment("\n-- --- Место публикации ---\n")
+            out.row('book_pub_place', (book_id, pub_id, r.city, r.year or None))
+
+        # --- Авторы ---
+        if r.authors:
+            out.comment("\n-- --- Авторы ---\n")
+        for last, first, patr in r.authors:
+            key = (last, first, patr, None)
+            if key not in self.author_ids:
+                canon = self.author_clusters.match(key) if self.author_clusters else None
+                if canon is not None:
+                    self.author_ids[key] = self.author_ids[canon]
+                else:
+                    self.author_ids[key] = self.next_author_id
+                    out.row('author', (self.next_author_id, last, first, patr, None))
+                    self.next_author_id += 1
+                    if self.author_clusters:
+                        self.author_clusters.add(key)
+            out.row('book_author', (book_id, self.author_ids[key]))
+            self.total_book_author_links += 1
+
+        # --- BBK / UDC / GRNTI RAW (сбор, но не INSERT) ---
+        out.comment("\n-- --- Коды BBK / UDC / GRNTI (RAW) ---\n")
+        # BBK: сразу вставляем, как и раньше
+        for code in self.pending_bbk:
+            self.bbk_pairs_raw.append((book_id, code))
+            out.row('book_bbk_raw', (book_id, code))
+        self.pending_bbk.clear()
+
+        # UDC: сразу пишем в RAW (логика не менялась)
+        for code in r.udc_codes:
+            self.udc_pairs_raw.append((book_id, code))
+            out.row('book_udc_raw', (book_id, code))
+
+        # GRNTI: ТОЛЬКО собираем для дальнейшей фильтрации
+        for code in r.grnti_codes:
+            self.grnti_pairs_raw.append((book_id, code))
+
+        # Экземпляры
+        for cp in r.copies:
+            self.copies_pairs_raw.append((book_id, cp))
+
+    def copy_row(self, row: Tuple[int,str,Optional[str],Optional[str],Optional[str]]) -> None:
+        self.out.row('book_copy', row)
+
+    def finish(self) -> None:
+        pass
+
+    def state(self) -> Dict:
+        """Всё состояние, кроме приёмника, — для контрольной точки."""
+        return {k: v for k, v in vars(self).items() if k != 'out'}
+
+    def restore(self, state: Dict) -> None:
+        vars(self).update(state)
+
+
+# Строки, которые delta-режим пересоздаёт для изменённой книги.
+# Экземпляры сюда не входят: их удаление каскадом стёрло бы историю
+# выдач, поэтому они обновляются по (book_id, inventory_no).
+_BOOK_CHILD_TABLES = ('book_pub_place', 'book_author', 'book_bbk_raw', 'book_bbk',
+                      'book_udc_raw', 'book_udc', 'book_grnti', 'book_grnti_raw')
+
+# Книги и экземпляры с историей выдач delta-режим не удаляет: каскад
+# book &rarr; book_copy &rarr; borrow_record стёр бы её.  Связи такой книги
+# и экземпляры без выдач удаляются явно (_DeltaImporter._remove_book).
+_COPY_HAS_NO_LOANS = ("NOT EXISTS (SELECT 1 FROM public.borrow_record br "
+                      "WHERE br.book_copy_id = public.book_copy.id)")
+
+def _delete_book_sql(book_id: int) -> str:
+    return (f"DELETE FROM public.book WHERE id={book_id} AND NOT EXISTS ("
+            "SELECT 1 FROM public.book_copy bc JOIN public.borrow_record br "
+            f"ON br.book_copy_id = bc.id WHERE bc.book_id = {book_id});")
+
+
+class _DeltaImporter(_Importer):
+    """
+    Delta-режим: пишет только новые, изменённые и удалённые записи
+    относительно прошлого запуска (irbis_delta.DeltaState).
+
+    • новая запись     — INSERT-ы как при полном импорте, новый book.id;
+    • изменённая       — upsert book, пересоздание зависимых строк,
+                         upsert экземпляров и удаление исчезнувших;
+    • удалённая        — DELETE связей и экземпляров без выдач, затем
+                         DELETE FROM book.
+
+    Книги и экземпляры, по которым были выдачи, не удаляются (см.
+    _delete_book_sql) — история выдач сохраняется.  Ключ удалённой
+    записи остаётся в состоянии (отпечаток None), и вернувшаяся запись
+    получает прежний book.id, а не дубль рядом с оставшейся книгой.
+
+    Записи обрабатываются независимо друг от друга: рубрики 606/610
+    записи без заглавия к следующей книге не переносятся.
+    """
+
+    def __init__(self, out, state: DeltaState, dedup_authors: bool = False,
+                 canon_publishers: bool = False, spill: bool = False):
+        super().__init__(out, dedup_authors, canon_publishers, spill=spill)
+        self.state = state
+        self.publisher_ids = dict(state.publishers)
+        self.next_publisher_id = state.next_publisher_id
+        if self.publisher_index:
+            seen_ids = set()
+            for name, pid in self.publisher_ids.items():
+                if pid not in seen_ids:
+                    seen_ids.add(pid)
+                    self.publisher_index.add(name)
+        self.author_ids = dict(state.authors)
+        self.next_author_id = state.next_author_id
+        if self.author_clusters:
+            # канонический — первое написание с данным id
+            seen_ids = set()
+            for key, aid in self.author_ids.items():
+                if aid not in seen_ids:
+                    seen_ids.add(aid)
+                    self.author_clusters.add(key)
+        self.seen_keys: Set[str] = set()
+        self.updated_books: Set[int] = set()
+        self.new = self.changed = self.unchanged = self.removed = 0
+
+    def add(self, r: ParsedRecord) -> None:
+        self.record_count += 1
+        st = self.state
+        key = base = record_key(r.record_id, r.title, r.edition_statement,
+                                r.publisher, r.year, r.authors)
+        n = 1
+        while key in self.seen_keys:        # повторный шифр в экспорте
+            n += 1
+            key = f"{base}#{n}"
+        self.seen_keys.add(key)
+
+        fp = record_fingerprint(r)
+        old = st.records.get(key)
+        if old is not None and old[2] == fp:
+            self.unchanged += 1
+            return
+
+        if old is None:
+            self.new += 1
+            book_id, had_book = st.next_book_id, False
+            st.next_book_id += 1
+        else:
+            self.changed += 1
+            book_id, had_book = old[0], old[1]
+            if had_book and not r.title:
+                self._remove_book(book_id)
+
+        st.records[key] = [book_id, bool(r.title), fp]
+        self.pending_bbk = list(r.bbk_codes)
+        # книга, удалённая раньше, могла остаться в БД из-за выдач — поэтому upsert
+        update = old is not None and bool(r.title)
+        self._emit(book_id, r, update=update)
+        if update:
+            self.updated_books.add(book_id)
+            inv = [c[1] for c in parse_copies([(book_id, cp) for cp in r.copies])[0]]
+            keep = f" AND inventory_no NOT IN ({', '.join(sql_val(i) for i in inv)})" if inv else ''
+            self.out.statement(f"DELETE FROM public.book_copy WHERE book_id={book_id}{keep} "
+                               f"AND {_COPY_HAS_NO_LOANS};")
+
+    def copy_row(self, row) -> None:
+        bid, inv_no, date_in, storage, price = row
+        if bid not in self.updated_books:
+            self.out.row('book_copy', row)
+            return
+        self.out.statement(
+            "INSERT INTO public.book_copy(book_id,inventory_no,receipt_date,storage_place,price) "
+            f"VALUES ({bid},{sql_val(inv_no)},{sql_val(date_in)},{sql_val(storage)},{price or 'NULL'}) "
+            "ON CONFLICT (book_id,inventory_no) DO UPDATE SET receipt_date=EXCLUDED.receipt_date, "
+            "storage_place=EXCLUDED.storage_place, price=EXCLUDED.price;")
+
+    def _remove_book(self, book_id: int) -> None:
+        """Связи и экземпляры без выдач, затем сама книга, если выдач не было."""
+        for table in _BOOK_CHILD_TABLES:
+            self.out.statement(f"DELETE FROM public.{table} WHERE book_id={book_id};")
+        self.out.statement(f"DELETE FROM public.book_copy WHERE book_id={book_id} "
+                           f"AND {_COPY_HAS_NO_LOANS};")
+        self.out.statement(_delete_book_sql(book_id))
+
+    def finish(self) -> None:
+        """Удаляет исчезнувшие записи и переносит счётчики в состояние."""
+        st = self.state
+        self.out.comment("\n-- ======================================\n-- Удалённые записи\n-- ======================================\n")
+        for key, entry in st.records.items():
+            if key in self.seen_keys or entry[2] is None:   # None — уже удалена
+                continue
+            book_id, had_book, _ = entry
+            self.removed += 1
+            if had_book:
+                self._remove_book(book_id)
+            # ключ остаётся: книга с выдачами могла уцелеть
+            entry[2] = None
+        st.publishers = self.publisher_ids
+        st.next_publisher_id = self.next_publisher_id
+        st.authors = self.author_ids
+        st.next_author_id = self.next_author_id
 
 
 # ────────────────────── main ───────────────────────────
-def parse_irbis_file(dsn: str, infile: str, outfile: str) -> None:
-    print(f"Начало обработки файла: {infile}")
+def parse_irbis_file(dsn: str, infile: str, outfile: str, *,
+                     load: bool = False, workers: int = 1, batch_size: int = 0,
+                     delta_state: Optional[str] = None,
+                     snapshot: Optional[str] = None, offline: bool = False,
+                     metrics_json: Optional[str] = None,
+                     cache_size: int = memo.DEFAULT_CACHE_SIZE,
+                     hierarchical: bool = False,
+                     bbk_threshold: Optional[float] = None,
+                     dedup_authors: bool = False,
+                     author_report: Optional[str] = None,
+                     canon_publishers: bool = False,
+                     compress: Optional[str] = None,
+                     dedup_books: bool = False,
+                     spill: bool = False,
+                     checkpoint: Optional[str] = None,
+                     checkpoint_every: int = CHECKPOINT_EVERY,
+                     resume: bool = False,
+                     encoding: Optional[str] = None) -> None:
+    """
+    Разбирает экспорт ИРБИС.
+    load=False — пишет SQL-дамп в outfile (как раньше);
+    load=True  — грузит строки в БД по тому же DSN через COPY
+                 (одна транзакция, outfile не используется).
+    workers    — число процессов для разбора записей (1 — без пула).
+    batch_size — > 0: многострочные INSERT-ы по batch_size строк.
+    delta_state — путь к файлу состояния: писать только изменения
+                 относительно прошлого запуска (см. _DeltaImporter).
+    snapshot   — файл снимка справочников UDC/GRNTI (dict_snapshot.py);
+    offline    — брать справочники только из снимка, без подключения к БД.
+    metrics_json — файл для поэтапных замеров (import_metrics.METRICS).
+    cache_size — размер LRU-кешей нормализаторов (memo.py; 0 — выключены).
+    hierarchical — сопоставлять UDC / GRNTI через префиксное дерево
+                 (code_trie): составные коды по компонентам, детальные —
+                 с ближайшим предком из справочника.
+    bbk_threshold — не None: сопоставлять рубрики 606/610 с описаниями
+                 public.bbk (bbk_index, точно или по триграммам со
+                 сходством >= bbk_threshold) и писать связи в book_bbk.
+    dedup_authors — сливать варианты написания авторов (author_dedup);
+    author_report — TSV-отчёт о слияниях.
+    canon_publishers — сводить варианты названий издательств к одному
+                 (fix_publishers), варианты — в publisher_alias.
+    compress   — 'gzip' / 'zstd' (по умолчанию — по расширению outfile);
+                 outfile '-' — дамп в stdout, сводка в stderr.
+    dedup_books — сливать повторные записи одного издания в одну книгу
+                 (book_dedup); несовместимо с delta-режимом.
+    spill      — external-memory режим: отложенные пары кодов и
+                 экземпляров пишутся во временные файлы (pair_buffer.
+                 SpillBuffer) и читаются потоком в финальных секциях;
+                 дубли ищутся среди подряд идущих пар одной книги, поэтому
+                 несовместимо с dedup_books (пары слитой книги не подряд).
+    checkpoint — файл контрольной точки (checkpoint.py), сохраняется
+                 каждые checkpoint_every записей и по концу входа;
+                 только для несжатого дампа в файл.
+    resume     — продолжить с контрольной точки checkpoint.
+    encoding   — кодировка экспорта ('utf-8' / 'cp1251'); None — определить
+                 по образцу (irbis_scan.detect_encoding).
+    """
+    if delta_state and load:
+        sys.exit("Ошибка: delta-режим несовместим с --load.")
+    if delta_state and dedup_books:
+        sys.exit("Ошибка: delta-режим несовместим с --dedup-books.")
+    if spill and dedup_books:
+        sys.exit("Ошибка: --spill несовместим с --dedup-books.")
+    if offline and (load or not snapshot):
+        sys.exit("Ошибка: --offline требует --snapshot и несовместим с --load.")
+    if resume and not checkpoint:
+        sys.exit("Ошибка: --resume требует --checkpoint FILE.")
+    if checkpoint and (load or delta_state or spill or outfile == '-'
+                       or dump_compression(outfile, compress)):
+        sys.exit("Ошибка: --checkpoint — только для несжатого SQL-дампа в файл "
+                 "(без --load, --delta и --spill).")
+    log = sys.stderr if outfile == '-' and not load else sys.stdout
+    print(f"Начало обработки файла: {infile}", file=log)
+    if metrics_json:
+        enable_metrics()
+    memo.set_cache_size(cache_size)
+    started = datetime.now()
 
-    # (last, first, patr, birth) &rarr; id
-    author_ids: Dict[Tuple[str,str,str,None], int] = {}
-    next_author_id = 1
-    total_book_author_links = 0
+    with METRICS.stage('dictionaries'):
+        names = ('udc', 'grnti') + (('bbk_desc',) if bbk_threshold is not None else ())
+        dicts = load_dictionaries(dsn, names, snapshot=snapshot, offline=offline)
+    udc_map, grnti_map = dicts['udc'], dicts['grnti']
 
-    with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
-        udc_map   = load_udc_map(cur)
-        grnti_map = load_grnti_map(cur)
+    try:
+        f = MappedExport(infile, encoding)
+    except FileNotFoundError:
+        sys.exit(f"Ошибка: файл &laquo;{infile}&raquo; не найден.")
+    if f.encoding != 'utf-8':
+        print(f"Кодировка входного файла: {f.encoding}", file=log)
 
-        try:
-            with open(infile, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-        except FileNotFoundError:
-            sys.exit(f"Ошибка: файл &laquo;{infile}&raquo; не найден.")
+    # ───── контрольные точки ─────
+    ck: Optional[Checkpoint] = None
+    if checkpoint:
+        options = {'batch_size': batch_size, 'dedup_authors': dedup_authors,
+                   'canon_publishers': canon_publishers, 'dedup_books': dedup_books,
+                   'encoding': f.encoding}
+        if resume:
+            try:
+                ck = Checkpoint.load(checkpoint)
+            except FileNotFoundError:
+                f.close()
+                sys.exit(f"Ошибка: контрольная точка &laquo;{checkpoint}&raquo; не найдена.")
+            except ValueError as e:
+                f.close()
+                sys.exit(f"Ошибка: {e}")
+            problem = ck.mismatch(infile, outfile, options)
+            if problem:
+                f.close()
+                sys.exit(f"Ошибка: продолжить с {checkpoint} нельзя — {problem}.")
+            print(f"Продолжение с контрольной точки {checkpoint}: "
+                  f"записей обработано {ck.records_read}", file=log)
+        else:
+            ck = Checkpoint(infile, outfile, options)
+    resumed_at = ck.records_read if resume else 0
 
-        with open(outfile, 'w', encoding='utf-8') as sql_out:
-            sql_out.write(f"""\
+    if load:
+        out = CopyLoader()
+    else:
+        try:
+            if resume:
+                os.truncate(outfile, ck.output_offset)
+                dump = open_dump(outfile, 'a')
+            else:
+                dump = open_dump(outfile, 'w', compress)
+        except (OSError, RuntimeError, ValueError) as e:
+            sys.exit(f"Ошибка: {e}")
+        out = BatchSqlWriter(dump, batch_size) if batch_size > 0 else SqlDumpWriter(dump)
+    with f, out:
+        if not resume:
+            out.write(f"""\
 -- ======================================================
 -- SQL-дамп, создан parse_irbis_file v4.13
 -- Дата создания : {datetime.now():%Y-%m-%d %H:%M:%S}
@@ -166,245 +785,327 @@ def parse_irbis_file(dsn: str, infile: str, outfile: str) -> None:
 -- ======================================================
 
 """)
+        delta = DeltaState.load(delta_state) if delta_state else None
+        imp = (_DeltaImporter(out, delta, dedup_authors, canon_publishers, spill=spill) if delta
+               else _Importer(out, dedup_authors, canon_publishers, dedup_books, spill=spill))
+        if resume:
+            imp.restore(ck.importer)
+            out.restore(ck.writer)
+
+        # ───── чтение и разбор входного файла (потоково) ─────
+        ends: Deque[int] = deque()
+        records = METRICS.iterate('split', f.records(ck.input_offset if resume else 0,
+                                                     ends if ck else None))
+        for parsed in parse_records(records, workers):
+            if parsed is not None:
+                with METRICS.stage('sql_emit'):
+                    imp.add(parsed)
+            if ck:
+                ck.input_offset = ends.popleft()
+                ck.records_read += 1
+                if ck.records_read % checkpoint_every == 0:
+                    with METRICS.stage('checkpoint'):
+                        _save_checkpoint(ck, checkpoint, imp, out, dump)
+        if ck:
+            with METRICS.stage('checkpoint'):
+                _save_checkpoint(ck, checkpoint, imp, out, dump)
+        with METRICS.stage('sql_emit'):
+            imp.finish()
 
-            record_lines: List[str] = []
-            record_count = 0
-            publisher_ids: Dict[str,int] = {}
-            next_publisher_id = 1
-
-            bbk_pairs_raw   : List[Tuple[int,str]] = []   # для INSERT
-            bbk_field_pairs : List[Tuple[str,str]] = []   # 606/610
-            udc_pairs_raw   : List[Tuple[int,str]] = []
-            grnti_pairs_raw : List[Tuple[int,str]] = []
-            copies_pairs_raw: List[Tuple[int,str]] = []
-
-            # ───── process_record ─────
-            def process_record(rec: List[str]) -> None:
-                nonlocal record_count, next_publisher_id, next_author_id, total_book_author_links
-                if not any(l.startswith('#920:') and l.split(':',1)[1].strip() == 'IBIS' for l in rec):
-                    return
-
-                record_count += 1
-                title = type_ = edit = edition_statement = description = ''
-                pub_info_raw = phys_desc = series_ = ''
-                udc_raw = grnti_raw = ''
-                authors: Set[str] = set()
-                copies : List[str] = []
-
-                for line in rec:
-                    line = line.rstrip('\n')
-                    if not line.startswith('#'):
-                        continue
-                    tag, _, content = line.partition(':')
-                    tag = tag[1:]
-
-                    if tag == '200':
-                        sd = {k:v for k,v in _iter_subfields(content)}
-                        title = sd.get('A','').strip()
-                        type_ = sd.get('E','').strip()
-                        edit  = sd.get('F','').strip()
-                    elif tag == '205':
-                        edition_statement = next((v for k,v in _iter_subfields(content) if k=='A'), '').strip()
-                    elif tag == '210':
-                        sd = {k:v for k,v in _iter_subfields(content)}
-                        pub_info_raw = ', '.join(x for x in (
-                            sd.get('A','').strip(), sd.get('C','').strip(), sd.get('D','').strip()) if x)
-                    elif tag == '215':
-                        sd = {k:v for k,v in _iter_subfields(content)}
-                        phys_desc = ' '.join(x for x in (sd.get('A','').strip(), sd.get('1','').strip()) if x)
-                    elif tag == '225':
-                        sd = {k:v for k,v in _iter_subfields(content)}
-                        series_ = ' '.join(x for x in (sd.get('V','').strip(), sd.get('A','').strip()) if x)
-                    elif tag == '331':
-                        description = content.strip()
-                    elif tag == '675':
-                        udc_raw = content.strip()
-                    elif tag == '964':
-                        grnti_raw = content.strip()
-                    elif tag in ('606', '610'):
-                        bbk_field_pairs.append((tag, content.strip()))
-                    elif tag in ('700','701'):
-                        a = parse_author_700_701(content)
-                        if a:
-                            authors.add(normalize_author(a))
-                    elif tag == '910':
-                        copies.append(content.strip())
-
-                publisher_name, pub_city, pub_year = parse_pub_info(pub_info_raw)
-
-                # --- Издатели ---
-                sql_out.write("-- --- Издатели ---\n")
-                pub_id_sql = 'NULL'
-                if publisher_name:
-                    if publisher_name not in publisher_ids:
-                        publisher_ids[publisher_name] = next_publisher_id
-                        sql_out.write(
-                            f"INSERT INTO public.publisher(id,name) "
-                            f"VALUES ({next_publisher_id},'{sql_escape(publisher_name)}');\n")
-                        next_publisher_id += 1
-                    pub_id_sql = str(publisher_ids[publisher_name])
-
-                # --- Книга ---
-                sql_out.write(f"\n-- --- Книга #{record_count} ---\n")
-                if not title:
-                    return
-                sql_out.write(
-                    "INSERT INTO public.book("
-                    "id,title,\"type\",edit,edition_statement,phys_desc,series,description) VALUES("
-                    f"{record_count}, {sql_val(title)}, {sql_val(type_)}, {sql_val(edit)}, "
-                    f"{sql_val(edition_statement)}, {sql_val(phys_desc)}, {sql_val(series_)}, "
-                    f"{sql_val(description)});\n"
-                )
-
-                # --- Место публикации ---
-                sql_out.write("\n-- --- Место публикации ---\n")
-                city_sql = sql_val(pub_city)
-                year_sql = str(pub_year) if pub_year else 'NULL'
-                sql_out.write(
-                    f"INSERT INTO public.book_pub_place(book_id,publisher_id,city,pub_year) "
-                    f"VALUES ({record_count},{pub_id_sql},{city_sql},{year_sql});\n")
-
-                # --- Авторы ---
-                if authors:
-                    sql_out.write("\n-- --- Авторы ---\n")
-                for author in sorted(authors):
-                    last, first, patr = split_author_fields(author)
-                    key = (last, first, patr, None)
-                    if key not in author_ids:
-                        author_ids[key] = next_author_id
-                        sql_out.write(
-                            "INSERT INTO public.author(id,last_name,first_name,patronymic,birth_year) "
-                            f"VALUES ({next_author_id}, {sql_val(last)}, {sql_val(first)}, "
-                            f"{sql_val(patr)}, NULL);\n"
-                        )
-                        next_author_id += 1
-                    aid = author_ids[key]
-                    sql_out.write(
-                        f"INSERT INTO public.book_author(book_id,author_id) "
-                        f"VALUES ({record_count},{aid}) ON CONFLICT DO NOTHING;\n"
-                    )
-                    total_book_author_links += 1
-
-                # --- BBK / UDC / GRNTI RAW (сбор, но не INSERT) ---
-                sql_out.write("\n-- --- Коды BBK / UDC / GRNTI (RAW) ---\n")
-                # BBK: сразу вставляем, как и раньше
-                for code in collect_bbk_codes(bbk_field_pairs):
-                    bbk_pairs_raw.append((record_count, code))
-                    sql_out.write(
-                        f"INSERT INTO public.book_bbk_raw(book_id,bbk_code) "
-                        f"VALUES ({record_count},'{code}') ON CONFLICT DO NOTHING;\n")
-                bbk_field_pairs.clear()
-
-                # UDC: сразу пишем в RAW (логика не менялась)
-                for code in split_codes(udc_raw):
-                    udc_pairs_raw.append((record_count, code))
-                    sql_out.write(
-                        f"INSERT INTO public.book_udc_raw(book_id,udc_code) "
-                        f"VALUES ({record_count},{sql_val(code)}) ON CONFLICT DO NOTHING;\n")
-
-                # GRNTI: ТОЛЬКО собираем для дальнейшей фильтрации
-                for code in split_codes(grnti_raw):
-                    grnti_pairs_raw.append((record_count, code))
-
-                # Экземпляры
-                for cp in copies:
-                    copies_pairs_raw.append((record_count, cp))
-
-            # ───── чтение входного файла ─────
-            for ln in lines:
-                if ln.strip() == '*****':
-                    if record_lines:
-                        process_record(record_lines)
-                        record_lines.clear()
+        # ───── финальные секции ─────
+        # В памяти фильтры отдают списки; с --spill — итераторы по парам,
+        # читаемым с диска, а счётчики считаются по ходу вывода.  Время
+        # итераторов идёт в этапы фильтров (METRICS.iterate), а не в sql_emit.
+
+        # ───── BBK: рубрики &rarr; справочник (по запросу) ─────
+        bbk_linked = 0
+        bbk_skips: Counter = Counter()
+        bbk_levels: Counter = Counter()
+        if bbk_threshold is not None:
+            with METRICS.stage('bbk_match'):
+                bbk_index = BbkIndex(dicts['bbk_desc'], bbk_threshold)
+                if spill:
+                    bbk_links = METRICS.iterate('bbk_match', iter_resolved_links(
+                        imp.bbk_pairs_raw, bbk_index.resolve, skips=bbk_skips, levels=bbk_levels))
                 else:
-                    record_lines.append(ln)
-            if record_lines:
-                process_record(record_lines)
+                    bbk_links, _ = filter_resolved_links(
+                        imp.bbk_pairs_raw, bbk_index.resolve, skips=bbk_skips, levels=bbk_levels)
+            with METRICS.stage('sql_emit'):
+                out.comment("\n-- ======================================\n-- BBK (сопоставленные)\n-- ======================================\n")
+                for bid, bbk_id in bbk_links:
+                    out.row('book_bbk', (bid, bbk_id))
+                    bbk_linked += 1
+                bbk_skipped = sum(bbk_skips.values())
+                out.comment(f"-- BBK: вставлено {bbk_linked}, без совпадения {bbk_skipped}\n")
 
-            # ───── UDC / GRNTI clean ─────
-            udc_links,   udc_skipped   = filter_udc_links(udc_pairs_raw,   udc_map)
-            grnti_links, grnti_skipped_any_code = filter_grnti_links(grnti_pairs_raw, grnti_map)
+        # ───── UDC / GRNTI clean ─────
+        udc_skips: Counter = Counter()
+        grnti_skips: Counter = Counter()
+        udc_levels: Counter = Counter()
+        grnti_levels: Counter = Counter()
+        if spill:
+            with METRICS.stage('udc_filter'):
+                udc_index = UdcIndex(udc_map) if hierarchical else None
+            with METRICS.stage('grnti_filter'):
+                grnti_index = GrntiIndex(grnti_map) if hierarchical else None
+            udc_links = METRICS.iterate('udc_filter', iter_udc_links(
+                imp.udc_pairs_raw, udc_map, udc_skips, udc_index, udc_levels))
+            grnti_links = METRICS.iterate('grnti_filter', iter_grnti_links(
+                imp.grnti_pairs_raw, grnti_map, grnti_skips, grnti_index, grnti_levels))
+        elif hierarchical:
+            with METRICS.stage('udc_filter'):
+                udc_links,   udc_skipped   = filter_udc_links_hier(
+                    imp.udc_pairs_raw, UdcIndex(udc_map), udc_skips, udc_levels)
+            with METRICS.stage('grnti_filter'):
+                grnti_links, grnti_skipped_any_code = filter_grnti_links_hier(
+                    imp.grnti_pairs_raw, GrntiIndex(grnti_map), grnti_skips, grnti_levels)
+        else:
+            with METRICS.stage('udc_filter'):
+                udc_links,   udc_skipped   = filter_udc_links(imp.udc_pairs_raw,   udc_map, udc_skips)
+            with METRICS.stage('grnti_filter'):
+                grnti_links, grnti_skipped_any_code = filter_grnti_links(
+                    imp.grnti_pairs_raw, grnti_map, grnti_skips)
 
+        with METRICS.stage('sql_emit'):
             # ---------- UDC (очищенные) ----------
-            sql_out.write("\n-- ======================================\n-- UDC (очищенные)\n-- ======================================\n")
+            out.comment("\n-- ======================================\n-- UDC (очищенные)\n-- ======================================\n")
+            udc_linked = 0
             for bid, udc_id in udc_links:
-                sql_out.write(
-                    f"INSERT INTO public.book_udc(book_id,udc_id) "
-                    f"VALUES ({bid},{udc_id}) ON CONFLICT DO NOTHING;\n")
-            sql_out.write(f"-- UDC: вставлено {len(udc_links)}, пропущено {udc_skipped}\n")
+                out.row('book_udc', (bid, udc_id))
+                udc_linked += 1
+            if spill:
+                udc_skipped = sum(udc_skips.values())
+            out.comment(f"-- UDC: вставлено {udc_linked}, пропущено {udc_skipped}\n")
 
             # ---------- GRNTI (очищенные) ----------
-            sql_out.write("\n-- ======================================\n-- GRNTI (очищенные)\n-- ======================================\n")
+            out.comment("\n-- ======================================\n-- GRNTI (очищенные)\n-- ======================================\n")
+            # книги с хотя бы одним совпавшим кодом; с --spill — битовая карта
+            matched_grnti_books = BookBitmap() if spill else set()
+            grnti_linked = 0
             for bid, gid in grnti_links:
-                sql_out.write(
-                    f"INSERT INTO public.book_grnti(book_id,grnti_id) "
-                    f"VALUES ({bid},{gid}) ON CONFLICT DO NOTHING;\n")
-            sql_out.write(f"-- GRNTI: вставлено {len(grnti_links)}, пропущено {grnti_skipped_any_code}\n")
+                out.row('book_grnti', (bid, gid))
+                matched_grnti_books.add(bid)
+                grnti_linked += 1
+            if spill:
+                grnti_skipped_any_code = sum(grnti_skips.values())
+            out.comment(f"-- GRNTI: вставлено {grnti_linked}, пропущено {grnti_skipped_any_code}\n")
 
             # ---------- GRNTI RAW (только книги без совпадений) ----------
-            matched_grnti_books: set[int] = {bid for bid, _ in grnti_links}
-            grnti_raw_filtered = [
-                (bid, code) for bid, code in grnti_pairs_raw
-                if bid not in matched_grnti_books
-            ]
-
-            sql_out.write("\n-- ======================================\n-- GRNTI RAW (only unmatched books)\n-- ======================================\n")
-            for bid, code in grnti_raw_filtered:
-                sql_out.write(
-                    f"INSERT INTO public.book_grnti_raw(book_id,grnti_code) "
-                    f"VALUES ({bid},{sql_val(code)}) ON CONFLICT DO NOTHING;\n")
-            sql_out.write(f"-- GRNTI RAW: добавлено {len(grnti_raw_filtered)} (книги без совпавших кодов)\n")
-
-            # ───── Экземпляры ─────
-            cleaned_copies, skipped_copies = parse_copies(copies_pairs_raw)
-            seen_pairs: set[tuple[int,str]] = set()
-            skipped_dupes = 0
-            sql_out.write("\n-- ======================================\n-- Экземпляры\n-- ======================================\n")
+            out.comment("\n-- ======================================\n-- GRNTI RAW (only unmatched books)\n-- ======================================\n")
+            grnti_raw_count = 0
+            for bid, code in imp.grnti_pairs_raw:
+                if bid not in matched_grnti_books:
+                    out.row('book_grnti_raw', (bid, code))
+                    grnti_raw_count += 1
+            out.comment(f"-- GRNTI RAW: добавлено {grnti_raw_count} (книги без совпавших кодов)\n")
+
+        # ───── Экземпляры ─────
+        copies_skipped = [0]
+        with METRICS.stage('copies_parse'):
+            if spill:
+                cleaned_copies = iter_copies(imp.copies_pairs_raw, copies_skipped)
+            else:
+                cleaned_copies, copies_skipped[0] = parse_copies(imp.copies_pairs_raw)
+        with METRICS.stage('sql_emit'):
+            # с --spill дубли ищутся только среди экземпляров текущей книги:
+            # её поля 910 идут подряд
+            seen_pairs: set = set()
+            current_book = None
+            copies_inserted = skipped_dupes = 0
+            out.comment("\n-- ======================================\n-- Экземпляры\n-- ======================================\n")
             for bid, inv_no, date_in, storage, price in cleaned_copies:
-                if (bid, inv_no) in seen_pairs:
+                if spill and bid != current_book:
+                    current_book = bid
+                    seen_pairs.clear()
+                key = _copy_key(bid, inv_no)
+                if key in seen_pairs:
                     skipped_dupes += 1
                     continue
-                seen_pairs.add((bid, inv_no))
-                sql_out.write(
-                    "INSERT INTO public.book_copy(book_id,inventory_no,receipt_date,storage_place,price) "
-                    f"VALUES ({bid},{sql_val(inv_no)},{sql_val(date_in)},{sql_val(storage)},{price or 'NULL'}) "
-                    "ON CONFLICT (book_id,inventory_no) DO NOTHING;\n")
-
-            sql_out.write(
-                f"-- Экземпляры: вставлено {len(seen_pairs)}, "
+                seen_pairs.add(key)
+                copies_inserted += 1
+                imp.copy_row((bid, inv_no, date_in, storage, price))
+            skipped_copies = copies_skipped[0]
+
+            out.comment(
+                f"-- Экземпляры: вставлено {copies_inserted}, "
                 f"дубликатов пропущено {skipped_dupes}, битых строк {skipped_copies}\n")
+        if spill:
+            for buf in (imp.bbk_pairs_raw, imp.udc_pairs_raw, imp.grnti_pairs_raw,
+                        imp.copies_pairs_raw):
+                buf.close()
+
+        # ───── прямая загрузка (COPY) ─────
+        if load:
+            with METRICS.stage('db_load'), \
+                 psycopg2.connect(dsn) as conn, conn.cursor() as cur:
+                out.load(cur)
+
+    if delta:
+        delta.save(delta_state)
+    if ck:
+        os.remove(checkpoint)               # прогон завершён — продолжать нечего
+    if imp.author_clusters and author_report:
+        imp.author_clusters.write_report(author_report, imp.author_ids)
+
+    if metrics_json:
+        elapsed = (datetime.now() - started).total_seconds()
+        METRICS.write_json(metrics_json, input=infile, records=imp.record_count,
+                           workers=workers, total_seconds=round(elapsed, 3),
+                           records_per_sec=round(imp.record_count / elapsed, 1) if elapsed else None)
 
-        # ───── финальная статистика ─────
-        print(f"""\
+    # ───── финальная статистика ─────
+    top_skips = lambda hist: f"\n  ▸ частые пропуски   : {format_histogram(hist, 5)}" if hist else ''
+    level_order = MATCH_LEVELS[:-1] + (MATCH_FUZZY, MATCH_LEVELS[-1])
+    match_levels = lambda levels: ("\n  ▸ уровни совпадений: " + ", ".join(
+        f"{lv} {levels[lv]}" for lv in level_order if levels[lv])) if levels else ''
+    authors_merged = ''
+    if imp.author_clusters:
+        authors_merged = f"  (объединено вариантов: {len(imp.author_clusters.merges)}"
+        authors_merged += f", отчёт {author_report})" if author_report else ")"
+    books_merged = (f"  (повторов издания слито в книги: {imp.book_index.merged})"
+                    if imp.book_index else '')
+    publishers_line = ''
+    if imp.publisher_index:
+        publishers_line = (f"- Издательств         : {len(set(imp.publisher_ids.values()))}"
+                           f"  (вариантов названий в publisher_alias: {imp.publisher_aliases})\n")
+    bbk_summary = ''
+    if bbk_threshold is not None:
+        bbk_summary = (f"  (сопоставлено {bbk_linked}, порог {bbk_threshold})"
+                       f"{match_levels(bbk_levels)}{top_skips(bbk_skips)}")
+    target = ("- Загружено в БД      : " + ", ".join(f"{t} {n}" for t, n in out.counts.items())
+              if load else f"- SQL-файл создан     : {'stdout' if outfile == '-' else outfile}")
+    if resume:
+        target += f"\n- Продолжено         : с записи #{resumed_at + 1} ({checkpoint})"
+    if delta:
+        target += (f"\n- Delta               : новых {imp.new}, изменённых {imp.changed}, "
+                   f"без изменений {imp.unchanged}, удалённых {imp.removed}"
+                   f"\n- Состояние           : {delta_state}")
+    print(f"""\
 Обработка завершена.
-- Записей IBIS        : {record_count}
-- BBK RAW             : {len(bbk_pairs_raw)}
-- UDC RAW             : {len(udc_pairs_raw)}  (очищено {len(udc_links)}, пропущено {udc_skipped})
-- GRNTI RAW           : {len(grnti_raw_filtered)}  (очищено {len(grnti_links)}, пропущено {grnti_skipped_any_code})
-- Экземпляры вставлено: {len(seen_pairs)}
+- Записей IBIS        : {imp.record_count}{books_merged}
+- BBK RAW             : {len(imp.bbk_pairs_raw)}{bbk_summary}
+- UDC RAW             : {len(imp.udc_pairs_raw)}  (очищено {udc_linked}, пропущено {udc_skipped}){match_levels(udc_levels)}{top_skips(udc_skips)}
+- GRNTI RAW           : {grnti_raw_count}  (очищено {grnti_linked}, пропущено {grnti_skipped_any_code}){match_levels(grnti_levels)}{top_skips(grnti_skips)}
+- Экземпляры вставлено: {copies_inserted}
   ▸ дубликаты         : {skipped_dupes}
   ▸ битые строки      : {skipped_copies}
-- Авторов вставлено   : {len(author_ids)}
-- Связей книга-автор  : {total_book_author_links}
-- SQL-файл создан     : {outfile}
-""")
+- Авторов вставлено   : {len(set(imp.author_ids.values()))}{authors_merged}
+- Связей книга-автор  : {imp.total_book_author_links}
+{publishers_line}{target}
+""", file=log)
+    if cache_size > 0:
+        print(f"Кеши нормализаторов (до {cache_size} значений):\n{memo.report()}\n", file=log)
+    if metrics_json:
+        print(f"Этапы (замеры в {metrics_json}):\n{METRICS.report()}\n", file=log)
+
+def _save_checkpoint(ck: Checkpoint, path: str, imp: _Importer, out, dump) -> None:
+    """Состояние импорта и длина дампа на границе записи ck.input_offset."""
+    ck.importer = imp.state()
+    ck.writer = out.state()
+    dump.flush()
+    ck.output_offset = dump.buffer.tell()
+    ck.save(path)
 
 # ──────────────── CLI ────────────────
-if __name__ == '__main__':
+def _build_arg_parser() -> argparse.ArgumentParser:
     DEF_IN, DEF_OUT = "irbis_data.txt", "inserts.sql"
-    if len(sys.argv) < 2:
-        sys.exit("""\
-Использование:
-  python parse_irbis_file.py "dbname=library user=admin password=*** host=localhost port=5432"
-       [input_file] [output_file]
-
-По умолчанию:
-  input_file  = irbis_data.txt
-  output_file = inserts.sql
-""")
-    dsn     = sys.argv[1]
-    infile  = sys.argv[2] if len(sys.argv) > 2 else DEF_IN
-    outfile = sys.argv[3] if len(sys.argv) > 3 else DEF_OUT
-    if not os.path.exists(infile):
-        sys.exit(f"Ошибка: файл {infile} не найден.")
-    parse_irbis_file(dsn, infile, outfile)
\ No newline at end of file
+    ap = argparse.ArgumentParser(
+        description="Парсер экспорта ИРБИС &rarr; SQL-дамп / загрузка в PostgreSQL",
+        epilog=f"По умолчанию: input_file = {DEF_IN}, output_file = {DEF_OUT}")
+    ap.add_argument('dsn', help='строка подключения, напр. '
+                    '"dbname=library user=admin password=*** host=localhost port=5432"')
+    ap.add_argument('input_file',  nargs='?', default=DEF_IN)
+    ap.add_argument('output_file', nargs='?', default=DEF_OUT)
+    ap.add_argument('--load', action='store_true',
+                    help='не писать дамп, а загрузить данные в БД по тому же DSN '
+                         '(COPY ... FROM STDIN, одна транзакция)')
+    ap.add_argument('--workers', type=int, default=1, metavar='N',
+                    help='разбирать записи в N процессах (результат идентичен '
+                         'однопроцессному запуску; по умолчанию 1)')
+    ap.add_argument('--batch-size', type=int, default=0, metavar='N',
+                    help='писать многострочные INSERT-ы по N строк на таблицу '
+                         'без покомментарных баннеров (0 — по одному INSERT на строку)')
+    ap.add_argument('--delta', metavar='STATE',
+                    help='инкрементальный режим: файл состояния (JSON) с отпечатками '
+                         'записей; пишутся только новые, изменённые и удалённые записи')
+    ap.add_argument('--snapshot', metavar='FILE',
+                    help='локальный снимок справочников UDC/GRNTI: сверяется с БД по '
+                         'контрольной сумме и обновляется при изменениях')
+    ap.add_argument('--offline', action='store_true',
+                    help='не подключаться к БД, брать справочники только из --snapshot')
+    ap.add_argument('--metrics-json', metavar='FILE',
+                    help='записать время и число вызовов по этапам конвейера в JSON '
+                         '(с --workers время этапов разбора суммируется по процессам)')
+    ap.add_argument('--cache-size', type=int, default=memo.DEFAULT_CACHE_SIZE, metavar='N',
+                    help='размер LRU-кеша каждого нормализатора (авторы, выходные данные, '
+                         f'даты, коды ГРНТИ); 0 — без кеша (по умолчанию {memo.DEFAULT_CACHE_SIZE})')
+    ap.add_argument('--hierarchical', action='store_true',
+                    help='сопоставлять UDC/GRNTI по префиксному дереву справочника: '
+                         'составные коды (681.3:004) — по компонентам, детальные '
+                         '(621.039.5, 29.01.05) — с ближайшим предком')
+    ap.add_argument('--bbk-match', type=float, nargs='?', const=BBK_DEFAULT_THRESHOLD,
+                    metavar='T', dest='bbk_threshold',
+                    help='сопоставлять рубрики 606/610 с описаниями public.bbk и писать '
+                         'связи в book_bbk: точно или по сходству триграмм >= T '
+                         f'(по умолчанию {BBK_DEFAULT_THRESHOLD})')
+    ap.add_argument('--dedup-authors', action='store_true',
+                    help='объединять варианты написания авторов (Чернышев / Чернышёв / '
+                         'Chernyshev): блоки по фамилии и инициалу, расстояние Левенштейна')
+    ap.add_argument('--author-report', metavar='FILE',
+                    help='с --dedup-authors: TSV-отчёт о слитых вариантах')
+    ap.add_argument('--dedup-books', action='store_true',
+                    help='сливать повторные записи одного издания (заглавие, издание, '
+                         'издательство, год, авторы) в одну книгу с общими экземплярами '
+                         'и связями')
+    ap.add_argument('--canon-publishers', action='store_true',
+                    help='сводить варианты названия издательства (Изд-во МИФИ / МИФИ / '
+                         'ООО «МИФИ») к одной строке publisher, варианты — в publisher_alias')
+    ap.add_argument('--spill', action='store_true',
+                    help='держать отложенные пары УДК/ГРНТИ/ББК и экземпляры во временных '
+                         'файлах (каталог — TMPDIR), а не в памяти; для очень больших экспортов; '
+                         'несовместимо с --dedup-books')
+    ap.add_argument('--compress', choices=COMPRESSIONS,
+                    help='сжимать дамп (по умолчанию — по расширению output_file: '
+                         '.gz / .zst); output_file "-" — писать дамп в stdout')
+    ap.add_argument('--encoding', choices=ENCODINGS,
+                    help='кодировка экспорта (по умолчанию определяется по образцу: '
+                         'UTF-8 или cp1251)')
+    ap.add_argument('--checkpoint', metavar='FILE',
+                    help='периодически сохранять контрольную точку (смещения во входном '
+                         'файле и дампе, счётчики ID, словари, отложенные секции) в FILE; '
+                         'только для несжатого дампа в файл')
+    ap.add_argument('--checkpoint-every', type=int, default=CHECKPOINT_EVERY, metavar='N',
+                    help=f'записей между контрольными точками (по умолчанию {CHECKPOINT_EVERY})')
+    ap.add_argument('--resume', action='store_true',
+                    help='продолжить прерванный прогон с контрольной точки --checkpoint; '
+                         'дамп совпадёт с непрерывным прогоном')
+    ap.add_argument('--profile', metavar='FILE',
+                    help='профилировать запуск cProfile и сохранить статистику pstats '
+                         '(только главный процесс)')
+    return ap
+
+if __name__ == '__main__':
+    args = _build_arg_parser().parse_args()
+    if not os.path.exists(args.input_file):
+        sys.exit(f"Ошибка: файл {args.input_file} не найден.")
+    run = lambda: parse_irbis_file(
+        args.dsn, args.input_file, args.output_file,
+        load=args.load, workers=args.workers,
+        batch_size=args.batch_size, delta_state=args.delta,
+        snapshot=args.snapshot, offline=args.offline,
+        metrics_json=args.metrics_json, cache_size=args.cache_size,
+        hierarchical=args.hierarchical, bbk_threshold=args.bbk_threshold,
+        dedup_authors=args.dedup_authors, author_report=args.author_report,
+        canon_publishers=args.canon_publishers, compress=args.compress,
+        dedup_books=args.dedup_books, spill=args.spill,
+        checkpoint=args.checkpoint, checkpoint_every=max(1, args.checkpoint_every),
+        resume=args.resume, encoding=args.encoding)
+    if args.profile:
+        import cProfile
+        prof = cProfile.Profile()
+        prof.runcall(run)
+        prof.dump_stats(args.profile)
+        print(f"Профиль cProfile: {args.profile}  (python -m pstats {args.profile})",
+              file=sys.stderr if args.output_file == '-' else sys.stdout)
+    else:
+        run()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pg_copy.py — загрузка строк импорта напрямую в PostgreSQL через COPY.
+
+CopyLoader — приёмник с тем же интерфейсом, что и SqlDumpWriter
+(row / comment / write), но вместо текста INSERT-ов копит строки каждой
+таблицы во временном файле в формате COPY text.  load() затем передаёт
+их на сервер через cursor.copy_expert(...) в порядке внешних ключей.
+
+Семантика ON CONFLICT сохраняется: таблицы, чьи INSERT-ы в дампе
+содержат ON CONFLICT, грузятся через временную staging-таблицу:
+
+    CREATE TEMP TABLE _stg_x ... ;  COPY _stg_x FROM STDIN;
+    INSERT INTO public.x SELECT ... FROM _stg_x ON CONFLICT ...;
+
+остальные — прямым COPY в целевую таблицу.  Транзакцией управляет
+вызывающий код (всё выполняется на одном курсоре).
+"""
+
+from __future__ import annotations
+import tempfile
+from typing import Dict, IO, Sequence
+
+from sql_output import TABLES
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def copy_val(v) -> str:
+    """Значение &rarr; поле COPY text (пусто и None &rarr; \\N, как NULL в дампе)."""
+    if v is None or v == '':
+        return '\\N'
+    return str(v).translate(_COPY_ESCAPES)
+
+def copy_line(values: Sequence) -> str:
+    return '\t'.join(copy_val(v) for v in values) + '\n'
+
+
+class CopyLoader:
+    """Накопитель строк для COPY ... FROM STDIN."""
+
+    def __init__(self):
+        self._files: Dict[str, IO[str]] = {}
+        self.counts: Dict[str, int] = {}
+
+    def write(self, text: str) -> None:
+        pass
+
+    comment = write
+
+    def statement(self, sql: str) -> None:
+        raise RuntimeError("COPY-загрузка не поддерживает произвольные SQL-операторы")
+
+    def row(self, table: str, values: Sequence) -> None:
+        f = self._files.get(table)
+        if f is None:
+            f = self._files[table] = tempfile.TemporaryFile(
+                'w+', encoding='utf-8', newline='\n')
+        f.write(copy_line(values))
+        self.counts[table] = self.counts.get(table, 0) + 1
+
+    def load(self, cur) -> Dict[str, int]:
+        """COPY всех накопленных таблиц; возвращает {таблица: строк}."""
+        for table, spec in TABLES.items():
+            f = self._files.get(table)
+            if f is None:
+                continue
+            f.seek(0)
+            cols = ','.join(spec.columns)
+            if spec.conflict:
+                stg = f'_stg_{table}'
+                cur.execute(
+                    f"CREATE TEMP TABLE {stg} ON COMMIT DROP AS "
+                    f"SELECT {cols} FROM public.{table} WITH NO DATA;")
+                cur.copy_expert(f"COPY {stg} ({cols}) FROM STDIN", f)
+                cur.execute(
+                    f"INSERT INTO public.{table} ({cols}) "
+                    f"SELECT {cols} FROM {stg} {spec.conflict};")
+            else:
+                cur.copy_expert(f"COPY public.{table} ({cols}) FROM STDIN", f)
+        return dict(self.counts)
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sql_output.py — вывод строк импорта в SQL-дамп.
+
+Парсер (parse_irbis_file.py) не собирает текст SQL сам, а передаёт
+строки таблиц &laquo;приёмнику&raquo; через единый интерфейс:
+
+    out.row(table, values)   — одна строка таблицы public.<table>
+    out.comment(text)        — комментарий / баннер дампа
+    out.write(text)          — произвольный текст (заголовок дампа)
+    out.statement(sql)       — готовый SQL-оператор (UPDATE / DELETE
+                               delta-режима), в порядке со строками
+
+SqlDumpWriter пишет по одному INSERT на строку — формат дампа
+совпадает с прежним байт-в-байт.  BatchSqlWriter группирует строки
+каждой таблицы в многострочные INSERT ... VALUES (...),(...) и не пишет
+покомментарных баннеров — такой дамп psql проигрывает в разы быстрее,
+а итоговое состояние БД то же.
+
+Значения в строках — обычные Python-значения: int, str или None.
+Пустая строка, как и раньше, пишется как NULL.
+
+open_dump() открывает файл дампа: `-` — stdout / stdin, `.gz` / `.zst`
+(или явный compress) — сжатый поток gzip / zstd (zstd — пакет
+zstandard, если установлен).  SqlDumpWriter копит мелкие куски текста и
+отдаёт их потоку блоками по DUMP_BUFFER символов.
+"""
+
+from __future__ import annotations
+import io
+import sys
+import gzip
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, TextIO, Tuple
+
+DUMP_BUFFER = 1 << 20
+COMPRESSIONS = ('gzip', 'zstd')
+
+
+def sql_escape(s: str) -> str:
+    return s.replace("'", "''")
+
+def sql_val(s: str | None) -> str:
+    return f"'{sql_escape(s)}'" if s else "NULL"
+
+
+# ───── таблицы импорта (в порядке внешних ключей) ─────
+class TableSpec(NamedTuple):
+    columns : Tuple[str, ...]
+    conflict: str               # хвост INSERT-а: '' или 'ON CONFLICT ...'
+    parents : Tuple[str, ...] = ()      # таблицы импорта, на которые ссылаются FK
+
+_BOOK = ('book',)
+
+TABLES: Dict[str, TableSpec] = {
+    'publisher'     : TableSpec(('id', 'name'), ''),
+    'publisher_alias': TableSpec(('alias', 'publisher_id'), 'ON CONFLICT DO NOTHING',
+                                 ('publisher',)),
+    'book'          : TableSpec(('id', 'title', '"type"', 'edit', 'edition_statement',
+                                 'phys_desc', 'series', 'description'), ''),
+    'book_pub_place': TableSpec(('book_id', 'publisher_id', 'city', 'pub_year'), '',
+                                ('book', 'publisher')),
+    'author'        : TableSpec(('id', 'last_name', 'first_name', 'patronymic', 'birth_year'), ''),
+    'book_author'   : TableSpec(('book_id', 'author_id'), 'ON CONFLICT DO NOTHING',
+                                ('book', 'author')),
+    'book_bbk_raw'  : TableSpec(('book_id', 'bbk_code'), 'ON CONFLICT DO NOTHING', _BOOK),
+    'book_bbk'      : TableSpec(('book_id', 'bbk_id'), 'ON CONFLICT DO NOTHING', _BOOK),
+    'book_udc_raw'  : TableSpec(('book_id', 'udc_code'), 'ON CONFLICT DO NOTHING', _BOOK),
+    'book_udc'      : TableSpec(('book_id', 'udc_id'), 'ON CONFLICT DO NOTHING', _BOOK),
+    'book_grnti'    : TableSpec(('book_id', 'grnti_id'), 'ON CONFLICT DO NOTHING', _BOOK),
+    'book_grnti_raw': TableSpec(('book_id', 'grnti_code'), 'ON CONFLICT DO NOTHING', _BOOK),
+    'book_copy'     : TableSpec(('book_id', 'inventory_no', 'receipt_date', 'storage_place', 'price'),
+                                'ON CONFLICT (book_id,inventory_no) DO NOTHING', _BOOK),
+}
+
+
+# ───── построчный формат дампа (исторический) ─────
+def _num(v) -> str:
+    return str(v) if v else 'NULL'
+
+_LEGACY_FMT: Dict[str, Callable[[Sequence], str]] = {
+    'publisher': lambda r:
+        f"INSERT INTO public.publisher(id,name) "
+        f"VALUES ({r[0]},'{sql_escape(r[1])}');\n",
+    'publisher_alias': lambda r:
+        f"INSERT INTO public.publisher_alias(alias,publisher_id) "
+        f"VALUES ('{sql_escape(r[0])}',{r[1]}) ON CONFLICT DO NOTHING;\n",
+    'book': lambda r:
+        "INSERT INTO public.book("
+        "id,title,\"type\",edit,edition_statement,phys_desc,series,description) VALUES("
+        f"{r[0]}, {sql_val(r[1])}, {sql_val(r[2])}, {sql_val(r[3])}, "
+        f"{sql_val(r[4])}, {sql_val(r[5])}, {sql_val(r[6])}, "
+        f"{sql_val(r[7])});\n",
+    'book_pub_place': lambda r:
+        f"INSERT INTO public.book_pub_place(book_id,publisher_id,city,pub_year) "
+        f"VALUES ({r[0]},{_num(r[1])},{sql_val(r[2])},{_num(r[3])});\n",
+    'author': lambda r:
+        "INSERT INTO public.author(id,last_name,first_name,patronymic,birth_year) "
+        f"VALUES ({r[0]}, {sql_val(r[1])}, {sql_val(r[2])}, "
+        f"{sql_val(r[3])}, {_num(r[4])});\n",
+    'book_author': lambda r:
+        f"INSERT INTO public.book_author(book_id,author_id) "
+        f"VALUES ({r[0]},{r[1]}) ON CONFLICT DO NOTHING;\n",
+    'book_bbk_raw': lambda r:
+        f"INSERT INTO public.book_bbk_raw(book_id,bbk_code) "
+        f"VALUES ({r[0]},'{r[1]}') ON CONFLICT DO NOTHING;\n",
+    'book_bbk': lambda r:
+        f"INSERT INTO public.book_bbk(book_id,bbk_id) "
+        f"VALUES ({r[0]},{r[1]}) ON CONFLICT DO NOTHING;\n",
+    'book_udc_raw': lambda r:
+        f"INSERT INTO public.book_udc_raw(book_id,udc_code) "
+        f"VALUES ({r[0]},{sql_val(r[1])}) ON CONFLICT DO NOTHING;\n",
+    'book_udc': lambda r:
+        f"INSERT INTO public.book_udc(book_id,udc_id) "
+        f"VALUES ({r[0]},{r[1]}) ON CONFLICT DO NOTHING;\n",
+    'book_grnti': lambda r:
+        f"INSERT INTO public.book_grnti(book_id,grnti_id) "
+        f"VALUES ({r[0]},{r[1]}) ON CONFLICT DO NOTHING;\n",
+    'book_grnti_raw': lambda r:
+        f"INSERT INTO public.book_grnti_raw(book_id,grnti_code) "
+        f"VALUES ({r[0]},{sql_val(r[1])}) ON CONFLICT DO NOTHING;\n",
+    'book_copy': lambda r:
+        "INSERT INTO public.book_copy(book_id,inventory_no,receipt_date,storage_place,price) "
+        f"VALUES ({r[0]},{sql_val(r[1])},{sql_val(r[2])},{sql_val(r[3])},{r[4] or 'NULL'}) "
+        "ON CONFLICT (book_id,inventory_no) DO NOTHING;\n",
+}
+
+
+# ───── файл дампа ─────
+class _DumpText(io.TextIOWrapper):
+    """Текстовый поток дампа; close() закрывает и файл под компрессором."""
+
+    def __init__(self, stream, raw):
+        super().__init__(stream, encoding='utf-8')
+        self._CHUNK_SIZE = DUMP_BUFFER
+        self._raw = raw
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            super().close()
+        finally:
+            self._raw.close()
+
+
+def dump_compression(path: str, compress: Optional[str] = None) -> Optional[str]:
+    """'gzip' / 'zstd' / None — по явному compress или расширению path."""
+    if compress:
+        if compress not in COMPRESSIONS:
+            raise ValueError(f"неизвестное сжатие: {compress}")
+        return compress
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst'):
+        return 'zstd'
+    return None
+
+
+def open_dump(path: str, mode: str = 'w', compress: Optional[str] = None) -> TextIO:
+    """
+    Текстовый поток дампа для записи (mode='w'), дозаписи ('a') или чтения ('r').
+    path '-' — stdout / stdin (сам дескриптор при close() не закрывается).
+    """
+    kind = dump_compression(path, compress)
+    if kind == 'zstd':
+        # до открытия path: иначе без пакета остался бы пустой файл дампа
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("для сжатия zstd нужен пакет zstandard "
+                               "(pip install zstandard)") from None
+    if path == '-':
+        fd = (sys.stdout if mode != 'r' else sys.stdin).fileno()
+        raw = open(fd, mode + 'b', buffering=DUMP_BUFFER, closefd=False)
+    else:
+        raw = open(path, mode + 'b', buffering=DUMP_BUFFER)
+    try:
+        if kind == 'gzip':
+            stream = gzip.GzipFile(fileobj=raw, mode=mode + 'b', compresslevel=6)
+        elif kind == 'zstd':
+            if mode != 'r':
+                stream = zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=False)
+            else:
+                stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=False)
+        else:
+            stream = raw
+        return _DumpText(stream, raw)
+    except BaseException:
+        raw.close()
+        raise
+
+
+class SqlDumpWriter:
+    """Один INSERT на строку, с комментариями-баннерами."""
+
+    def __init__(self, out: TextIO):
+        self._out = out
+        self._parts: List[str] = []
+        self._size = 0
+        self.counts: Dict[str, int] = {}
+
+    def write(self, text: str) -> None:
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= DUMP_BUFFER:
+            self.flush()
+
+    comment = write
+
+    def statement(self, sql: str) -> None:
+        self.write(sql + '\n')
+
+    def row(self, table: str, values: Sequence) -> None:
+        self.write(_LEGACY_FMT[table](values))
+        self.counts[table] = self.counts.get(table, 0) + 1
+
+    def flush(self) -> None:
+        if self._parts:
+            self._out.write(''.join(self._parts))
+            self._parts.clear()
+            self._size = 0
+
+    def state(self) -> Dict:
+        """Состояние для контрольной точки (checkpoint.py); буфер уходит в файл."""
+        self.flush()
+        return {'counts': dict(self.counts)}
+
+    def restore(self, state: Dict) -> None:
+        self.counts = dict(state['counts'])
+
+    def close(self) -> None:
+        self.flush()
+        self._out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ───── многострочные INSERT-ы ─────
+def sql_lit(v) -> str:
+    """Литерал для VALUES: None/'' &rarr; NULL, int &rarr; число, иначе строка."""
+    if v is None or v == '':
+        return 'NULL'
+    if isinstance(v, int):
+        return str(v)
+    return f"'{sql_escape(str(v))}'"
+
+
+class BatchSqlWriter:
+    """
+    Копит строки по таблицам и пишет их пачками по batch_size строк
+    в одном INSERT.  Когда заполняется пачка любой таблицы, сбрасываются
+    все таблицы в порядке TABLES — родительские строки всегда попадают
+    в дамп раньше ссылающихся на них.
+    """
+
+    def __init__(self, out: TextIO, batch_size: int = 1000):
+        self._out = out
+        self.batch_size = max(1, batch_size)
+        self._rows: Dict[str, List[str]] = {t: [] for t in TABLES}
+        self.counts: Dict[str, int] = {}
+
+    def write(self, text: str) -> None:
+        self._out.write(text)
+
+    def comment(self, text: str) -> None:
+        pass
+
+    def statement(self, sql: str) -> None:
+        self.flush()
+        self._out.write(sql + '\n')
+
+    def row(self, table: str, values: Sequence) -> None:
+        buf = self._rows[table]
+        buf.append('(' + ','.join(sql_lit(v) for v in values) + ')')
+        self.counts[table] = self.counts.get(table, 0) + 1
+        if len(buf) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        for table, spec in TABLES.items():
+            buf = self._rows[table]
+            if not buf:
+                continue
+            tail = f" {spec.conflict};\n" if spec.conflict else ";\n"
+            self._out.write(
+                f"INSERT INTO public.{table}({','.join(spec.columns)}) VALUES\n"
+                + ',\n'.join(buf) + tail)
+            buf.clear()
+
+    def state(self) -> Dict:
+        """Состояние для контрольной точки: недописанные пачки не сбрасываются,
+        чтобы дамп не отличался от непрерывного прогона."""
+        return {'counts': dict(self.counts),
+                'rows': {t: list(buf) for t, buf in self._rows.items() if buf}}
+
+    def restore(self, state: Dict) -> None:
+        self.counts = dict(state['counts'])
+        self._rows = {t: list(state['rows'].get(t, ())) for t in TABLES}
+
+    def close(self) -> None:
+        self.flush()
+        self._out.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,21 +1,19 @@
 #!/usr/bin/env python3
 # udc_excel_to_sql.py — Excel (2 колонки) &rarr; INSERT-ы PostgreSQL
-# pip install pandas openpyxl
+# pip install openpyxl  (чтение потоковое, см. dict_import.py)
 
-import sys, re, pandas as pd
+import sys, re
 
 COL_CODE, COL_DESC = "udc_abb", "description"
 space_re = re.compile(r'\s+')
 
-def pg_escape(text: str) -> str:
-    return text.replace("'", "''")
-
 def normalize(text: str) -> str:
     return space_re.sub(' ', text).strip()
 
-def rows_to_records(df):
+def rows_to_records(rows):
+    """rows — пары ячеек (код, описание), напр. dict_import.iter_xlsx_rows()."""
     code, parts = None, []
-    for raw_code, raw_desc in df.itertuples(index=False, name=None):
+    for raw_code, raw_desc in rows:
         c = normalize(str(raw_code))
         d = normalize(str(raw_desc))
 
@@ -30,16 +28,10 @@ def rows_to_records(df):
         yield code, ' '.join(parts)
 
 def main(src_xlsx: str, dst_sql: str):
-    df = pd.read_excel(src_xlsx, header=None, dtype=str).fillna('')
+    from dict_import import iter_records, write_inserts
 
     with open(dst_sql, 'w', encoding='utf-8') as f:
-        f.write(f"-- INSERT-ы УДК, сгенерировано из {src_xlsx}\n")
-        for code, desc in rows_to_records(df):
-            f.write(
-                "INSERT INTO public.udc (udc_abb, description) "
-                f"VALUES ('{pg_escape(code)}', '{pg_escape(desc)}') "
-                "ON CONFLICT (udc_abb) DO NOTHING;\n"
-            )
+        write_inserts('udc', iter_records('udc', src_xlsx), f, src_xlsx)
 
 if __name__ == "__main__":
     if len(sys.argv) != 3: